@@ -0,0 +1,182 @@
+#######################################################
+#JSON Encoding and Responses for the Lambda Handlers
+#######################################################
+# api_responses.py
+#
+# - Bodies are encoded with orjson when it is installed (e.g. from a layer),
+#   and with the standard library otherwise; both write the same compact
+#   UTF-8 JSON.
+# - DynamoDB numbers (Decimal) are written as JSON numbers without going
+#   through a lossy float (see decimal_number).
+# - Request bodies are decoded with floats as Decimal, which is what DynamoDB
+#   accepts, and NaN/Infinity (which it rejects, and which are not JSON) are
+#   refused. This stays on the standard library: orjson has no parse_float
+#   hook, and converting its floats afterwards is slower than parse_float.
+# - The fixed error bodies in ERRORS are encoded once at import.
+# - encode_page writes a list response item by item from an iterator and
+#   stops at a byte budget, so a page never has to be materialized first.
+import json
+import re
+import uuid
+from decimal import Decimal
+from types import MappingProxyType
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson >= 3.9.10 can embed already-encoded JSON, which writes a Decimal digit for digit
+_Fragment = getattr(orjson, 'Fragment', None)
+
+# Every response gets its own copy: the Lambda runtime's encoder only takes real dicts, and
+# callers may add headers to a response. Read-only view for callers.
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+JSON_HEADERS = MappingProxyType(_JSON_HEADERS)
+
+# The standard library encoder can only write a Decimal as an int or float. One that no float
+# holds exactly is encoded as this marker plus an index, then swapped for its digits; the random
+# part keeps a request's own strings from ever matching.
+_DECIMAL_MARKER = f"\x00decimal-{uuid.uuid4().hex}-"
+_ENCODED_DECIMAL_MARKER = re.compile(re.escape(json.dumps(_DECIMAL_MARKER)[:-1]) + r'(\d+)"')
+
+# error name -> (status code, message)
+ERRORS = {
+    'route_not_found': (404, 'No route for this path'),
+    'method_not_allowed': (405, 'Method not allowed for this path'),
+    'invalid_json': (400, 'Invalid JSON body'),
+    'missing_payment_id': (400, 'Missing paymentId in path'),
+    'authentication_required': (403, 'Authentication required to list payments'),
+    'forbidden': (403, 'Forbidden: You do not have access to this payment'),
+    'not_found': (404, 'Payment not found'),
+}
+
+
+def decimal_number(value):
+    """
+    A number the standard library can encode that equals the Decimal `value`:
+    an int when it is integral, a float when that float reads back as the same
+    value, and otherwise None.
+    """
+    if value == value.to_integral_value():
+        return int(value)
+    number = float(value)
+    if Decimal(repr(number)) == value:
+        return number
+    return None
+
+
+def _json_dumps(value):
+    inexact = [] # Decimals written as markers, by marker index
+
+    def default(obj):
+        if isinstance(obj, Decimal):
+            number = decimal_number(obj)
+            if number is not None:
+                return number
+            inexact.append(str(obj))
+            return f"{_DECIMAL_MARKER}{len(inexact) - 1}"
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    encoded = json.dumps(value, default=default, separators=(',', ':'), ensure_ascii=False)
+    if inexact:
+        encoded = _ENCODED_DECIMAL_MARKER.sub(lambda match: inexact[int(match.group(1))], encoded)
+    return encoded
+
+
+def _orjson_default(value):
+    if isinstance(value, Decimal):
+        if _Fragment is not None:
+            return _Fragment(str(value))
+        number = decimal_number(value)
+        if number is not None:
+            return number
+    # Older orjson cannot write this Decimal exactly; dumps_bytes falls back to _json_dumps
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_bytes(value):
+    """Encodes `value` (which may hold Decimals, always written as JSON numbers) as UTF-8 JSON bytes."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=_orjson_default)
+        except orjson.JSONEncodeError:
+            pass
+    return _json_dumps(value).encode('utf-8')
+
+
+def dumps(value):
+    """Encodes `value` (which may hold Decimals) as a JSON string."""
+    return dumps_bytes(value).decode('utf-8')
+
+
+def _reject_constant(name):
+    raise ValueError(f"{name} is not a JSON number")
+
+
+def loads(body):
+    """
+    Decodes a JSON request body, with non-integral numbers as Decimal. Raises
+    ValueError (json.JSONDecodeError included) for invalid JSON, NaN and Infinity.
+    """
+    return json.loads(body, parse_float=Decimal, parse_constant=_reject_constant)
+
+
+def encoded_response(status_code, body, headers=None):
+    """A proxy integration response for an already encoded JSON `body`; `headers` are added to Content-Type."""
+    return {
+        'statusCode': status_code,
+        'headers': {**_JSON_HEADERS, **headers} if headers else dict(_JSON_HEADERS),
+        'body': body,
+    }
+
+
+def json_response(status_code, value, headers=None):
+    """A proxy integration response with `value` encoded as the JSON body."""
+    return encoded_response(status_code, dumps(value), headers)
+
+
+def message_response(status_code, message):
+    """A response whose body is {"message": message}."""
+    return encoded_response(status_code, dumps({'message': message}))
+
+
+# Room kept for '],"nextToken":"..."}' when deciding whether one more item fits a page
+PAGE_TAIL_RESERVE = 1024
+
+
+def encode_page(items, limit, max_bytes, next_token):
+    """
+    Encodes {"items": [...], "nextToken": ...} from the iterator `items`, one
+    item at a time, stopping after `limit` items or before the body would
+    grow past `max_bytes` (at least one item is always included). Pulling the
+    item after the last one included is how a further page is detected; then
+    `next_token(last_item_included)` becomes nextToken, otherwise it is null.
+    Returns (body, number of items).
+    """
+    chunks = [b'{"items":[']
+    size = len(chunks[0]) + PAGE_TAIL_RESERVE
+    count, last, more = 0, None, False
+    for item in items:
+        encoded = dumps_bytes(item)
+        if count == limit or (count and size + len(encoded) + 1 > max_bytes):
+            more = True
+            break
+        if count:
+            chunks.append(b',')
+            size += 1
+        chunks.append(encoded)
+        size += len(encoded)
+        count += 1
+        last = item
+    chunks.append(b'],"nextToken":' + dumps_bytes(next_token(last) if more else None) + b'}')
+    return b''.join(chunks).decode('utf-8'), count
+
+
+_ERROR_RESPONSES = {name: (status_code, dumps({'message': message})) for name, (status_code, message) in ERRORS.items()}
+
+
+def error_response(name, headers=None):
+    """The response for the ERRORS entry `name`; `headers` are added to Content-Type."""
+    status_code, body = _ERROR_RESPONSES[name]
+    return encoded_response(status_code, body, headers)
@@ -0,0 +1,144 @@
+#######################################################
+#Pooled HTTP Client for FusionAuth
+#######################################################
+# fusionauth_client.py
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while FusionAuth is considered down."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed calls. While open every call
+    fails fast; after `reset_timeout` seconds one trial call is let through
+    (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow_request(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout and not self._trial_in_progress:
+                self._trial_in_progress = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def release_trial(self):
+        """Ends a half-open trial that got no answer either way, e.g. because its caller was cancelled."""
+        with self._lock:
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_progress = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class FusionAuthClient:
+    """
+    One keep-alive connection pool per container for FusionAuth calls, with
+    explicit connect/read timeouts, bounded retries with full jitter on
+    connection errors and 5xx responses, and a circuit breaker in front.
+    4xx responses (e.g. 401 for an invalid JWT) are returned to the caller
+    and never count against the breaker.
+    """
+
+    RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url, api_key=None, connect_timeout=1.0, read_timeout=2.0,
+                 max_retries=2, backoff_base=0.05, pool_size=10, breaker=None):
+        self.base_url = (base_url or '').rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        # urllib3 retries are disabled; retries happen in _request so the breaker sees them
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Content-Type'] = 'application/json'
+        # Sent on the validate call only, never on public endpoints such as the JWKS
+        self.api_key = api_key
+
+    @classmethod
+    def from_env(cls, base_url, api_key=None):
+        return cls(
+            base_url,
+            api_key=api_key,
+            connect_timeout=float(os.environ.get('FUSIONAUTH_CONNECT_TIMEOUT', '1.0')),
+            read_timeout=float(os.environ.get('FUSIONAUTH_READ_TIMEOUT', '2.0')),
+            max_retries=int(os.environ.get('FUSIONAUTH_MAX_RETRIES', '2')),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.environ.get('FUSIONAUTH_BREAKER_FAILURES', '5')),
+                reset_timeout=float(os.environ.get('FUSIONAUTH_BREAKER_RESET_SECONDS', '30')),
+            ),
+        )
+
+    def _request(self, method, url, **kwargs):
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"FusionAuth circuit open, not calling {url}")
+
+        # Every way out of here records an outcome, otherwise a half-open trial would never end
+        succeeded = False
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                    if response.status_code not in self.RETRYABLE_STATUS:
+                        succeeded = True
+                        return response
+                    error = requests.exceptions.HTTPError(f"{response.status_code} from {url}", response=response)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    error = e
+                if attempt < self.max_retries:
+                    time.sleep(random.uniform(0, self.backoff_base * (2 ** attempt)))
+            raise error
+        finally:
+            if succeeded:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def get_json(self, url):
+        response = self._request('GET', url)
+        response.raise_for_status()
+        return response.json()
+
+    def validate_jwt(self, jwt):
+        """POST /api/jwt/validate; raises for HTTP errors, including FusionAuth's 401 for invalid tokens."""
+        headers = {'Authorization': self.api_key} if self.api_key else None
+        response = self._request('POST', f"{self.base_url}/api/jwt/validate",
+                                 data=json.dumps({"jwt": jwt}), headers=headers)
+        response.raise_for_status()
+        return response.json()
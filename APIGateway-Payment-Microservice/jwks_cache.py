@@ -0,0 +1,118 @@
+#######################################################
+#JWKS Key Cache for the FusionAuth Custom Authorizer
+#######################################################
+# jwks_cache.py
+import threading
+import time
+
+import jwt
+import requests
+
+from structured_logging import get_logger
+
+logger = get_logger('jwks_cache')
+
+
+class JWKSCache:
+    """
+    Caches FusionAuth signing keys indexed by `kid`.
+
+    - Keys younger than `ttl_seconds` are served as-is.
+    - Keys older than `ttl_seconds` but younger than `ttl_seconds + stale_ttl_seconds`
+      are still served while a background refresh picks up rotated keys.
+    - A token with an unknown `kid` forces a refresh, at most once every
+      `kid_refresh_interval` seconds.
+    - Only one fetch is ever in flight; concurrent callers wait for its result.
+    - If a refresh fails, the last known keys keep being served rather than
+      denying every request while FusionAuth is unreachable.
+    """
+
+    def __init__(self, jwks_url, http_client, ttl_seconds=300, stale_ttl_seconds=3600,
+                 kid_refresh_interval=30, wait_timeout=10):
+        self.jwks_url = jwks_url
+        self.http_client = http_client
+        self.ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self.kid_refresh_interval = kid_refresh_interval
+        self.wait_timeout = wait_timeout
+
+        self._keys = {}
+        self._fetched_at = None
+        self._last_forced_refresh = None
+        self._lock = threading.Lock()
+        self._inflight = None # threading.Event of the fetch currently running, if any
+
+    def _fetch_keys(self):
+        keys = {}
+        for jwk in self.http_client.get_json(self.jwks_url).get('keys', []):
+            if 'kid' not in jwk or jwk.get('use', 'sig') != 'sig':
+                continue
+            try:
+                keys[jwk['kid']] = jwt.PyJWK(jwk)
+            except jwt.exceptions.PyJWKError as e:
+                logger.warning("Skipping unusable JWK %s: %s", jwk.get('kid'), e)
+        return keys
+
+    def refresh(self):
+        """Fetches the key set, joining the fetch already in flight if there is one."""
+        with self._lock:
+            inflight = self._inflight
+            if inflight is None:
+                inflight = self._inflight = threading.Event()
+                leader = True
+            else:
+                leader = False
+
+        if leader:
+            try:
+                keys = self._fetch_keys()
+                with self._lock:
+                    self._keys = keys
+                    self._fetched_at = time.monotonic()
+                logger.info("JWKS refreshed: %d signing keys", len(keys))
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error("Error fetching JWKS: %s", e)
+            finally:
+                with self._lock:
+                    self._inflight = None
+                inflight.set()
+        else:
+            inflight.wait(self.wait_timeout)
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._inflight is not None:
+                return
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def get_signing_key(self, kid):
+        now = time.monotonic()
+        age = None if self._fetched_at is None else now - self._fetched_at
+
+        if age is None or age > self.ttl_seconds + self.stale_ttl_seconds:
+            # Nothing usable cached: every caller has to wait for the fetch
+            self.refresh()
+        elif kid not in self._keys:
+            # Possibly a freshly rotated key; rate limited so garbage kids can't hammer FusionAuth
+            with self._lock:
+                allowed = (self._last_forced_refresh is None
+                           or now - self._last_forced_refresh >= self.kid_refresh_interval)
+                if allowed:
+                    self._last_forced_refresh = now
+            if allowed:
+                self.refresh()
+        elif age > self.ttl_seconds:
+            # Stale while revalidate: answer from the old keys, refresh behind the scenes
+            self._refresh_in_background()
+
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        if self._fetched_at is None:
+            raise jwt.exceptions.PyJWKClientConnectionError("JWKS could not be fetched")
+        raise jwt.exceptions.PyJWKClientError(f"Unable to find a signing key that matches: {kid!r}")
+
+    def get_signing_key_from_jwt(self, token):
+        """Same contract as jwt.PyJWKClient.get_signing_key_from_jwt."""
+        header = jwt.get_unverified_header(token)
+        return self.get_signing_key(header.get('kid'))
@@ -2,12 +2,16 @@
 #FusionAuth Custom Authorizer Lambda Code
 #######################################################
 # lambda_authorizer.py
-import json
 import os
 import jwt
-from jwt.algorithms import RSAAlgorithm
-import requests
-import base64
+
+from fusionauth_client import FusionAuthClient
+from jwks_cache import JWKSCache
+from token_cache import TokenCache
+from policy_builder import PolicyBuilder
+from structured_logging import get_logger, log_event, set_request_id
+
+logger = get_logger('lambda_authorizer')
 
 # --- Configuration ---
 # Replace with your FusionAuth tenant ID
@@ -17,45 +21,53 @@ FUSIONAUTH_ISSUER = os.environ.get('FUSIONAUTH_ISSUER', 'https://your-fusionauth
 # Replace with your FusionAuth JWKS endpoint (e.g., https://your-fusionauth-domain.com/.well-known/jwks.json)
 FUSIONAUTH_JWKS_URL = os.environ.get('FUSIONAUTH_JWKS_URL', 'https://your-fusionauth-domain.com/.well-known/jwks.json')
 
-# Cache for JWKS to avoid fetching on every invocation
+# JWKS cache tuning (seconds)
+JWKS_CACHE_TTL_SECONDS = int(os.environ.get('JWKS_CACHE_TTL_SECONDS', '300'))
+JWKS_STALE_TTL_SECONDS = int(os.environ.get('JWKS_STALE_TTL_SECONDS', '3600'))
+JWKS_KID_REFRESH_INTERVAL_SECONDS = int(os.environ.get('JWKS_KID_REFRESH_INTERVAL_SECONDS', '30'))
+
+# Cache for JWKS to avoid fetching on every invocation; lives as long as the container
 _jwks_client = None
 
 def get_jwks_client():
-    """Fetches and caches the JWKS client."""
+    """Returns the container-wide JWKS key cache, creating it on first use."""
     global _jwks_client
     if _jwks_client is None:
-        try:
-            response = requests.get(FUSIONAUTH_JWKS_URL, timeout=5)
-            response.raise_for_status()
-            jwks_data = response.json()
-            _jwks_client = jwt.PyJWKClient(FUSIONAUTH_JWKS_URL, jwks_data=jwks_data)
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching JWKS: {e}")
-            raise Exception("Unauthorized") # Or handle more gracefully
+        _jwks_client = JWKSCache(
+            FUSIONAUTH_JWKS_URL,
+            # Pooled, with timeouts, retries and a circuit breaker. No base URL: the JWKS URL is absolute,
+            # and the authorizer calls no other FusionAuth API
+            FusionAuthClient.from_env(None),
+            ttl_seconds=JWKS_CACHE_TTL_SECONDS,
+            stale_ttl_seconds=JWKS_STALE_TTL_SECONDS,
+            kid_refresh_interval=JWKS_KID_REFRESH_INTERVAL_SECONDS,
+        )
     return _jwks_client
 
-def generate_policy(principal_id, effect, resource):
-    """Generates an IAM policy for API Gateway."""
-    auth_response = {
-        'principalId': principal_id,
-        'policyDocument': {
-            'Version': '2012-10-17',
-            'Statement': [
-                {
-                    'Action': 'execute-api:Invoke',
-                    'Effect': effect,
-                    'Resource': resource
-                }
-            ]
-        }
-    }
-    return auth_response
+# Verified tokens and their claims, reused across warm invocations
+TOKEN_CACHE_MAX_ENTRIES = int(os.environ.get('TOKEN_CACHE_MAX_ENTRIES', '1024'))
+TOKEN_CACHE_MAX_TTL_SECONDS = int(os.environ.get('TOKEN_CACHE_MAX_TTL_SECONDS', '300'))
+_token_cache = TokenCache(max_entries=TOKEN_CACHE_MAX_ENTRIES, max_ttl_seconds=TOKEN_CACHE_MAX_TTL_SECONDS)
+
+# Optional JSON mapping of FusionAuth role -> "METHOD/path" patterns the role may call,
+# e.g. {"admin": ["*/*"], "customer": ["GET/payments", "GET/payments/*", "POST/payments"]}
+POLICY_ROLE_ROUTES = os.environ.get('POLICY_ROLE_ROUTES', '')
+_policy_builder = PolicyBuilder.from_json(POLICY_ROLE_ROUTES)
+
+def generate_policy(principal_id, effect, resource, roles=()):
+    """
+    Generates an IAM policy for API Gateway. The policy covers every route the
+    caller's roles allow on the stage of `resource`, so API Gateway's cached
+    result is reused across routes instead of re-running the authorizer.
+    """
+    return _policy_builder.build(principal_id, effect, resource, roles)
 
 def lambda_handler(event, context):
     """
     Lambda handler for custom authorizer. Validates JWT from FusionAuth.
     """
-    print(f"Authorizer event: {json.dumps(event)}")
+    set_request_id(getattr(context, 'aws_request_id', None))
+    log_event(logger, event, "Authorizer event") # authorizationToken is redacted
 
     token = None
     # Extract token from Authorization header
@@ -65,7 +77,7 @@ def lambda_handler(event, context):
         token = event['headers']['Authorization']
 
     if not token:
-        print("Authorization header missing or empty.")
+        logger.warning("Authorization header missing or empty.")
         return generate_policy('user', 'Deny', event['methodArn'])
 
     # Strip "Bearer " prefix if present
@@ -73,34 +85,40 @@ def lambda_handler(event, context):
         token = token[len('Bearer '):]
 
     try:
-        jwks_client = get_jwks_client()
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
-
-        # Decode and verify the token
-        # audience (aud) should be the API Gateway URL or a specific identifier for your API
-        # issuer (iss) should match your FusionAuth issuer URL
-        # tenantId (tid) is a custom claim often used by FusionAuth
-        decoded_token = jwt.decode(
-            token,
-            signing_key.key,
-            algorithms=["RS256"], # Ensure this matches your FusionAuth configuration
-            audience="your-api-gateway-audience", # IMPORTANT: Replace with your actual API Gateway audience
-            issuer=FUSIONAUTH_ISSUER,
-            options={"require": ["exp", "iat", "iss", "aud"]},
-        )
+        # Repeat calls with the same token skip the JWKS lookup and signature check
+        decoded_token = _token_cache.get(token)
+        if decoded_token is None:
+            jwks_client = get_jwks_client()
+            signing_key = jwks_client.get_signing_key_from_jwt(token)
+
+            # Decode and verify the token
+            # audience (aud) should be the API Gateway URL or a specific identifier for your API
+            # issuer (iss) should match your FusionAuth issuer URL
+            # tenantId (tid) is a custom claim often used by FusionAuth
+            decoded_token = jwt.decode(
+                token,
+                signing_key.key,
+                algorithms=["RS256"], # Ensure this matches your FusionAuth configuration
+                audience="your-api-gateway-audience", # IMPORTANT: Replace with your actual API Gateway audience
+                issuer=FUSIONAUTH_ISSUER,
+                options={"require": ["exp", "iat", "iss", "aud"]},
+            )
+            _token_cache.put(token, decoded_token)
+        else:
+            logger.debug("Token cache hit, stats: %s", _token_cache.stats())
 
         # Optional: Further validation of claims (e.g., roles, permissions)
         # if decoded_token.get('tid') != FUSIONAUTH_TENANT_ID:
         #     print("Tenant ID mismatch.")
         #     return generate_policy('user', 'Deny', event['methodArn'])
 
-        print(f"Token successfully decoded for user: {decoded_token.get('sub')}")
-        return generate_policy(decoded_token.get('sub'), 'Allow', event['methodArn'])
+        logger.info("Token successfully decoded for user: %s", decoded_token.get('sub'))
+        return generate_policy(decoded_token.get('sub'), 'Allow', event['methodArn'], decoded_token.get('roles') or ())
 
     except jwt.exceptions.PyJWTError as e:
-        print(f"JWT validation error: {e}")
+        logger.warning("JWT validation error: %s", e)
         return generate_policy('user', 'Deny', event['methodArn'])
     except Exception as e:
-        print(f"Unexpected error: {e}")
+        logger.exception("Unexpected error: %s", e)
         return generate_policy('user', 'Deny', event['methodArn'])
 
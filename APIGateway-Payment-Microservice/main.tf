@@ -8,6 +8,45 @@ provider "aws" {
   region = "us-east-2" # Or your preferred AWS region
 }
 
+# Read-through cache for GET /payments/{paymentId} (see payment_cache.py)
+variable "payment_cache_backend" {
+  description = "none, memory (per Lambda container, TTL only) or redis (shared, invalidated from the table's stream)"
+  type        = string
+  default     = "memory"
+}
+
+# Change notifications for GET /payments/{paymentId}/wait (see payment_notifier.py)
+variable "payment_notifier_backend" {
+  description = "redis (pub/sub, published from the table's stream) or none (the wait re-reads the payment every few seconds)"
+  type        = string
+  default     = "redis"
+}
+
+variable "payments_redis_url" {
+  description = "Redis endpoint for the redis cache and notifier backends; empty creates an ElastiCache cluster in the payments VPC (section 3b)"
+  type        = string
+  default     = ""
+}
+
+variable "payments_redis_node_type" {
+  description = "Node type of the ElastiCache cluster created when payments_redis_url is empty"
+  type        = string
+  default     = "cache.t4g.micro"
+}
+
+variable "payments_vpc_cidr" {
+  description = "CIDR of the VPC the Lambdas and Redis run in when a redis backend is on"
+  type        = string
+  default     = "10.40.0.0/16"
+}
+
+locals {
+  redis_enabled      = var.payment_cache_backend == "redis" || var.payment_notifier_backend == "redis"
+  create_redis       = local.redis_enabled && var.payments_redis_url == ""
+  payments_redis_url = (var.payments_redis_url != "" ? var.payments_redis_url :
+    local.create_redis ? "rediss://${one(aws_elasticache_replication_group.payments_redis[*].primary_endpoint_address)}:6379/0" : "")
+}
+
 # -----------------------------------------------------------------------------
 # 1. IAM Roles and Policies
 # -----------------------------------------------------------------------------
@@ -62,12 +101,38 @@ resource "aws_iam_role_policy" "payment_processor_dynamodb_policy" {
       {
         Action = [
           "dynamodb:PutItem",
+          "dynamodb:BatchWriteItem", # POST /payments/batch
           "dynamodb:GetItem",
-          "dynamodb:Scan", # For simplicity in example, use Query with GSI in production
+          "dynamodb:Query", # List payments through the userId-createdAt-index GSI
           "dynamodb:UpdateItem"
         ],
         Effect = "Allow",
-        Resource = aws_dynamodb_table.payments_table.arn
+        Resource = [
+          aws_dynamodb_table.payments_table.arn,
+          "${aws_dynamodb_table.payments_table.arn}/index/*"
+        ]
+      }
+    ]
+  })
+}
+
+# IAM Policy for the outbox publisher and the change feed to read the payments table's stream
+resource "aws_iam_role_policy" "outbox_publisher_stream_policy" {
+  name = "payment-outbox-publisher-stream-policy"
+  role = aws_iam_role.lambda_execution_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Action = [
+          "dynamodb:DescribeStream",
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:ListStreams"
+        ],
+        Effect = "Allow",
+        Resource = aws_dynamodb_table.payments_table.stream_arn
       }
     ]
   })
@@ -83,7 +148,7 @@ resource "aws_iam_role_policy" "payment_processor_sqs_policy" {
     Statement = [
       {
         Action = [
-          "sqs:SendMessage"
+          "sqs:SendMessage" # Also covers SendMessageBatch
         ],
         Effect = "Allow",
         Resource = aws_sqs_queue.payment_queue.arn
@@ -92,6 +157,13 @@ resource "aws_iam_role_policy" "payment_processor_sqs_policy" {
   })
 }
 
+# ENIs for the Lambdas that run in the payments VPC (section 3b)
+resource "aws_iam_role_policy_attachment" "lambda_vpc_access" {
+  count      = local.redis_enabled ? 1 : 0
+  role       = aws_iam_role.lambda_execution_role.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaVPCAccessExecutionRole"
+}
+
 # -----------------------------------------------------------------------------
 # 2. DynamoDB Table
 # -----------------------------------------------------------------------------
@@ -107,6 +179,29 @@ resource "aws_dynamodb_table" "payments_table" {
     type = "S"
   }
 
+  attribute {
+    name = "userId"
+    type = "S"
+  }
+
+  attribute {
+    name = "createdAt"
+    type = "S"
+  }
+
+  # Lets GET /payments query one user's payments, newest first, instead of scanning the table
+  global_secondary_index {
+    name            = "userId-createdAt-index"
+    hash_key        = "userId"
+    range_key       = "createdAt"
+    projection_type = "ALL"
+  }
+
+  # New payments are forwarded to SQS from the stream when PAYMENT_HANDOFF_MODE is "outbox",
+  # and updated payments go to the change feed (redis payment cache and waiting requests)
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
   tags = {
     Name        = "PaymentsTable"
     Environment = "dev"
@@ -133,21 +228,205 @@ resource "aws_sqs_queue" "payment_queue" {
   }
 }
 
+# -----------------------------------------------------------------------------
+# 3b. Redis for the Payment Notifier and Cache
+# -----------------------------------------------------------------------------
+# With a redis backend the processor and change feed Lambdas run in this VPC, next to an
+# ElastiCache cluster. The private subnets have no NAT, so DynamoDB and SQS are reached
+# through VPC endpoints.
+
+data "aws_availability_zones" "available" {
+  state = "available"
+}
+
+resource "aws_vpc" "payments_vpc" {
+  count                = local.redis_enabled ? 1 : 0
+  cidr_block           = var.payments_vpc_cidr
+  enable_dns_support   = true
+  enable_dns_hostnames = true # needed for the SQS endpoint's private DNS
+
+  tags = {
+    Name        = "PaymentsVpc"
+    Environment = "dev"
+    Service     = "PaymentService"
+  }
+}
+
+resource "aws_subnet" "payments_private" {
+  count             = local.redis_enabled ? 2 : 0
+  vpc_id            = aws_vpc.payments_vpc[0].id
+  cidr_block        = cidrsubnet(var.payments_vpc_cidr, 8, count.index)
+  availability_zone = data.aws_availability_zones.available.names[count.index]
+
+  tags = {
+    Name        = "PaymentsPrivate${count.index}"
+    Environment = "dev"
+    Service     = "PaymentService"
+  }
+}
+
+resource "aws_route_table" "payments_private" {
+  count  = local.redis_enabled ? 1 : 0
+  vpc_id = aws_vpc.payments_vpc[0].id
+}
+
+resource "aws_route_table_association" "payments_private" {
+  count          = length(aws_subnet.payments_private)
+  subnet_id      = aws_subnet.payments_private[count.index].id
+  route_table_id = aws_route_table.payments_private[0].id
+}
+
+resource "aws_security_group" "payments_lambda_sg" {
+  count       = local.redis_enabled ? 1 : 0
+  name        = "payment-service-lambda-sg"
+  description = "Payment service Lambdas"
+  vpc_id      = aws_vpc.payments_vpc[0].id
+
+  egress {
+    from_port   = 0
+    to_port     = 0
+    protocol    = "-1"
+    cidr_blocks = ["0.0.0.0/0"]
+  }
+}
+
+resource "aws_security_group" "payments_redis_sg" {
+  count       = local.redis_enabled ? 1 : 0
+  name        = "payment-service-redis-sg"
+  description = "Payment service Redis, reachable from the payment service Lambdas"
+  vpc_id      = aws_vpc.payments_vpc[0].id
+
+  ingress {
+    from_port       = 6379
+    to_port         = 6379
+    protocol        = "tcp"
+    security_groups = [aws_security_group.payments_lambda_sg[0].id]
+  }
+}
+
+resource "aws_security_group" "payments_endpoints_sg" {
+  count       = local.redis_enabled ? 1 : 0
+  name        = "payment-service-endpoints-sg"
+  description = "HTTPS from the payment service Lambdas to the SQS VPC endpoint"
+  vpc_id      = aws_vpc.payments_vpc[0].id
+
+  ingress {
+    from_port       = 443
+    to_port         = 443
+    protocol        = "tcp"
+    security_groups = [aws_security_group.payments_lambda_sg[0].id]
+  }
+}
+
+data "aws_region" "current" {}
+
+resource "aws_vpc_endpoint" "payments_dynamodb" {
+  count             = local.redis_enabled ? 1 : 0
+  vpc_id            = aws_vpc.payments_vpc[0].id
+  service_name      = "com.amazonaws.${data.aws_region.current.name}.dynamodb"
+  vpc_endpoint_type = "Gateway"
+  route_table_ids   = [aws_route_table.payments_private[0].id]
+}
+
+# Only used when PAYMENT_HANDOFF_MODE sends to SQS from the processor rather than the outbox
+resource "aws_vpc_endpoint" "payments_sqs" {
+  count               = local.redis_enabled ? 1 : 0
+  vpc_id              = aws_vpc.payments_vpc[0].id
+  service_name        = "com.amazonaws.${data.aws_region.current.name}.sqs"
+  vpc_endpoint_type   = "Interface"
+  subnet_ids          = aws_subnet.payments_private[*].id
+  security_group_ids  = [aws_security_group.payments_endpoints_sg[0].id]
+  private_dns_enabled = true
+}
+
+resource "aws_elasticache_subnet_group" "payments_redis" {
+  count      = local.create_redis ? 1 : 0
+  name       = "payment-service-redis"
+  subnet_ids = aws_subnet.payments_private[*].id
+}
+
+resource "aws_elasticache_replication_group" "payments_redis" {
+  count                      = local.create_redis ? 1 : 0
+  replication_group_id       = "payment-service-redis"
+  description                = "Payment change notifications (pub/sub) and the shared payment cache"
+  engine                     = "redis"
+  engine_version             = "7.1"
+  node_type                  = var.payments_redis_node_type
+  num_cache_clusters         = 1
+  port                       = 6379
+  subnet_group_name          = aws_elasticache_subnet_group.payments_redis[0].name
+  security_group_ids         = [aws_security_group.payments_redis_sg[0].id]
+  at_rest_encryption_enabled = true
+  transit_encryption_enabled = true # hence rediss:// in local.payments_redis_url
+
+  tags = {
+    Name        = "PaymentsRedis"
+    Environment = "dev"
+    Service     = "PaymentService"
+  }
+}
+
+# The redis client isn't in the Lambda runtime: it is installed from layers/redis/requirements.txt
+# into build/redis_layer and shipped as a layer
+resource "terraform_data" "redis_layer_build" {
+  count            = local.redis_enabled ? 1 : 0
+  triggers_replace = filesha256("${path.module}/layers/redis/requirements.txt")
+
+  provisioner "local-exec" {
+    command = "python3 -m pip install --quiet --upgrade --target ${path.module}/build/redis_layer/python -r ${path.module}/layers/redis/requirements.txt"
+  }
+}
+
+data "archive_file" "redis_layer_zip" {
+  count       = local.redis_enabled ? 1 : 0
+  type        = "zip"
+  source_dir  = "${path.module}/build/redis_layer"
+  output_path = "redis_layer.zip"
+  depends_on  = [terraform_data.redis_layer_build]
+}
+
+resource "aws_lambda_layer_version" "redis_layer" {
+  count               = local.redis_enabled ? 1 : 0
+  layer_name          = "payment-service-redis"
+  filename            = data.archive_file.redis_layer_zip[0].output_path
+  source_code_hash    = data.archive_file.redis_layer_zip[0].output_base64sha256
+  compatible_runtimes = ["python3.9"]
+}
+
 # -----------------------------------------------------------------------------
 # 4. Lambda Functions
 # -----------------------------------------------------------------------------
 
 # Create zip file for FusionAuth Authorizer Lambda code
-resource "local_file" "lambda_authorizer_zip" {
-  content  = file("${path.module}/lambda_authorizer.py") # Assumes lambda_authorizer.py is in the same directory
-  filename = "lambda_authorizer.zip"
-  # This is a simplification. In a real scenario, you'd use a data source like
-  # data "archive_file" "lambda_authorizer_zip" {
-  #   type        = "zip"
-  #   source_file = "${path.module}/lambda_authorizer.py"
-  #   output_path = "lambda_authorizer.zip"
-  # }
-  # and then reference output_path. This approach directly uses a local file.
+# The authorizer is split across several modules, so they are zipped together
+data "archive_file" "lambda_authorizer_zip" {
+  type        = "zip"
+  output_path = "lambda_authorizer.zip"
+
+  source {
+    content  = file("${path.module}/lambda_authorizer.py")
+    filename = "lambda_authorizer.py"
+  }
+  source {
+    content  = file("${path.module}/fusionauth_client.py")
+    filename = "fusionauth_client.py"
+  }
+  source {
+    content  = file("${path.module}/jwks_cache.py")
+    filename = "jwks_cache.py"
+  }
+  source {
+    content  = file("${path.module}/token_cache.py")
+    filename = "token_cache.py"
+  }
+  source {
+    content  = file("${path.module}/policy_builder.py")
+    filename = "policy_builder.py"
+  }
+  source {
+    content  = file("${path.module}/structured_logging.py")
+    filename = "structured_logging.py"
+  }
 }
 
 # FusionAuth Custom Authorizer Lambda
@@ -156,8 +435,8 @@ resource "aws_lambda_function" "fusionauth_authorizer_lambda" {
   handler          = "lambda_authorizer.lambda_handler"
   runtime          = "python3.9" # Or a newer Python version
   role             = aws_iam_role.lambda_execution_role.arn
-  filename         = local_file.lambda_authorizer_zip.filename
-  source_code_hash = filebase64sha256(local_file.lambda_authorizer_zip.filename)
+  filename         = data.archive_file.lambda_authorizer_zip.output_path
+  source_code_hash = data.archive_file.lambda_authorizer_zip.output_base64sha256
   timeout          = 30 # Max 30 seconds for authorizer
   memory_size      = 128
 
@@ -167,6 +446,18 @@ resource "aws_lambda_function" "fusionauth_authorizer_lambda" {
       FUSIONAUTH_TENANT_ID = "YOUR_FUSIONAUTH_TENANT_ID"
       FUSIONAUTH_ISSUER    = "https://your-fusionauth-domain.com"
       FUSIONAUTH_JWKS_URL  = "https://your-fusionauth-domain.com/.well-known/jwks.json"
+      # Signing keys are re-fetched after 5 minutes and served stale for up to an hour if FusionAuth is unreachable
+      JWKS_CACHE_TTL_SECONDS            = "300"
+      JWKS_STALE_TTL_SECONDS            = "3600"
+      JWKS_KID_REFRESH_INTERVAL_SECONDS = "30"
+      # Verified tokens are cached in-process for at most 5 minutes (or until they expire)
+      TOKEN_CACHE_MAX_ENTRIES     = "1024"
+      TOKEN_CACHE_MAX_TTL_SECONDS = "300"
+      # Optional role -> "METHOD/path" grants; when empty a valid token is allowed on every route of the stage
+      POLICY_ROLE_ROUTES = ""
+      # JSON log lines; the full (redacted) event is logged at DEBUG or for a sampled share of invocations
+      LOG_LEVEL             = "INFO"
+      LOG_EVENT_SAMPLE_RATE = "0"
     }
   }
 
@@ -178,10 +469,42 @@ resource "aws_lambda_function" "fusionauth_authorizer_lambda" {
 }
 
 # Create zip file for Payment Processor Lambda code
-resource "local_file" "lambda_payment_processor_zip" {
-  content  = file("${path.module}/payment_processor.py") # Assumes payment_processor.py is in the same directory
-  filename = "payment_processor.zip"
-  # Same simplification as above for local_file.
+data "archive_file" "lambda_payment_processor_zip" {
+  type        = "zip"
+  output_path = "payment_processor.zip"
+
+  source {
+    content  = file("${path.module}/payment_processor.py")
+    filename = "payment_processor.py"
+  }
+  source {
+    content  = file("${path.module}/api_responses.py")
+    filename = "api_responses.py"
+  }
+  source {
+    content  = file("${path.module}/api_router.py")
+    filename = "api_router.py"
+  }
+  source {
+    content  = file("${path.module}/payment_validation.py")
+    filename = "payment_validation.py"
+  }
+  source {
+    content  = file("${path.module}/payment_request_schema.json")
+    filename = "payment_request_schema.json"
+  }
+  source {
+    content  = file("${path.module}/payment_cache.py")
+    filename = "payment_cache.py"
+  }
+  source {
+    content  = file("${path.module}/payment_notifier.py")
+    filename = "payment_notifier.py"
+  }
+  source {
+    content  = file("${path.module}/structured_logging.py")
+    filename = "structured_logging.py"
+  }
 }
 
 # Payment Processor Lambda
@@ -190,17 +513,46 @@ resource "aws_lambda_function" "payment_processor_lambda" {
   handler          = "payment_processor.lambda_handler"
   runtime          = "python3.9" # Or a newer Python version
   role             = aws_iam_role.lambda_execution_role.arn
-  filename         = local_file.lambda_payment_processor_zip.filename
-  source_code_hash = filebase64sha256(local_file.lambda_payment_processor_zip.filename)
+  filename         = data.archive_file.lambda_payment_processor_zip.output_path
+  source_code_hash = data.archive_file.lambda_payment_processor_zip.output_base64sha256
   timeout          = 60 # Allow more time for processing
   memory_size      = 256
 
   environment {
     variables = {
-      DYNAMODB_TABLE_NAME = aws_dynamodb_table.payments_table.name
-      SQS_QUEUE_URL       = aws_sqs_queue.payment_queue.id # Use ID for URL
+      DYNAMODB_TABLE_NAME        = aws_dynamodb_table.payments_table.name
+      SQS_QUEUE_URL              = aws_sqs_queue.payment_queue.id # Use ID for URL
+      PAYMENTS_BY_USER_INDEX     = "userId-createdAt-index"
+      # "outbox": one DynamoDB write per POST, forwarded to SQS by the outbox publisher below.
+      # "concurrent" and "sequential" send to SQS from the handler instead.
+      PAYMENT_HANDOFF_MODE       = "outbox"
+      PAYMENTS_BATCH_MAX_ITEMS   = "500"
+      # GET /payments/{paymentId} is served from this cache for up to PAYMENT_CACHE_TTL_SECONDS
+      PAYMENT_CACHE_BACKEND      = var.payment_cache_backend
+      PAYMENT_CACHE_TTL_SECONDS  = "5"
+      PAYMENT_CACHE_MAX_ENTRIES  = "10000"
+      PAYMENT_CACHE_REDIS_URL    = local.payments_redis_url
+      # GET /payments/{paymentId}/wait: woken by the change feed, capped below API Gateway's 29 s timeout
+      PAYMENT_NOTIFIER_BACKEND   = var.payment_notifier_backend
+      PAYMENT_NOTIFIER_REDIS_URL = local.payments_redis_url
+      PAYMENT_WAIT_MAX_SECONDS   = "25"
+      # GET /payments ends a page early, with a nextToken, at this body size
+      LIST_PAYMENTS_MAX_BYTES    = "1048576"
+      LOG_LEVEL                  = "INFO"
+      LOG_EVENT_SAMPLE_RATE      = "0"
+    }
+  }
+
+  # In the Redis VPC when a redis backend is on (section 3b)
+  layers = aws_lambda_layer_version.redis_layer[*].arn
+  dynamic "vpc_config" {
+    for_each = local.redis_enabled ? [1] : []
+    content {
+      subnet_ids         = aws_subnet.payments_private[*].id
+      security_group_ids = [aws_security_group.payments_lambda_sg[0].id]
     }
   }
+  depends_on = [aws_iam_role_policy_attachment.lambda_vpc_access]
 
   tags = {
     Name        = "PaymentProcessor"
@@ -209,6 +561,249 @@ resource "aws_lambda_function" "payment_processor_lambda" {
   }
 }
 
+# Create zip file for the Payment Outbox Publisher Lambda code
+data "archive_file" "outbox_publisher_zip" {
+  type        = "zip"
+  output_path = "outbox_publisher.zip"
+
+  source {
+    content  = file("${path.module}/outbox_publisher.py")
+    filename = "outbox_publisher.py"
+  }
+  source {
+    content  = file("${path.module}/payment_processor.py")
+    filename = "payment_processor.py"
+  }
+  source {
+    content  = file("${path.module}/api_responses.py")
+    filename = "api_responses.py"
+  }
+  source {
+    content  = file("${path.module}/api_router.py")
+    filename = "api_router.py"
+  }
+  source {
+    content  = file("${path.module}/payment_validation.py")
+    filename = "payment_validation.py"
+  }
+  source {
+    content  = file("${path.module}/payment_request_schema.json")
+    filename = "payment_request_schema.json"
+  }
+  source {
+    content  = file("${path.module}/payment_cache.py")
+    filename = "payment_cache.py"
+  }
+  source {
+    content  = file("${path.module}/payment_notifier.py")
+    filename = "payment_notifier.py"
+  }
+  source {
+    content  = file("${path.module}/structured_logging.py")
+    filename = "structured_logging.py"
+  }
+}
+
+# Payment Outbox Publisher Lambda: forwards payments inserted in outbox mode from the table's stream to SQS
+resource "aws_lambda_function" "outbox_publisher_lambda" {
+  function_name    = "PaymentOutboxPublisher"
+  handler          = "outbox_publisher.lambda_handler"
+  runtime          = "python3.9" # Or a newer Python version
+  role             = aws_iam_role.lambda_execution_role.arn
+  filename         = data.archive_file.outbox_publisher_zip.output_path
+  source_code_hash = data.archive_file.outbox_publisher_zip.output_base64sha256
+  timeout          = 30
+  memory_size      = 128
+
+  environment {
+    variables = {
+      SQS_QUEUE_URL         = aws_sqs_queue.payment_queue.id
+      LOG_LEVEL             = "INFO"
+      LOG_EVENT_SAMPLE_RATE = "0"
+    }
+  }
+
+  tags = {
+    Name        = "PaymentOutboxPublisher"
+    Environment = "dev"
+    Service     = "PaymentService"
+  }
+}
+
+resource "aws_lambda_event_source_mapping" "payments_outbox_stream" {
+  event_source_arn  = aws_dynamodb_table.payments_table.stream_arn
+  function_name     = aws_lambda_function.outbox_publisher_lambda.arn
+  starting_position = "TRIM_HORIZON" # do not skip payments written before the mapping existed
+  batch_size        = 100
+  # The handler reports the first sequence number it could not send; retries start there
+  function_response_types = ["ReportBatchItemFailures"]
+
+  # Only payments written in outbox mode; updates and deletes never reach the function
+  filter_criteria {
+    filter {
+      pattern = jsonencode({
+        eventName = ["INSERT"]
+        dynamodb  = { NewImage = { handoff = { S = ["outbox"] } } }
+      })
+    }
+  }
+
+  depends_on = [aws_iam_role_policy.outbox_publisher_stream_policy]
+}
+
+# Create zip file for the Payment Change Feed Lambda code
+data "archive_file" "payment_change_feed_zip" {
+  type        = "zip"
+  output_path = "payment_change_feed.zip"
+
+  source {
+    content  = file("${path.module}/payment_change_feed.py")
+    filename = "payment_change_feed.py"
+  }
+  source {
+    content  = file("${path.module}/payment_processor.py")
+    filename = "payment_processor.py"
+  }
+  source {
+    content  = file("${path.module}/api_responses.py")
+    filename = "api_responses.py"
+  }
+  source {
+    content  = file("${path.module}/api_router.py")
+    filename = "api_router.py"
+  }
+  source {
+    content  = file("${path.module}/payment_validation.py")
+    filename = "payment_validation.py"
+  }
+  source {
+    content  = file("${path.module}/payment_request_schema.json")
+    filename = "payment_request_schema.json"
+  }
+  source {
+    content  = file("${path.module}/payment_cache.py")
+    filename = "payment_cache.py"
+  }
+  source {
+    content  = file("${path.module}/payment_notifier.py")
+    filename = "payment_notifier.py"
+  }
+  source {
+    content  = file("${path.module}/structured_logging.py")
+    filename = "structured_logging.py"
+  }
+}
+
+# Payment Change Feed Lambda: drops updated payments from the redis cache and wakes the
+# GET /payments/{paymentId}/wait requests waiting on them. Only needed with a redis backend
+# (the default notifier): the memory cache is bounded by its TTL, and without a notifier the
+# wait re-reads the table.
+resource "aws_lambda_function" "payment_change_feed_lambda" {
+  count            = local.redis_enabled ? 1 : 0
+  function_name    = "PaymentChangeFeed"
+  handler          = "payment_change_feed.lambda_handler"
+  runtime          = "python3.9" # Or a newer Python version
+  role             = aws_iam_role.lambda_execution_role.arn
+  filename         = data.archive_file.payment_change_feed_zip.output_path
+  source_code_hash = data.archive_file.payment_change_feed_zip.output_base64sha256
+  timeout          = 30
+  memory_size      = 128
+
+  environment {
+    variables = {
+      PAYMENT_CACHE_BACKEND      = var.payment_cache_backend
+      PAYMENT_CACHE_REDIS_URL    = local.payments_redis_url
+      PAYMENT_NOTIFIER_BACKEND   = var.payment_notifier_backend
+      PAYMENT_NOTIFIER_REDIS_URL = local.payments_redis_url
+      LOG_LEVEL                  = "INFO"
+      LOG_EVENT_SAMPLE_RATE      = "0"
+    }
+  }
+
+  # In the Redis VPC when a redis backend is on (section 3b)
+  layers = aws_lambda_layer_version.redis_layer[*].arn
+  dynamic "vpc_config" {
+    for_each = local.redis_enabled ? [1] : []
+    content {
+      subnet_ids         = aws_subnet.payments_private[*].id
+      security_group_ids = [aws_security_group.payments_lambda_sg[0].id]
+    }
+  }
+  depends_on = [aws_iam_role_policy_attachment.lambda_vpc_access]
+
+  tags = {
+    Name        = "PaymentChangeFeed"
+    Environment = "dev"
+    Service     = "PaymentService"
+  }
+}
+
+# The table stream's second reader, next to the outbox publisher
+resource "aws_lambda_event_source_mapping" "payments_change_feed_stream" {
+  count             = length(aws_lambda_function.payment_change_feed_lambda)
+  event_source_arn  = aws_dynamodb_table.payments_table.stream_arn
+  function_name     = aws_lambda_function.payment_change_feed_lambda[0].arn
+  starting_position = "LATEST" # older cache entries expire by TTL, and nobody waits on older changes
+  batch_size        = 100
+  # Waiting requests should hear about a change right away, not once a batch fills up
+  maximum_batching_window_in_seconds = 0
+
+  # While redis is down the handler keeps failing; give up on a batch instead of stalling the shard
+  # for the stream's 24 h retention. Cache entries expire within seconds and waits end within
+  # PAYMENT_WAIT_MAX_SECONDS, so a change older than a minute has nobody left to tell.
+  maximum_retry_attempts         = 3
+  maximum_record_age_in_seconds  = 60
+  bisect_batch_on_function_error = true
+  destination_config {
+    on_failure {
+      destination_arn = aws_sqs_queue.payment_change_feed_dlq[0].arn
+    }
+  }
+
+  # Status updates and deletes only; new payments have no cache entry or waiters yet
+  filter_criteria {
+    filter {
+      pattern = jsonencode({
+        eventName = ["MODIFY", "REMOVE"]
+      })
+    }
+  }
+
+  depends_on = [aws_iam_role_policy.outbox_publisher_stream_policy, aws_iam_role_policy.payment_change_feed_dlq_policy]
+}
+
+# Where Lambda records the shard and sequence numbers of change feed batches it gave up on
+resource "aws_sqs_queue" "payment_change_feed_dlq" {
+  count                     = length(aws_lambda_function.payment_change_feed_lambda)
+  name                      = "payment-change-feed-dlq"
+  message_retention_seconds = 1209600 # 14 days
+
+  tags = {
+    Name        = "PaymentChangeFeedDLQ"
+    Environment = "dev"
+    Service     = "PaymentService"
+  }
+}
+
+resource "aws_iam_role_policy" "payment_change_feed_dlq_policy" {
+  count = length(aws_sqs_queue.payment_change_feed_dlq)
+  name  = "payment-change-feed-dlq-policy"
+  role  = aws_iam_role.lambda_execution_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Action = [
+          "sqs:SendMessage"
+        ],
+        Effect = "Allow",
+        Resource = aws_sqs_queue.payment_change_feed_dlq[0].arn
+      }
+    ]
+  })
+}
+
 # -----------------------------------------------------------------------------
 # 5. API Gateway
 # -----------------------------------------------------------------------------
@@ -286,6 +881,33 @@ resource "aws_api_gateway_integration" "post_payments_integration" {
   uri                     = aws_lambda_function.payment_processor_lambda.invoke_arn
 }
 
+# API Gateway Resource: /payments/batch
+# (the ":batch" custom-method style is not usable here: REST API path parts cannot contain ':')
+resource "aws_api_gateway_resource" "payments_batch_resource" {
+  rest_api_id = aws_api_gateway_rest_api.payment_api_gateway.id
+  parent_id   = aws_api_gateway_resource.payments_resource.id
+  path_part   = "batch"
+}
+
+# API Gateway Method: POST /payments/batch (Create up to PAYMENTS_BATCH_MAX_ITEMS payments)
+resource "aws_api_gateway_method" "post_payments_batch_method" {
+  rest_api_id   = aws_api_gateway_rest_api.payment_api_gateway.id
+  resource_id   = aws_api_gateway_resource.payments_batch_resource.id
+  http_method   = "POST"
+  authorization = "CUSTOM" # One authorizer check for the whole batch
+  authorizer_id = aws_api_gateway_authorizer.fusionauth_authorizer.id
+}
+
+# API Gateway Integration: POST /payments/batch to Payment Processor Lambda
+resource "aws_api_gateway_integration" "post_payments_batch_integration" {
+  rest_api_id             = aws_api_gateway_rest_api.payment_api_gateway.id
+  resource_id             = aws_api_gateway_resource.payments_batch_resource.id
+  http_method             = aws_api_gateway_method.post_payments_batch_method.http_method
+  integration_http_method = "POST" # Lambda Proxy integration uses POST
+  type                    = "AWS_PROXY" # Lambda Proxy integration
+  uri                     = aws_lambda_function.payment_processor_lambda.invoke_arn
+}
+
 # API Gateway Method: GET /payments (List Payments)
 resource "aws_api_gateway_method" "get_payments_method" {
   rest_api_id   = aws_api_gateway_rest_api.payment_api_gateway.id
@@ -332,6 +954,43 @@ resource "aws_api_gateway_integration" "get_payment_by_id_integration" {
   }
 }
 
+# API Gateway Resource: /payments/{paymentId}/wait
+resource "aws_api_gateway_resource" "payment_wait_resource" {
+  rest_api_id = aws_api_gateway_rest_api.payment_api_gateway.id
+  parent_id   = aws_api_gateway_resource.payment_id_resource.id
+  path_part   = "wait"
+}
+
+# API Gateway Method: GET /payments/{paymentId}/wait (Long-poll until the payment's status changes)
+resource "aws_api_gateway_method" "get_payment_wait_method" {
+  rest_api_id   = aws_api_gateway_rest_api.payment_api_gateway.id
+  resource_id   = aws_api_gateway_resource.payment_wait_resource.id
+  http_method   = "GET"
+  authorization = "CUSTOM" # Use custom authorizer
+  authorizer_id = aws_api_gateway_authorizer.fusionauth_authorizer.id
+
+  request_parameters = {
+    "method.request.path.paymentId"      = true
+    "method.request.querystring.timeout" = false
+    "method.request.querystring.status"  = false
+  }
+}
+
+# API Gateway Integration: GET /payments/{paymentId}/wait to Payment Processor Lambda
+resource "aws_api_gateway_integration" "get_payment_wait_integration" {
+  rest_api_id             = aws_api_gateway_rest_api.payment_api_gateway.id
+  resource_id             = aws_api_gateway_resource.payment_wait_resource.id
+  http_method             = aws_api_gateway_method.get_payment_wait_method.http_method
+  integration_http_method = "POST" # Lambda Proxy integration uses POST
+  type                    = "AWS_PROXY" # Lambda Proxy integration
+  uri                     = aws_lambda_function.payment_processor_lambda.invoke_arn
+  timeout_milliseconds    = 29000 # the maximum; PAYMENT_WAIT_MAX_SECONDS stays below it
+
+  request_parameters = {
+    "integration.request.path.paymentId" = "method.request.path.paymentId"
+  }
+}
+
 # Permission for API Gateway to invoke the Payment Processor Lambda
 resource "aws_lambda_permission" "api_gateway_payment_processor_permission" {
   statement_id  = "AllowAPIGatewayInvokePaymentProcessor"
@@ -355,10 +1014,16 @@ resource "aws_api_gateway_deployment" "payment_api_deployment" {
       aws_api_gateway_resource.payment_id_resource.id,
       aws_api_gateway_method.post_payments_method.id,
       aws_api_gateway_integration.post_payments_integration.id,
+      aws_api_gateway_resource.payments_batch_resource.id,
+      aws_api_gateway_method.post_payments_batch_method.id,
+      aws_api_gateway_integration.post_payments_batch_integration.id,
       aws_api_gateway_method.get_payments_method.id,
       aws_api_gateway_integration.get_payments_integration.id,
       aws_api_gateway_method.get_payment_by_id_method.id,
       aws_api_gateway_integration.get_payment_by_id_integration.id,
+      aws_api_gateway_resource.payment_wait_resource.id,
+      aws_api_gateway_method.get_payment_wait_method.id,
+      aws_api_gateway_integration.get_payment_wait_integration.id,
       aws_api_gateway_authorizer.fusionauth_authorizer.id # Include authorizer in triggers
     ]))
   }
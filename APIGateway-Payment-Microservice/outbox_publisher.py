@@ -0,0 +1,67 @@
+#########################################
+#Payment Outbox Publisher Lambda Code
+#########################################
+# outbox_publisher.py
+#
+# With PAYMENT_HANDOFF_MODE=outbox the payment processor only writes the
+# payment to DynamoDB. This function reads the new items from the table's
+# stream and sends the same SQS message the processor used to send, so a
+# payment is queued exactly when it was stored (at least once: a retried
+# stream batch can send a message twice).
+from payment_processor import SQS_QUEUE_URL, get_sqs, payment_message_body
+from structured_logging import get_logger, set_request_id
+
+logger = get_logger('outbox_publisher')
+
+# SendMessageBatch accepts at most 10 messages per call
+MAX_SEND_BATCH = 10
+
+_deserializer = None
+
+def new_payment(record):
+    """Returns the payment item inserted by a stream record, or None for anything else."""
+    global _deserializer
+    if record.get('eventName') != 'INSERT':
+        return None
+    image = record['dynamodb'].get('NewImage', {})
+    if image.get('handoff', {}).get('S') != 'outbox':
+        return None
+    if _deserializer is None:
+        from boto3.dynamodb.types import TypeDeserializer
+        _deserializer = TypeDeserializer()
+    item = {key: _deserializer.deserialize(value) for key, value in image.items()}
+    item.pop('handoff')
+    return item
+
+def lambda_handler(event, context):
+    """
+    DynamoDB stream handler. Returns batchItemFailures keyed by sequence
+    number, so Lambda retries the stream from the first record that was not sent.
+    """
+    set_request_id(getattr(context, 'aws_request_id', None))
+    pending = [] # (sequence number, payment item)
+    for record in event['Records']:
+        item = new_payment(record)
+        if item is not None:
+            pending.append((record['dynamodb']['SequenceNumber'], item))
+
+    for start in range(0, len(pending), MAX_SEND_BATCH):
+        chunk = pending[start:start + MAX_SEND_BATCH]
+        entries = [
+            {'Id': str(index), 'MessageBody': payment_message_body(item)}
+            for index, (_, item) in enumerate(chunk)
+        ]
+        try:
+            response = get_sqs().send_message_batch(QueueUrl=SQS_QUEUE_URL, Entries=entries)
+            failed_indexes = sorted(int(failure['Id']) for failure in response.get('Failed', []))
+        except Exception as e:
+            logger.error("SendMessageBatch failed for %d payments: %s", len(entries), e)
+            failed_indexes = [0]
+        if failed_indexes:
+            # Stream records are retried from the reported sequence number onwards, in order
+            sequence_number = chunk[failed_indexes[0]][0]
+            logger.warning("Could not publish payment outbox records from sequence number %s", sequence_number)
+            return {'batchItemFailures': [{'itemIdentifier': sequence_number}]}
+
+    logger.info("Published %d payments from the outbox", len(pending))
+    return {'batchItemFailures': []}
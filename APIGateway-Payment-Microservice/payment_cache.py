@@ -0,0 +1,209 @@
+#######################################################
+#Read-through Cache for GET /payments/{paymentId}
+#######################################################
+# payment_cache.py
+#
+# Clients poll a payment hard while it is PENDING. With a cache backend
+# configured, handle_get_payment serves repeat reads from the cache instead of
+# a DynamoDB GetItem:
+#   none   - every read goes to DynamoDB (the default)
+#   memory - a TTL LRU inside the Lambda container; entries are only ever
+#            dropped by their TTL, so PAYMENT_CACHE_TTL_SECONDS bounds how
+#            stale a status can be
+#   redis  - a Redis-compatible server shared by every container; entries are
+#            also deleted by payment_change_feed when a payment changes
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from structured_logging import get_logger
+
+logger = get_logger('payment_cache')
+
+PAYMENT_CACHE_BACKEND = os.environ.get('PAYMENT_CACHE_BACKEND', 'none')
+PAYMENT_CACHE_TTL_SECONDS = float(os.environ.get('PAYMENT_CACHE_TTL_SECONDS', '5'))
+PAYMENT_CACHE_MAX_ENTRIES = int(os.environ.get('PAYMENT_CACHE_MAX_ENTRIES', '10000'))
+PAYMENT_CACHE_REDIS_URL = os.environ.get('PAYMENT_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+# Cache metrics are written as one CloudWatch embedded-metric log line per interval, not per request
+PAYMENT_CACHE_STATS_INTERVAL = float(os.environ.get('PAYMENT_CACHE_STATS_INTERVAL', '60'))
+METRICS_NAMESPACE = 'PaymentService'
+
+# Counters since the container started; read_units_saved is what the hits would have cost in GetItem
+cache_counts = {'hits': 0, 'misses': 0, 'errors': 0, 'not_modified': 0, 'read_units_saved': 0.0}
+
+_cache = None
+_reported_counts = dict(cache_counts)
+_reported_at = time.time()
+
+
+class MemoryCache:
+    """Bounded LRU of cache entries that expire `ttl_seconds` after they were stored."""
+
+    def __init__(self, max_entries=10000, ttl_seconds=5):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict() # paymentId -> (expires_at, entry)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None or cached[0] <= now:
+                if cached is not None:
+                    del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return cached[1]
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class RedisCache:
+    """
+    Cache entries stored as JSON strings under `prefix` + paymentId.
+
+    `client` only needs redis-py's get(name), set(name, value, px=ttl_ms) and
+    delete(*names), so tests can pass a dict-backed fake.
+    """
+
+    def __init__(self, client, ttl_seconds=5, prefix='payment:'):
+        self.client = client
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, ttl_seconds=5):
+        import redis # only needed with PAYMENT_CACHE_BACKEND=redis
+        # A slow cache must not be slower than the GetItem it replaces
+        return cls(redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.1), ttl_seconds)
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, entry):
+        self.client.set(self.prefix + key, json.dumps(entry, separators=(',', ':')), px=self.ttl_ms)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+
+def get_cache():
+    """Returns the container-wide cache for PAYMENT_CACHE_BACKEND, or None when caching is off."""
+    global _cache
+    if _cache is None and PAYMENT_CACHE_BACKEND != 'none':
+        if PAYMENT_CACHE_BACKEND == 'memory':
+            _cache = MemoryCache(PAYMENT_CACHE_MAX_ENTRIES, PAYMENT_CACHE_TTL_SECONDS)
+        elif PAYMENT_CACHE_BACKEND == 'redis':
+            _cache = RedisCache.from_url(PAYMENT_CACHE_REDIS_URL, PAYMENT_CACHE_TTL_SECONDS)
+        else:
+            raise ValueError(f"Unknown PAYMENT_CACHE_BACKEND: {PAYMENT_CACHE_BACKEND}")
+    return _cache
+
+
+def etag(body):
+    """Strong ETag of a response body."""
+    return '"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match, current_etag):
+    """True if an If-None-Match header value lists `current_etag` (weak comparison) or is '*'."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == current_etag:
+            return True
+    return False
+
+
+def read_through(payment_id, load):
+    """
+    Returns the cache entry for `payment_id`, calling `load(payment_id)` and
+    caching its result on a miss. Entries are payment_processor.payment_entry
+    dicts (response body, ETag, owner, status and the read units the load
+    consumed). Misses are not cached, and a failing cache falls back to `load`.
+    """
+    cache = get_cache()
+    if cache is None:
+        return load(payment_id)
+
+    try:
+        entry = cache.get(payment_id)
+    except Exception as e:
+        cache_counts['errors'] += 1
+        logger.warning("Payment cache read failed: %s", e)
+        return load(payment_id)
+
+    if entry is not None:
+        cache_counts['hits'] += 1
+        cache_counts['read_units_saved'] += entry.get('readUnits', 0)
+        return entry
+
+    cache_counts['misses'] += 1
+    entry = load(payment_id)
+    if entry is not None:
+        try:
+            cache.set(payment_id, entry)
+        except Exception as e:
+            cache_counts['errors'] += 1
+            logger.warning("Payment cache write failed: %s", e)
+    return entry
+
+
+def invalidate(payment_ids):
+    """Drops the cached entries of `payment_ids`."""
+    cache = get_cache()
+    if cache is not None and payment_ids:
+        cache.delete(*payment_ids)
+
+
+def report_stats(now=None):
+    """
+    Logs the counters accumulated since the last report as CloudWatch embedded
+    metrics, at most once per PAYMENT_CACHE_STATS_INTERVAL.
+    """
+    global _reported_counts, _reported_at
+    now = time.time() if now is None else now
+    if get_cache() is None or now - _reported_at < PAYMENT_CACHE_STATS_INTERVAL:
+        return
+    delta = {key: cache_counts[key] - _reported_counts[key] for key in cache_counts}
+    _reported_counts, _reported_at = dict(cache_counts), now
+
+    lookups = delta['hits'] + delta['misses']
+    if not lookups and not delta['not_modified']:
+        return
+    metrics = {
+        'PaymentCacheHits': (delta['hits'], 'Count'),
+        'PaymentCacheMisses': (delta['misses'], 'Count'),
+        'PaymentCacheErrors': (delta['errors'], 'Count'),
+        'PaymentCacheHitRatio': (delta['hits'] / lookups * 100 if lookups else 0.0, 'Percent'),
+        'PaymentNotModified': (delta['not_modified'], 'Count'),
+        'DynamoDBReadUnitsSaved': (delta['read_units_saved'], 'None'),
+    }
+    fields = {name: value for name, (value, _) in metrics.items()}
+    fields['CacheBackend'] = PAYMENT_CACHE_BACKEND
+    fields['_aws'] = {
+        'Timestamp': int(now * 1000),
+        'CloudWatchMetrics': [{
+            'Namespace': METRICS_NAMESPACE,
+            'Dimensions': [['CacheBackend']],
+            'Metrics': [{'Name': name, 'Unit': unit} for name, (_, unit) in metrics.items()],
+        }],
+    }
+    logger.info("Payment cache stats", extra={'fields': fields})
@@ -0,0 +1,61 @@
+#########################################
+#Payment Change Feed Lambda Code
+#########################################
+# payment_change_feed.py
+#
+# Reads updates and deletes from the payments table's stream, e.g. the queue
+# consumer moving a payment out of PENDING, and
+# - deletes the payment's shared (redis) payment_cache entry, so
+#   GET /payments/{paymentId} does not serve the old status until its TTL
+#   runs out;
+# - publishes the updated payment through payment_notifier, which answers
+#   the GET /payments/{paymentId}/wait requests waiting on it.
+# A table stream should not have more than two readers per shard (the outbox
+# publisher is the other one), hence one function for both.
+import payment_cache
+import payment_notifier
+from payment_processor import payment_entry
+from structured_logging import get_logger, set_request_id
+
+logger = get_logger('payment_change_feed')
+
+_deserializer = None
+
+def updated_payment(record):
+    """Returns the payment item written by a MODIFY stream record."""
+    global _deserializer
+    if _deserializer is None:
+        from boto3.dynamodb.types import TypeDeserializer
+        _deserializer = TypeDeserializer()
+    image = record['dynamodb'].get('NewImage', {})
+    return {key: _deserializer.deserialize(value) for key, value in image.items()}
+
+def lambda_handler(event, context):
+    """
+    DynamoDB stream handler. A failed delete or publish raises, so Lambda
+    retries the batch; deleting an entry or notifying a change twice is harmless.
+    """
+    set_request_id(getattr(context, 'aws_request_id', None))
+    changed_ids = set()
+    updates = {} # paymentId -> latest payment_entry in this batch
+    for record in event['Records']:
+        if record.get('eventName') not in ('MODIFY', 'REMOVE'):
+            continue
+        payment_id = record['dynamodb']['Keys']['paymentId']['S']
+        changed_ids.add(payment_id)
+        if record['eventName'] == 'MODIFY' and 'NewImage' in record['dynamodb']:
+            updates[payment_id] = payment_entry(updated_payment(record))
+        else:
+            updates.pop(payment_id, None)
+
+    # An in-process cache lives in the API's containers and cannot be reached from here
+    if payment_cache.PAYMENT_CACHE_BACKEND == 'redis':
+        payment_cache.invalidate(sorted(changed_ids))
+
+    notifier = payment_notifier.get_notifier()
+    listeners = 0
+    if notifier is not None:
+        for payment_id, entry in updates.items():
+            listeners += notifier.publish(payment_id, entry) or 0
+
+    logger.info("Processed %d changed payments, %d waiting requests notified", len(changed_ids), listeners)
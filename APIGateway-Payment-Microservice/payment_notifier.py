@@ -0,0 +1,124 @@
+#######################################################
+#Payment Change Notifications for Long-polling GETs
+#######################################################
+# payment_notifier.py
+#
+# GET /payments/{paymentId}/wait holds the request open until the payment
+# changes. Changes come from the table's stream: payment_change_feed
+# publishes every updated payment here, and a waiting handler subscribes to
+# that payment before it reads it, so no change can slip in between:
+#   none   - no notifications; the handler re-reads the payment every
+#            PAYMENT_WAIT_POLL_SECONDS instead
+#   memory - in-process, for a process that both publishes and waits
+#            (local runs and the benchmarks)
+#   redis  - Redis pub/sub, one channel per payment; what main.tf deploys,
+#            on an ElastiCache cluster in the payments VPC
+import json
+import os
+import threading
+import time
+
+PAYMENT_NOTIFIER_BACKEND = os.environ.get('PAYMENT_NOTIFIER_BACKEND', 'none')
+PAYMENT_NOTIFIER_REDIS_URL = os.environ.get('PAYMENT_NOTIFIER_REDIS_URL', 'redis://localhost:6379/0')
+
+_notifier = None
+
+
+class MemorySubscription:
+    def __init__(self, notifier, payment_id):
+        self.notifier = notifier
+        self.payment_id = payment_id
+        self._event = threading.Event()
+        self._message = None
+
+    def deliver(self, message):
+        self._message = message
+        self._event.set()
+
+    def wait(self, timeout):
+        """Returns the first message published after subscribing, or None after `timeout` seconds."""
+        return self._message if self._event.wait(timeout) else None
+
+    def close(self):
+        self.notifier.unsubscribe(self)
+
+
+class MemoryNotifier:
+    """Delivers each published message to the subscriptions open on that payment at the time."""
+
+    def __init__(self):
+        self._subscriptions = {} # paymentId -> set of MemorySubscription
+        self._lock = threading.Lock()
+
+    def subscribe(self, payment_id):
+        subscription = MemorySubscription(self, payment_id)
+        with self._lock:
+            self._subscriptions.setdefault(payment_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.payment_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.payment_id, None)
+
+    def publish(self, payment_id, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(payment_id, ()))
+        for subscription in subscriptions:
+            subscription.deliver(message)
+        return len(subscriptions)
+
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    def wait(self, timeout):
+        """Returns the first message published after subscribing, or None after `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            message = self.pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None and message['type'] == 'message':
+                return json.loads(message['data'])
+
+    def close(self):
+        self.pubsub.close()
+
+
+class RedisNotifier:
+    """Publishes messages as JSON on `prefix` + paymentId with Redis PUBLISH."""
+
+    def __init__(self, client, prefix='payment-changes:'):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url):
+        import redis # only needed with PAYMENT_NOTIFIER_BACKEND=redis
+        return cls(redis.Redis.from_url(url, socket_connect_timeout=0.1))
+
+    def subscribe(self, payment_id):
+        pubsub = self.client.pubsub()
+        pubsub.subscribe(self.prefix + payment_id)
+        return RedisSubscription(pubsub)
+
+    def publish(self, payment_id, message):
+        return self.client.publish(self.prefix + payment_id, json.dumps(message, separators=(',', ':')))
+
+
+def get_notifier():
+    """Returns the container-wide notifier for PAYMENT_NOTIFIER_BACKEND, or None when it is 'none'."""
+    global _notifier
+    if _notifier is None and PAYMENT_NOTIFIER_BACKEND != 'none':
+        if PAYMENT_NOTIFIER_BACKEND == 'memory':
+            _notifier = MemoryNotifier()
+        elif PAYMENT_NOTIFIER_BACKEND == 'redis':
+            _notifier = RedisNotifier.from_url(PAYMENT_NOTIFIER_REDIS_URL)
+        else:
+            raise ValueError(f"Unknown PAYMENT_NOTIFIER_BACKEND: {PAYMENT_NOTIFIER_BACKEND}")
+    return _notifier
@@ -2,191 +2,535 @@
 #Payment Processor Lambda Code
 #########################################
 # payment_processor.py
+import base64
 import json
+import math
 import os
+import random
+import time
 import uuid
-import boto3
 from datetime import datetime
 
+import api_responses
+import payment_cache
+import payment_notifier
+from api_router import Router
+from payment_validation import validate_payment_request
+from structured_logging import get_logger, log_event, set_request_id
+
+logger = get_logger('payment_processor')
+
+# Handlers register with @router.route(method, resource template) below
+router = Router()
+
 # --- AWS Clients ---
-dynamodb = boto3.resource('dynamodb')
-sqs = boto3.client('sqs')
+# Created on first use and reused while the container is warm, so a cold start that
+# only returns a 400 never pays for importing boto3 or building a client.
+_dynamodb = None
+_sqs = None
+_handoff_executor = None
 
 # --- Configuration ---
 DYNAMODB_TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME', 'payments')
 SQS_QUEUE_URL = os.environ.get('SQS_QUEUE_URL', 'YOUR_SQS_QUEUE_URL') # Will be set by Terraform
+# Global secondary index on userId (hash) + createdAt (range) used to list a user's payments
+PAYMENTS_BY_USER_INDEX = os.environ.get('PAYMENTS_BY_USER_INDEX', 'userId-createdAt-index')
+# How a new payment reaches the queue:
+#   sequential - put_item, then send_message (latency is the sum of both)
+#   concurrent - both calls in parallel (latency is the slower of the two)
+#   outbox     - put_item only; outbox_publisher forwards the item from the table's stream,
+#                so a payment is queued if and only if it was stored
+PAYMENT_HANDOFF_MODE = os.environ.get('PAYMENT_HANDOFF_MODE', 'sequential')
+LIST_PAYMENTS_DEFAULT_LIMIT = 25
+# Largest number of payments accepted by one POST /payments/batch request
+PAYMENTS_BATCH_MAX_ITEMS = int(os.environ.get('PAYMENTS_BATCH_MAX_ITEMS', '500'))
+# BatchWriteItem takes at most 25 puts per call, SendMessageBatch at most 10 messages
+BATCH_WRITE_CHUNK = 25
+SEND_MESSAGE_BATCH_CHUNK = 10
+# A page stops early, with a nextToken, once its body would pass this many bytes;
+# API Gateway's Lambda proxy integration rejects responses over 6 MB
+LIST_PAYMENTS_MAX_LIMIT = 1000
+LIST_PAYMENTS_MAX_BYTES = int(os.environ.get('LIST_PAYMENTS_MAX_BYTES', str(1024 * 1024)))
+# GET /payments/{paymentId}/wait: API Gateway gives up on an integration after 29 seconds
+PAYMENT_WAIT_DEFAULT_SECONDS = 20
+PAYMENT_WAIT_MAX_SECONDS = float(os.environ.get('PAYMENT_WAIT_MAX_SECONDS', '25'))
+# How often the wait re-reads the payment when PAYMENT_NOTIFIER_BACKEND is 'none'
+PAYMENT_WAIT_POLL_SECONDS = float(os.environ.get('PAYMENT_WAIT_POLL_SECONDS', '2'))
+
+def get_dynamodb():
+    """Returns the container-wide DynamoDB resource, creating it on first use."""
+    global _dynamodb
+    if _dynamodb is None:
+        import boto3
+        _dynamodb = boto3.resource('dynamodb')
+    return _dynamodb
+
+def get_sqs():
+    """Returns the container-wide SQS client, creating it on first use."""
+    global _sqs
+    if _sqs is None:
+        import boto3
+        _sqs = boto3.client('sqs')
+    return _sqs
+
+def get_handoff_executor():
+    """Two threads, enough to run the DynamoDB write and the SQS send side by side."""
+    global _handoff_executor
+    if _handoff_executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _handoff_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='handoff')
+    return _handoff_executor
+
+# Stored on payment items for the service's own bookkeeping, never returned by the API
+INTERNAL_ATTRIBUTES = ('handoff',)
+
+def public_payment(item):
+    """A stored payment item as the API returns it, i.e. without INTERNAL_ATTRIBUTES."""
+    return {key: value for key, value in item.items() if key not in INTERNAL_ATTRIBUTES}
+
+def payment_message_body(payment_item):
+    """The SQS message announcing a new payment, shared with outbox_publisher."""
+    return api_responses.dumps({
+        'paymentId': payment_item['paymentId'],
+        'action': 'process_payment',
+        'details': payment_item
+    })
+
+def store_and_enqueue(payment_item):
+    """Stores a new payment and hands it to the queue according to PAYMENT_HANDOFF_MODE."""
+    table = get_dynamodb().Table(DYNAMODB_TABLE_NAME)
+
+    if PAYMENT_HANDOFF_MODE == 'outbox':
+        # The stream carries the item to SQS; 'handoff' is what the publisher's event filter matches
+        table.put_item(Item={**payment_item, 'handoff': 'outbox'})
+        logger.info("Payment %s stored in DynamoDB, queued through the outbox.", payment_item['paymentId'])
+        return
+
+    def put():
+        table.put_item(Item=payment_item)
+
+    def send():
+        get_sqs().send_message(QueueUrl=SQS_QUEUE_URL, MessageBody=payment_message_body(payment_item))
+
+    if PAYMENT_HANDOFF_MODE == 'concurrent':
+        # Both calls always run to completion; the first error (if any) is raised after both finish
+        futures = [get_handoff_executor().submit(put), get_handoff_executor().submit(send)]
+        errors = [error for error in (future.exception() for future in futures) if error is not None]
+        if errors:
+            raise errors[0]
+    else:
+        put()
+        send()
+    logger.info("Payment %s stored in DynamoDB and sent to SQS.", payment_item['paymentId'])
 
 def lambda_handler(event, context):
     """
     Lambda handler for payment processing.
-    Handles POST requests to create payments and GET requests to retrieve payments.
+    Dispatches to the handler registered for the event's method and resource.
     """
-    print(f"Payment Processor event: {json.dumps(event)}")
+    set_request_id(getattr(context, 'aws_request_id', None))
+    log_event(logger, event, "Payment Processor event")
+    return router.dispatch(event)
 
-    http_method = event.get('httpMethod')
-    path = event.get('path')
+def build_payment_item(payment, user_id, timestamp):
+    """
+    Validates one requested payment against the PaymentRequest schema and
+    returns the item to store; raises ValueError if it is invalid.
+    """
+    validate_payment_request(payment)
 
-    if http_method == 'POST' and path == '/payments':
-        return handle_create_payment(event)
-    elif http_method == 'GET' and path.startswith('/payments/'):
-        return handle_get_payment(event)
-    elif http_method == 'GET' and path == '/payments':
-        return handle_list_payments(event)
-    else:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'message': 'Unsupported HTTP method or path'})
-        }
+    return {
+        'paymentId': str(uuid.uuid4()),
+        'userId': user_id,
+        'amount': payment['amount'],
+        'currency': payment['currency'],
+        'description': payment.get('description'),
+        'status': 'PENDING', # Initial status
+        'createdAt': timestamp,
+        'updatedAt': timestamp
+    }
 
+@router.route('POST', '/payments')
 def handle_create_payment(event):
     """Handles the creation of a new payment."""
     try:
-        body = json.loads(event.get('body', '{}'))
-        amount = body.get('amount')
-        currency = body.get('currency')
-        description = body.get('description')
+        # Decimal, not float: DynamoDB rejects float numbers
+        try:
+            body = api_responses.loads(event.get('body') or '{}')
+        except ValueError: # not JSON, or NaN/Infinity
+            return api_responses.error_response('invalid_json')
         user_id = event.get('requestContext', {}).get('authorizer', {}).get('principalId', 'anonymous') # From Authorizer
+        timestamp = datetime.utcnow().isoformat() + 'Z' # ISO 8601 format
 
-        if not all([amount, currency]):
-            return {
-                'statusCode': 400,
-                'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({'message': 'Missing required fields: amount, currency'})
-            }
+        try:
+            payment_item = build_payment_item(body, user_id, timestamp)
+        except ValueError as e:
+            return api_responses.message_response(400, str(e))
+        payment_id = payment_item['paymentId']
 
-        payment_id = str(uuid.uuid4())
-        timestamp = datetime.utcnow().isoformat() + 'Z' # ISO 8601 format
+        # Store in DynamoDB and send to SQS for asynchronous processing
+        store_and_enqueue(payment_item)
 
-        payment_item = {
+        return api_responses.json_response(202, { # Accepted for processing
+            'message': 'Payment request accepted for processing',
             'paymentId': payment_id,
-            'userId': user_id,
-            'amount': amount,
-            'currency': currency,
-            'description': description,
-            'status': 'PENDING', # Initial status
-            'createdAt': timestamp,
-            'updatedAt': timestamp
-        }
-
-        # Store in DynamoDB
-        table = dynamodb.Table(DYNAMODB_TABLE_NAME)
-        table.put_item(Item=payment_item)
-        print(f"Payment {payment_id} stored in DynamoDB.")
-
-        # Send message to SQS for asynchronous processing
-        sqs.send_message(
-            QueueUrl=SQS_QUEUE_URL,
-            MessageBody=json.dumps({
-                'paymentId': payment_id,
-                'action': 'process_payment',
-                'details': payment_item
-            })
-        )
-        print(f"Message for payment {payment_id} sent to SQS.")
-
-        return {
-            'statusCode': 202, # Accepted for processing
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({
-                'message': 'Payment request accepted for processing',
-                'paymentId': payment_id,
-                'status': 'PENDING'
-            })
-        }
-
-    except json.JSONDecodeError:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'message': 'Invalid JSON body'})
-        }
+            'status': 'PENDING'
+        })
+
+    except Exception as e:
+        logger.error("Error creating payment: %s", e)
+        return api_responses.message_response(500, f'Internal server error: {str(e)}')
+
+def batch_write_payments(items, max_attempts=5, base_delay=0.05):
+    """
+    Writes `items` with BatchWriteItem, 25 per call, retrying UnprocessedItems
+    with exponential backoff and full jitter. Returns the paymentIds that
+    could not be written.
+    """
+    client = get_dynamodb().meta.client
+    failed = set()
+    for start in range(0, len(items), BATCH_WRITE_CHUNK):
+        request_items = {DYNAMODB_TABLE_NAME: [{'PutRequest': {'Item': item}} for item in items[start:start + BATCH_WRITE_CHUNK]]}
+        for attempt in range(max_attempts):
+            try:
+                request_items = client.batch_write_item(RequestItems=request_items).get('UnprocessedItems') or {}
+            except Exception as e:
+                logger.error("BatchWriteItem failed for %d payments: %s", len(request_items[DYNAMODB_TABLE_NAME]), e)
+                break
+            if not request_items:
+                break
+            if attempt < max_attempts - 1:
+                time.sleep(random.uniform(0, base_delay * (2 ** attempt)))
+        failed.update(request['PutRequest']['Item']['paymentId'] for request in request_items.get(DYNAMODB_TABLE_NAME, []))
+    return failed
+
+def send_payment_messages(items):
+    """Sends one message per payment with SendMessageBatch, 10 per call. Returns the paymentIds that were not sent."""
+    failed = set()
+    for start in range(0, len(items), SEND_MESSAGE_BATCH_CHUNK):
+        chunk = items[start:start + SEND_MESSAGE_BATCH_CHUNK]
+        entries = [{'Id': str(index), 'MessageBody': payment_message_body(item)} for index, item in enumerate(chunk)]
+        try:
+            response = get_sqs().send_message_batch(QueueUrl=SQS_QUEUE_URL, Entries=entries)
+            failed.update(chunk[int(failure['Id'])]['paymentId'] for failure in response.get('Failed', []))
+        except Exception as e:
+            logger.error("SendMessageBatch failed for %d payments: %s", len(entries), e)
+            failed.update(item['paymentId'] for item in chunk)
+    return failed
+
+@router.route('POST', '/payments/batch')
+def handle_create_payments_batch(event):
+    """
+    Creates up to PAYMENTS_BATCH_MAX_ITEMS payments from {"payments": [...]}.
+
+    Every payment is validated first; the valid ones are written with
+    BatchWriteItem and handed to the queue in batches (or through the outbox).
+    The response has one result per requested payment, in request order.
+    """
+    try:
+        body = api_responses.loads(event.get('body') or '{}')
+    except ValueError: # not JSON, or NaN/Infinity
+        return api_responses.error_response('invalid_json')
+
+    payments = body.get('payments') if isinstance(body, dict) else None
+    if not isinstance(payments, list) or not payments or len(payments) > PAYMENTS_BATCH_MAX_ITEMS:
+        return api_responses.message_response(400, f'Body must be {{"payments": [...]}} with 1 to {PAYMENTS_BATCH_MAX_ITEMS} payments')
+
+    user_id = event.get('requestContext', {}).get('authorizer', {}).get('principalId', 'anonymous') # From Authorizer
+    timestamp = datetime.utcnow().isoformat() + 'Z'
+    results = []
+    items = []
+    for index, payment in enumerate(payments):
+        try:
+            item = build_payment_item(payment, user_id, timestamp)
+        except ValueError as e:
+            results.append({'index': index, 'status': 'REJECTED', 'error': str(e)})
+            continue
+        items.append(item)
+        results.append({'index': index, 'paymentId': item['paymentId'], 'status': 'PENDING'})
+
+    outbox = PAYMENT_HANDOFF_MODE == 'outbox'
+    not_written = not_sent = set()
+    try:
+        # A batch with no valid payment is answered without any AWS call
+        if items:
+            not_written = batch_write_payments([{**item, 'handoff': 'outbox'} if outbox else item for item in items])
+            written = [item for item in items if item['paymentId'] not in not_written]
+            not_sent = set() if outbox else send_payment_messages(written)
     except Exception as e:
-        print(f"Error creating payment: {e}")
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'message': f'Internal server error: {str(e)}'})
-        }
+        logger.error("Error creating payment batch: %s", e)
+        return api_responses.message_response(500, f'Internal server error: {str(e)}')
+
+    for result in results:
+        if result.get('paymentId') in not_written:
+            result.update(status='FAILED', error='Payment could not be stored')
+        elif result.get('paymentId') in not_sent:
+            # Stored as PENDING but not queued; the outbox handoff mode avoids this case
+            result.update(status='FAILED', error='Payment stored but could not be queued for processing')
+
+    counts = {status: sum(1 for r in results if r['status'] == status) for status in ('PENDING', 'REJECTED', 'FAILED')}
+    logger.info("Payment batch: %d accepted, %d rejected, %d failed", counts['PENDING'], counts['REJECTED'], counts['FAILED'])
+    # 202 as soon as one payment was accepted; otherwise 400 if the input was at fault, 500 if we were
+    status_code = 202 if counts['PENDING'] else (500 if counts['FAILED'] else 400)
+    return api_responses.json_response(status_code, {
+        'accepted': counts['PENDING'],
+        'rejected': counts['REJECTED'],
+        'failed': counts['FAILED'],
+        'results': results
+    })
+
+def payment_entry(item, read_units=0.5):
+    """
+    What a GET needs to serve a payment item: the response body, its ETag, the
+    owner and status, and the read units it took to fetch. Cached by
+    payment_cache and published by payment_change_feed.
+    """
+    body = api_responses.dumps(public_payment(item))
+    return {
+        'userId': item.get('userId'),
+        'status': item.get('status'),
+        'body': body,
+        'etag': payment_cache.etag(body),
+        'readUnits': read_units,
+    }
 
+def load_payment(payment_id):
+    """Reads a payment from DynamoDB as a payment_entry, or returns None if it does not exist."""
+    table = get_dynamodb().Table(DYNAMODB_TABLE_NAME)
+    response = table.get_item(Key={'paymentId': payment_id}, ReturnConsumedCapacity='TOTAL')
+    item = response.get('Item')
+    if not item:
+        return None
+    # An eventually consistent read of up to 4 KB costs 0.5 units
+    return payment_entry(item, response.get('ConsumedCapacity', {}).get('CapacityUnits', 0.5))
+
+@router.route('GET', '/payments/{paymentId}')
 def handle_get_payment(event):
-    """Retrieves a single payment by ID."""
+    """
+    Retrieves a single payment by ID, through payment_cache when a backend is configured.
+    Responses carry an ETag; a matching If-None-Match gets a 304 without a body.
+    """
     try:
         path_parameters = event.get('pathParameters', {})
         payment_id = path_parameters.get('paymentId')
         user_id = event.get('requestContext', {}).get('authorizer', {}).get('principalId', 'anonymous')
 
         if not payment_id:
-            return {
-                'statusCode': 400,
-                'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({'message': 'Missing paymentId in path'})
-            }
+            return api_responses.error_response('missing_payment_id')
 
-        table = dynamodb.Table(DYNAMODB_TABLE_NAME)
-        response = table.get_item(Key={'paymentId': payment_id})
-        item = response.get('Item')
+        entry = payment_cache.read_through(payment_id, load_payment)
 
-        if not item:
-            return {
-                'statusCode': 404,
-                'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({'message': 'Payment not found'})
-            }
+        if not entry:
+            return api_responses.error_response('not_found')
 
         # Optional: Ensure the user is authorized to view this payment
-        if item.get('userId') != user_id and user_id != 'admin': # Example: allow admin or owner
-             return {
-                'statusCode': 403,
-                'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({'message': 'Forbidden: You do not have access to this payment'})
+        if entry['userId'] != user_id and user_id != 'admin': # Example: allow admin or owner
+             return api_responses.error_response('forbidden')
+
+        headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+        if payment_cache.etag_matches(headers.get('if-none-match'), entry['etag']):
+            payment_cache.cache_counts['not_modified'] += 1
+            return {
+                'statusCode': 304,
+                'headers': {'ETag': entry['etag']},
+                'body': ''
             }
 
-        return {
-            'statusCode': 200,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps(item)
-        }
+        return api_responses.encoded_response(200, entry['body'], {'ETag': entry['etag']})
+
+    except Exception as e:
+        logger.error("Error getting payment: %s", e)
+        return api_responses.message_response(500, f'Internal server error: {str(e)}')
+    finally:
+        payment_cache.report_stats()
+
+def wait_for_change(payment_id, entry, known_status, timeout, subscription=None):
+    """
+    Returns the payment's entry once its status differs from `known_status`, or
+    the latest entry seen after `timeout` seconds. Changes arrive on
+    `subscription` (a payment_notifier subscription opened before `entry` was
+    read); without one the payment is re-read every PAYMENT_WAIT_POLL_SECONDS.
+    """
+    deadline = time.monotonic() + timeout
+    while entry['status'] == known_status:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if subscription is None:
+            time.sleep(min(PAYMENT_WAIT_POLL_SECONDS, remaining))
+            entry = load_payment(payment_id) or entry
+        else:
+            message = subscription.wait(remaining)
+            if message is None:
+                break
+            entry = message
+    return entry
+
+@router.route('GET', '/payments/{paymentId}/wait')
+def handle_wait_payment(event):
+    """
+    Long-polls a payment: GET /payments/{paymentId}/wait?timeout=<seconds>&status=<known status>.
+    Answers as soon as the payment's status differs from `status` (default PENDING), or
+    with the unchanged payment after `timeout` seconds (default 20, at most PAYMENT_WAIT_MAX_SECONDS).
+    X-Payment-Wait says which of the two happened.
+    """
+    try:
+        payment_id = (event.get('pathParameters') or {}).get('paymentId')
+        user_id = event.get('requestContext', {}).get('authorizer', {}).get('principalId', 'anonymous')
+        params = event.get('queryStringParameters') or {}
+
+        if not payment_id:
+            return api_responses.error_response('missing_payment_id')
+        try:
+            timeout = float(params.get('timeout', PAYMENT_WAIT_DEFAULT_SECONDS))
+            # float() also parses 'nan' and 'inf'; a NaN deadline never expires
+            if not math.isfinite(timeout):
+                raise ValueError(timeout)
+        except ValueError:
+            return api_responses.message_response(400, 'Invalid query parameters: timeout must be a number of seconds')
+        timeout = min(max(timeout, 0.0), PAYMENT_WAIT_MAX_SECONDS)
+        known_status = params.get('status', 'PENDING')
+
+        # Subscribe before reading, so a change published in between is still delivered
+        notifier = payment_notifier.get_notifier() if timeout > 0 else None
+        subscription = None
+        if notifier is not None:
+            try:
+                subscription = notifier.subscribe(payment_id)
+            except Exception as e:
+                # Redis unreachable: still answer, re-reading the payment instead
+                logger.warning("Payment notifier unavailable, polling instead: %s", e)
+        try:
+            entry = load_payment(payment_id)
+            if not entry:
+                return api_responses.error_response('not_found')
+            if entry['userId'] != user_id and user_id != 'admin':
+                return api_responses.error_response('forbidden')
+            entry = wait_for_change(payment_id, entry, known_status, timeout, subscription)
+        finally:
+            if subscription is not None:
+                subscription.close()
+
+        return api_responses.encoded_response(200, entry['body'], {
+            'ETag': entry['etag'],
+            'X-Payment-Wait': 'timeout' if entry['status'] == known_status else 'changed',
+        })
 
     except Exception as e:
-        print(f"Error getting payment: {e}")
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'message': f'Internal server error: {str(e)}'})
-        }
+        logger.error("Error waiting for payment: %s", e)
+        return api_responses.message_response(500, f'Internal server error: {str(e)}')
+
+def encode_cursor(last_evaluated_key):
+    """Turns a DynamoDB LastEvaluatedKey into an opaque nextToken."""
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+def decode_cursor(next_token):
+    """Inverse of encode_cursor; raises ValueError for tokens we did not issue."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(next_token.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid nextToken: {e}")
+    if not isinstance(key, dict) or set(key) != {'paymentId', 'userId', 'createdAt'}:
+        raise ValueError("Invalid nextToken")
+    return key
+
+def created_at_bound(value, name):
+    """`value` of the `name` query parameter, if it is an ISO 8601 date or time like createdAt; raises ValueError."""
+    try:
+        datetime.fromisoformat(value[:-1] if value.endswith('Z') else value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 date or time, e.g. 2024-01-31T12:00:00Z")
+    return value
+
+def payment_cursor(item):
+    """The index key of a listed payment, i.e. the ExclusiveStartKey of the page after it."""
+    return encode_cursor({'paymentId': item['paymentId'], 'userId': item['userId'], 'createdAt': item['createdAt']})
+
+def query_user_payments(user_id, limit, exclusive_start_key=None, created_from=None, created_to=None, status=None):
+    """
+    Reads one page of a user's payments, newest first, from the userId/createdAt index.
+    Returns (items, last_evaluated_key).
+    """
+    from boto3.dynamodb.conditions import Attr, Key # only the list path needs the expression builders
+
+    key_condition = Key('userId').eq(user_id)
+    if created_from and created_to:
+        key_condition = key_condition & Key('createdAt').between(created_from, created_to)
+    elif created_from:
+        key_condition = key_condition & Key('createdAt').gte(created_from)
+    elif created_to:
+        key_condition = key_condition & Key('createdAt').lte(created_to)
 
+    query_kwargs = {
+        'IndexName': PAYMENTS_BY_USER_INDEX,
+        'KeyConditionExpression': key_condition,
+        'ScanIndexForward': False,
+        'Limit': limit,
+    }
+    if status:
+        # status is not part of the index key, so it can only be applied as a filter
+        query_kwargs['FilterExpression'] = Attr('status').eq(status)
+    if exclusive_start_key:
+        query_kwargs['ExclusiveStartKey'] = exclusive_start_key
+
+    table = get_dynamodb().Table(DYNAMODB_TABLE_NAME)
+    response = table.query(**query_kwargs)
+    return response.get('Items', []), response.get('LastEvaluatedKey')
+
+def iter_user_payments(user_id, page_limit, exclusive_start_key=None, **filters):
+    """
+    Yields a user's payments, newest first, reading `page_limit` index entries
+    per Query only when the caller asks for more. `filters` are passed to
+    query_user_payments.
+    """
+    while True:
+        items, exclusive_start_key = query_user_payments(user_id, page_limit, exclusive_start_key, **filters)
+        yield from items
+        if not exclusive_start_key:
+            return
+
+@router.route('GET', '/payments')
 def handle_list_payments(event):
-    """Retrieves a list of payments for the authenticated user."""
+    """
+    Retrieves a page of payments for the authenticated user.
+    Query string parameters: limit, nextToken, from, to (ISO 8601 createdAt bounds), status.
+    The page is encoded as the payments are read and ends early, with a nextToken,
+    at LIST_PAYMENTS_MAX_BYTES.
+    """
     try:
         user_id = event.get('requestContext', {}).get('authorizer', {}).get('principalId', 'anonymous')
 
         if user_id == 'anonymous':
-            return {
-                'statusCode': 403,
-                'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({'message': 'Authentication required to list payments'})
-            }
+            return api_responses.error_response('authentication_required')
 
-        table = dynamodb.Table(DYNAMODB_TABLE_NAME)
-        # In a real application, you'd likely use a GSI for userId to query efficiently
-        # For simplicity, this example scans and filters, which is not efficient for large tables.
-        # A better approach would be to use a Global Secondary Index (GSI) on userId.
-        response = table.scan(
-            FilterExpression=boto3.dynamodb.conditions.Attr('userId').eq(user_id)
-        )
-        items = response.get('Items', [])
+        params = event.get('queryStringParameters') or {}
+        try:
+            limit = min(max(int(params.get('limit', LIST_PAYMENTS_DEFAULT_LIMIT)), 1), LIST_PAYMENTS_MAX_LIMIT)
+            start_key = decode_cursor(params['nextToken']) if params.get('nextToken') else None
+            created_from = created_at_bound(params['from'], 'from') if params.get('from') else None
+            created_to = created_at_bound(params['to'], 'to') if params.get('to') else None
+            # DynamoDB compares the strings, and rejects a BETWEEN whose bounds are out of order
+            if created_from and created_to and created_from > created_to:
+                raise ValueError("from must not be later than to")
+        except ValueError as e:
+            return api_responses.message_response(400, f'Invalid query parameters: {str(e)}')
+        if start_key and start_key['userId'] != user_id:
+            return api_responses.message_response(400, 'Invalid query parameters: nextToken was issued to another user')
 
-        return {
-            'statusCode': 200,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps(items)
-        }
+        # One item more than the page needs, so the first Query usually also tells whether there is a next page
+        payments = iter_user_payments(
+            user_id,
+            limit + 1,
+            exclusive_start_key=start_key,
+            created_from=created_from,
+            created_to=created_to,
+            status=params.get('status'),
+        )
+        payments = (public_payment(item) for item in payments)
+        body, count = api_responses.encode_page(payments, limit, LIST_PAYMENTS_MAX_BYTES, payment_cursor)
+        logger.debug("Listed %d payments in %d bytes", count, len(body))
+        return api_responses.encoded_response(200, body)
 
     except Exception as e:
-        print(f"Error listing payments: {e}")
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'message': f'Internal server error: {str(e)}'})
-        }
+        logger.error("Error listing payments: %s", e)
+        return api_responses.message_response(500, f'Internal server error: {str(e)}')
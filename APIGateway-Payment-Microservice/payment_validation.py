@@ -0,0 +1,182 @@
+#######################################################
+#Payment Request Validation
+#######################################################
+# payment_validation.py
+#
+# payment_request_schema.json is the single definition of a valid payment
+# request: Terraform loads it with file() as the API Gateway model for
+# POST /payments, and this module compiles it once at import into a plain
+# Python validator for the requests that never pass through that model
+# (direct invocations, every item of POST /payments/batch, SQS consumers).
+#
+# Only the draft-04 keywords in SUPPORTED_KEYWORDS are compiled. A schema
+# using anything else fails at import rather than being checked less
+# strictly here than at the edge; scripts/check_payment_schema.py runs the
+# same compilation, and compares the results with the jsonschema package.
+import json
+import math
+import os
+import re
+from decimal import Decimal
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'payment_request_schema.json')
+
+SUPPORTED_KEYWORDS = frozenset({
+    '$schema', 'title', 'description', 'type', 'properties', 'required', 'additionalProperties',
+    'enum', 'minimum', 'maximum', 'exclusiveMinimum', 'exclusiveMaximum', 'minLength', 'maxLength', 'pattern',
+})
+
+
+def _is_finite_number(value):
+    # bool is an int in Python but never a JSON number, and NaN/Infinity are not JSON at all
+    # (json.loads still accepts them, and every comparison with NaN is False)
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return True
+    if isinstance(value, float):
+        return math.isfinite(value)
+    return isinstance(value, Decimal) and value.is_finite()
+
+
+_TYPE_CHECKS = {
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+    'string': lambda value: isinstance(value, str),
+    'number': _is_finite_number,
+    'integer': lambda value: _is_finite_number(value) and value == int(value),
+    'boolean': lambda value: isinstance(value, bool),
+    'null': lambda value: value is None,
+}
+
+_TYPE_NAMES = {
+    'object': 'a JSON object', 'array': 'an array', 'string': 'a string', 'number': 'a number',
+    'integer': 'an integer', 'boolean': 'true or false', 'null': 'null',
+}
+
+
+def load_schema(path=SCHEMA_PATH):
+    """Reads a schema file, with numbers as Decimal so that e.g. a minimum of 0.01 is exact."""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f, parse_float=Decimal)
+
+
+def _is_number(value):
+    return _TYPE_CHECKS['number'](value)
+
+
+def _compile(schema, name):
+    """
+    Returns a list of checks for `schema`; each takes a value and returns an
+    error message or None. `message` is bound as a default argument because
+    the name is reused by every keyword below.
+    """
+    unsupported = set(schema) - SUPPORTED_KEYWORDS
+    if unsupported:
+        raise ValueError(f"Unsupported schema keywords for {name}: {', '.join(sorted(unsupported))}")
+    checks = []
+
+    if 'type' in schema:
+        type_name = schema['type']
+        if type_name not in _TYPE_CHECKS:
+            raise ValueError(f"Unsupported schema type for {name}: {type_name!r}")
+        is_type, message = _TYPE_CHECKS[type_name], f"{name} must be {_TYPE_NAMES[type_name]}"
+        checks.append(lambda value, is_type=is_type, message=message: None if is_type(value) else message)
+
+    if 'enum' in schema:
+        allowed = list(schema['enum'])
+        message = f"{name} must be one of {', '.join(map(str, allowed))}"
+        checks.append(lambda value, message=message: None if value in allowed else message)
+
+    if 'minimum' in schema:
+        minimum = schema['minimum']
+        if schema.get('exclusiveMinimum'):
+            message = f"{name} must be greater than {minimum}"
+            checks.append(lambda value, message=message: message if _is_number(value) and value <= minimum else None)
+        else:
+            message = f"{name} must be at least {minimum}"
+            checks.append(lambda value, message=message: message if _is_number(value) and value < minimum else None)
+
+    if 'maximum' in schema:
+        maximum = schema['maximum']
+        if schema.get('exclusiveMaximum'):
+            message = f"{name} must be less than {maximum}"
+            checks.append(lambda value, message=message: message if _is_number(value) and value >= maximum else None)
+        else:
+            message = f"{name} must be at most {maximum}"
+            checks.append(lambda value, message=message: message if _is_number(value) and value > maximum else None)
+
+    if 'minLength' in schema:
+        min_length = schema['minLength']
+        message = f"{name} must be at least {min_length} characters"
+        checks.append(lambda value, message=message: message if isinstance(value, str) and len(value) < min_length else None)
+
+    if 'maxLength' in schema:
+        max_length = schema['maxLength']
+        message = f"{name} must be at most {max_length} characters"
+        checks.append(lambda value, message=message: message if isinstance(value, str) and len(value) > max_length else None)
+
+    if 'pattern' in schema:
+        # JSON Schema patterns are unanchored searches, like re.search
+        search, message = re.compile(schema['pattern']).search, f"{name} must match {schema['pattern']}"
+        checks.append(lambda value, message=message: message if isinstance(value, str) and search(value) is None else None)
+
+    if 'required' in schema:
+        required = tuple(schema['required'])
+        def check_required(value):
+            if not isinstance(value, dict):
+                return None
+            missing = [field for field in required if field not in value]
+            return f"Missing required fields: {', '.join(missing)}" if missing else None
+        checks.append(check_required)
+
+    if 'properties' in schema:
+        properties = tuple((field, _compile(subschema, field)) for field, subschema in schema['properties'].items())
+        def check_properties(value):
+            if not isinstance(value, dict):
+                return None
+            for field, field_checks in properties:
+                if field in value:
+                    field_value = value[field]
+                    for check in field_checks:
+                        error = check(field_value)
+                        if error:
+                            return error
+            return None
+        checks.append(check_properties)
+
+    if schema.get('additionalProperties') is False:
+        known = frozenset(schema.get('properties', ()))
+        def check_additional(value):
+            if not isinstance(value, dict):
+                return None
+            unknown = sorted(set(value) - known)
+            return f"Unknown fields: {', '.join(unknown)}" if unknown else None
+        checks.append(check_additional)
+    elif schema.get('additionalProperties', True) is not True:
+        raise ValueError(f"Unsupported additionalProperties for {name}: only true or false")
+
+    return checks
+
+
+def compile_schema(schema, name='The request'):
+    """Compiles `schema` into a function that returns the first error message for a value, or None if it is valid."""
+    checks = tuple(_compile(schema, name))
+    def first_error(value):
+        for check in checks:
+            error = check(value)
+            if error:
+                return error
+        return None
+    return first_error
+
+
+PAYMENT_REQUEST_SCHEMA = load_schema()
+payment_request_error = compile_schema(PAYMENT_REQUEST_SCHEMA, name='Each payment')
+
+
+def validate_payment_request(payment):
+    """Raises ValueError with a client-facing message if `payment` does not match the payment request schema."""
+    error = payment_request_error(payment)
+    if error:
+        raise ValueError(error)
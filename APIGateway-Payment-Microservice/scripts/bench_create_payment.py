@@ -0,0 +1,222 @@
+#####################################################################
+#Benchmark: POST /payments latency per PAYMENT_HANDOFF_MODE
+####################################################################
+# scripts/bench_create_payment.py
+#
+# Sends POST /payments events to payment_processor.lambda_handler against a
+# local DynamoDB + SQS stand-in, once per handoff mode:
+#   sequential - put_item, then send_message
+#   concurrent - both calls in parallel
+#   outbox     - put_item only; the table's stream is then replayed through
+#                outbox_publisher.lambda_handler, the way Lambda would
+# and reports handler latency (p50/p95). Each service gets its own injected
+# latency (--dynamodb-ms, --sqs-ms) to stand in for the network hop.
+#
+# --sqs-failure-rate makes that share of SendMessage/SendMessageBatch calls
+# fail. "orphaned" counts payments stored as PENDING with no message on the
+# queue: in outbox mode the publisher is retried until the stream is drained,
+# as Lambda retries a stream batch, so none are left behind.
+#
+# It then creates --payments payments (sequential mode) as one POST /payments
+# each vs POST /payments/batch requests of --batch-size, and reports total
+# time, DynamoDB/SQS calls and time per payment. --request-overhead-ms adds a
+# fixed cost per HTTP request for what the stand-in cannot show (API Gateway,
+# the authorizer, the Lambda invoke). Every request sends to a fresh queue,
+# created outside the timed section, as if a consumer kept the queue drained:
+# the stand-in gets slower per SendMessage as its queue grows, which would
+# otherwise swamp the comparison.
+#
+# Usage (from the APIGateway-Payment-Microservice directory):
+#   python scripts/bench_create_payment.py --requests 200 --dynamodb-ms 8 --sqs-ms 12
+# An in-process moto server is started (pip install "moto[server]").
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODES = ("sequential", "concurrent", "outbox")
+
+
+def start_stand_in():
+    from moto.server import ThreadedMotoServer
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return f"http://{host}:{port}", server
+
+
+def add_latency(client, service, latency_seconds):
+    def delay(**kwargs):
+        time.sleep(latency_seconds)
+    client.meta.events.register(f"before-send.{service}", delay)
+
+
+def add_failures(client, service, operations, failure_rate):
+    def fail(**kwargs):
+        if random.random() < failure_rate:
+            raise ConnectionError(f"injected {service} failure")
+    for operation in operations:
+        client.meta.events.register(f"before-send.{service}.{operation}", fail)
+
+
+def create_payment_event():
+    return {
+        "httpMethod": "POST",
+        "path": "/payments",
+        "body": json.dumps({"amount": random.randint(1, 1000), "currency": "USD", "description": "bench"}),
+        "requestContext": {"authorizer": {"principalId": "user-bench"}},
+    }
+
+
+def create_resources(dynamodb, sqs, suffix):
+    table = dynamodb.create_table(
+        TableName=f"bench-payments-{suffix}",
+        KeySchema=[{"AttributeName": "paymentId", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "paymentId", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+        StreamSpecification={"StreamEnabled": True, "StreamViewType": "NEW_IMAGE"},
+    )
+    table.wait_until_exists()
+    queue_url = sqs.create_queue(QueueName=f"bench-payments-{suffix}")["QueueUrl"]
+    return table, queue_url
+
+
+def drain_stream(streams, table, publisher):
+    """Feeds every stream record to the publisher, retrying from the reported sequence number."""
+    stream_arn = table.latest_stream_arn
+    records = []
+    for shard in streams.describe_stream(StreamArn=stream_arn)["StreamDescription"]["Shards"]:
+        iterator = streams.get_shard_iterator(StreamArn=stream_arn, ShardId=shard["ShardId"], ShardIteratorType="TRIM_HORIZON")["ShardIterator"]
+        while iterator:
+            response = streams.get_records(ShardIterator=iterator, Limit=100)
+            records.extend(response["Records"])
+            iterator = response.get("NextShardIterator") if response["Records"] else None
+
+    invocations = 0
+    for start in range(0, len(records), 100):
+        batch = records[start:start + 100]
+        while batch:
+            invocations += 1
+            failures = publisher.lambda_handler({"Records": batch}, None)["batchItemFailures"]
+            if not failures:
+                break
+            retry_from = failures[0]["itemIdentifier"]
+            batch = [r for r in batch if int(r["dynamodb"]["SequenceNumber"]) >= int(retry_from)]
+    return invocations
+
+
+class CallCounter:
+    def __init__(self, *clients):
+        self.calls = 0
+        for client in clients:
+            client.meta.events.register("before-send", self._count)
+
+    def _count(self, **kwargs):
+        self.calls += 1
+
+
+def create_batch_event(count):
+    payments = [json.loads(create_payment_event()["body"]) for _ in range(count)]
+    return {**create_payment_event(), "path": "/payments/batch", "body": json.dumps({"payments": payments})}
+
+
+def queue_depth(sqs, queue_url):
+    attributes = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=["ApproximateNumberOfMessages"])
+    return int(attributes["Attributes"]["ApproximateNumberOfMessages"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark POST /payments per handoff mode")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--dynamodb-ms", type=float, default=8.0, help="Latency added to every DynamoDB request")
+    parser.add_argument("--sqs-ms", type=float, default=12.0, help="Latency added to every SQS request")
+    parser.add_argument("--payments", type=int, default=1000, help="Payments created in the single vs batch comparison")
+    parser.add_argument("--batch-size", type=int, default=500, help="Payments per POST /payments/batch request")
+    parser.add_argument("--request-overhead-ms", type=float, default=0.0, help="Fixed cost per HTTP request (gateway, authorizer, invoke)")
+    parser.add_argument("--sqs-failure-rate", type=float, default=0.0, help="Share of SQS sends that fail")
+    args = parser.parse_args()
+
+    endpoint_url, server = start_stand_in()
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    os.environ.setdefault("LOG_LEVEL", "CRITICAL")  # the 500s are expected when failures are injected
+    os.environ["AWS_ENDPOINT_URL"] = endpoint_url  # DynamoDB, its streams and SQS all go to the stand-in
+    sys.path.insert(0, os.path.join(HERE, ".."))
+    import boto3
+    import outbox_publisher
+    import payment_processor
+
+    dynamodb = payment_processor.get_dynamodb()
+    sqs = payment_processor.get_sqs()
+    streams = boto3.client("dynamodbstreams")
+    add_latency(dynamodb.meta.client, "dynamodb", args.dynamodb_ms / 1000.0)
+    add_latency(sqs, "sqs", args.sqs_ms / 1000.0)
+    add_failures(sqs, "sqs", ("SendMessage", "SendMessageBatch"), args.sqs_failure_rate)
+
+    print(f"stand-in: {endpoint_url}, DynamoDB +{args.dynamodb_ms} ms, SQS +{args.sqs_ms} ms, SQS failure rate {args.sqs_failure_rate:.0%}")
+    print(f"{'mode':>12} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'stored':>7} {'queued':>7} {'orphaned':>9} {'publisher calls':>16}")
+    for mode in MODES:
+        table, queue_url = create_resources(dynamodb, sqs, f"{mode}-{uuid.uuid4().hex[:6]}")
+        payment_processor.DYNAMODB_TABLE_NAME = table.name
+        payment_processor.SQS_QUEUE_URL = outbox_publisher.SQS_QUEUE_URL = queue_url
+        payment_processor.PAYMENT_HANDOFF_MODE = mode
+
+        latencies, errors = [], 0
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            response = payment_processor.lambda_handler(create_payment_event(), None)
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += response["statusCode"] != 202
+
+        publisher_calls = drain_stream(streams, table, outbox_publisher) if mode == "outbox" else 0
+        stored = table.scan(Select="COUNT")["Count"]
+        queued = queue_depth(sqs, queue_url)
+        p95 = statistics.quantiles(latencies, n=20)[-1]
+        print(f"{mode:>12} {statistics.median(latencies):>8.1f} {p95:>8.1f} {errors:>7} {stored:>7} {queued:>7} {max(stored - queued, 0):>9} {publisher_calls:>16}")
+
+    calls = CallCounter(dynamodb.meta.client, sqs)
+    table, _ = create_resources(dynamodb, sqs, f"batch-{uuid.uuid4().hex[:6]}")
+    payment_processor.DYNAMODB_TABLE_NAME = table.name
+    payment_processor.PAYMENT_HANDOFF_MODE = "sequential"
+    overhead = args.request_overhead_ms / 1000.0
+    setup = boto3.client("sqs")  # not counted, no injected latency
+
+    def timed(event):
+        queue_name = f"bench-payments-batch-{uuid.uuid4().hex[:12]}"
+        payment_processor.SQS_QUEUE_URL = setup.create_queue(QueueName=queue_name)["QueueUrl"]
+        start = time.perf_counter()
+        time.sleep(overhead)
+        response = payment_processor.lambda_handler(event, None)
+        return time.perf_counter() - start, response["statusCode"] == 202
+
+    def single():
+        results = [timed(create_payment_event()) for _ in range(args.payments)]
+        return sum(elapsed for elapsed, _ in results), sum(not ok for _, ok in results)
+
+    def batch():
+        sizes = [min(args.batch_size, args.payments - start) for start in range(0, args.payments, args.batch_size)]
+        results = [timed(create_batch_event(size)) for size in sizes]
+        return sum(elapsed for elapsed, _ in results), sum(not ok for _, ok in results)
+
+    print(f"\n{args.payments} payments, +{args.request_overhead_ms} ms per HTTP request")
+    print(f"{'path':>22} {'requests':>9} {'errors':>7} {'total ms':>10} {'AWS calls':>10} {'ms/payment':>11}")
+    for label, requests, fn in (
+        ("POST /payments", args.payments, single),
+        ("POST /payments/batch", -(-args.payments // args.batch_size), batch),
+    ):
+        calls.calls = 0
+        elapsed, errors = fn()
+        elapsed *= 1000
+        print(f"{label:>22} {requests:>9} {errors:>7} {elapsed:>10.0f} {calls.calls:>10} {elapsed / args.payments:>11.2f}")
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#####################################################################
+#Benchmark: GET /payments/{paymentId} polling per PAYMENT_CACHE_BACKEND
+####################################################################
+# scripts/bench_get_payment.py
+#
+# Simulates clients polling their PENDING payments: every --interval-ms each
+# of --payments payments is fetched through payment_processor.lambda_handler,
+# for --rounds rounds, while a stand-in for the queue consumer moves
+# --settle-rate of the still PENDING payments to PROCESSED every round.
+# Clients send back the last ETag they saw in If-None-Match. Run once per
+# cache backend:
+#   none   - GetItem on every request
+#   memory - in-process TTL LRU; an update is only seen once the entry expires
+#   redis  - a dict-backed fake of the Redis client; every update is passed
+#            through payment_change_feed.lambda_handler as a MODIFY
+#            stream record, the way the table's stream would deliver it
+# Reports latency, GetItem calls, hit ratio, read units saved (as returned by
+# the stand-in; moto answers 1.0 per GetItem), 304s and stale reads (a
+# response older than the status in the table).
+#
+# Usage (from the APIGateway-Payment-Microservice directory):
+#   python scripts/bench_get_payment.py --payments 50 --rounds 20 --ttl 2
+# An in-process moto server is started (pip install "moto[server]").
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKENDS = ("none", "memory", "redis")
+USER_ID = "user-bench"
+
+
+def start_stand_in():
+    from moto.server import ThreadedMotoServer
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return f"http://{host}:{port}", server
+
+
+class FakeRedis:
+    """The three redis-py calls RedisCache makes, over a dict, with px expiry."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, name):
+        value, expires_at = self.data.get(name, (None, 0))
+        return value if expires_at > time.time() else None
+
+    def set(self, name, value, px):
+        self.data[name] = (value, time.time() + px / 1000.0)
+
+    def delete(self, *names):
+        for name in names:
+            self.data.pop(name, None)
+
+
+class GetItemCounter:
+    def __init__(self, client):
+        self.calls = 0
+        client.meta.events.register("before-send.dynamodb.GetItem", self._count)
+
+    def _count(self, **kwargs):
+        self.calls += 1
+
+
+def create_table(dynamodb, payments):
+    table = dynamodb.create_table(
+        TableName=f"bench-payments-{uuid.uuid4().hex[:6]}",
+        KeySchema=[{"AttributeName": "paymentId", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "paymentId", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+    payment_ids = [str(uuid.uuid4()) for _ in range(payments)]
+    with table.batch_writer() as batch:
+        for payment_id in payment_ids:
+            batch.put_item(Item={"paymentId": payment_id, "userId": USER_ID, "amount": 100, "currency": "USD", "status": "PENDING"})
+    return table, payment_ids
+
+
+def get_event(payment_id, etag):
+    return {
+        "httpMethod": "GET",
+        "path": f"/payments/{payment_id}",
+        "pathParameters": {"paymentId": payment_id},
+        "headers": {"If-None-Match": etag} if etag else {},
+        "requestContext": {"authorizer": {"principalId": USER_ID}},
+    }
+
+
+def modify_record(payment_id):
+    return {"eventName": "MODIFY", "dynamodb": {"Keys": {"paymentId": {"S": payment_id}}}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GET /payments/{paymentId} per cache backend")
+    parser.add_argument("--payments", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--interval-ms", type=float, default=250.0, help="Time between two polls of the same payment")
+    parser.add_argument("--settle-rate", type=float, default=0.1, help="Share of PENDING payments processed per round")
+    parser.add_argument("--ttl", type=float, default=2.0, help="PAYMENT_CACHE_TTL_SECONDS")
+    parser.add_argument("--dynamodb-ms", type=float, default=5.0, help="Latency added to every DynamoDB request")
+    args = parser.parse_args()
+
+    endpoint_url, server = start_stand_in()
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    os.environ["AWS_ENDPOINT_URL"] = endpoint_url
+    sys.path.insert(0, os.path.join(HERE, ".."))
+    import payment_cache
+    import payment_change_feed
+    import payment_processor
+
+    dynamodb = payment_processor.get_dynamodb()
+    dynamodb.meta.client.meta.events.register("before-send.dynamodb", lambda **kwargs: time.sleep(args.dynamodb_ms / 1000.0))
+    counter = GetItemCounter(dynamodb.meta.client)
+
+    print(f"{args.payments} payments x {args.rounds} rounds every {args.interval_ms:.0f} ms, TTL {args.ttl} s, DynamoDB +{args.dynamodb_ms} ms")
+    print(f"{'backend':>8} {'p50 ms':>7} {'GetItem':>8} {'hit ratio':>10} {'RCU saved':>10} {'304s':>6} {'stale':>6}")
+    for backend in BACKENDS:
+        random.seed(1)
+        table, payment_ids = create_table(dynamodb, args.payments)
+        payment_processor.DYNAMODB_TABLE_NAME = table.name
+        payment_cache.PAYMENT_CACHE_BACKEND = backend
+        payment_cache._cache = payment_cache.RedisCache(FakeRedis(), args.ttl) if backend == "redis" else None
+        payment_cache.PAYMENT_CACHE_TTL_SECONDS = args.ttl
+        payment_cache.cache_counts.update(hits=0, misses=0, errors=0, not_modified=0, read_units_saved=0.0)
+        counter.calls = 0
+
+        status = dict.fromkeys(payment_ids, "PENDING")
+        etags, seen, latencies, stale = {}, {}, [], 0 # seen: the status the client's ETag stands for
+        for _ in range(args.rounds):
+            round_started = time.perf_counter()
+            for payment_id in payment_ids:
+                start = time.perf_counter()
+                response = payment_processor.lambda_handler(get_event(payment_id, etags.get(payment_id)), None)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response["statusCode"] == 200:
+                    etags[payment_id] = response["headers"]["ETag"]
+                    seen[payment_id] = json.loads(response["body"])["status"]
+                elif response["statusCode"] != 304:
+                    raise RuntimeError(f"GET returned {response['statusCode']}: {response['body']}")
+                stale += seen[payment_id] != status[payment_id]
+
+            settled = [p for p in payment_ids if status[p] == "PENDING" and random.random() < args.settle_rate]
+            for payment_id in settled:
+                table.update_item(
+                    Key={"paymentId": payment_id},
+                    UpdateExpression="SET #s = :s",
+                    ExpressionAttributeNames={"#s": "status"},
+                    ExpressionAttributeValues={":s": "PROCESSED"},
+                )
+                status[payment_id] = "PROCESSED"
+            if settled:
+                payment_change_feed.lambda_handler({"Records": [modify_record(p) for p in settled]}, None)
+            time.sleep(max(0.0, args.interval_ms / 1000.0 - (time.perf_counter() - round_started)))
+
+        counts = payment_cache.cache_counts
+        lookups = counts["hits"] + counts["misses"]
+        hit_ratio = f"{counts['hits'] / lookups:.0%}" if lookups else "-"
+        print(f"{backend:>8} {statistics.median(latencies):>7.2f} {counter.calls:>8} {hit_ratio:>10} "
+              f"{counts['read_units_saved']:>10.1f} {counts['not_modified']:>6} {stale:>6}")
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#####################################################################
+#Benchmark: GET /payments memory and response size for large users
+####################################################################
+# scripts/bench_list_pages.py
+#
+# Lists every payment of users with --sizes payments, each payment carrying a
+# --description-bytes description, two ways:
+#   all-at-once - every page of query_user_payments collected into one list
+#                 and encoded as a single json_response
+#   handler     - payment_processor.lambda_handler, GET /payments?limit=--limit,
+#                 following nextToken until it is null; each page is encoded
+#                 as it is read and ends early at LIST_PAYMENTS_MAX_BYTES
+# Reports responses, the largest response body, the peak Python memory of one
+# response (tracemalloc) and the total time of a separate untraced run.
+#
+# Usage (from the APIGateway-Payment-Microservice directory):
+#   python scripts/bench_list_pages.py --sizes 1000,5000 --limit 1000
+# A moto server is started in a child process (pip install "moto[server]"), so
+# its allocations stay out of the measurements.
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from decimal import Decimal
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def start_stand_in():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-c", "from moto.server import main; main()", "-p", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    return f"http://127.0.0.1:{port}", server
+
+
+def create_table(dynamodb):
+    table = dynamodb.create_table(
+        TableName=f"bench-payments-{uuid.uuid4().hex[:6]}",
+        KeySchema=[{'AttributeName': 'paymentId', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[
+            {'AttributeName': 'paymentId', 'AttributeType': 'S'},
+            {'AttributeName': 'userId', 'AttributeType': 'S'},
+            {'AttributeName': 'createdAt', 'AttributeType': 'S'},
+        ],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'userId-createdAt-index',
+            'KeySchema': [
+                {'AttributeName': 'userId', 'KeyType': 'HASH'},
+                {'AttributeName': 'createdAt', 'KeyType': 'RANGE'},
+            ],
+            'Projection': {'ProjectionType': 'ALL'},
+        }],
+        BillingMode='PAY_PER_REQUEST',
+    )
+    table.wait_until_exists()
+    return table
+
+
+def load_user(table, user_id, size, description_bytes):
+    with table.batch_writer() as batch:
+        for n in range(size):
+            batch.put_item(Item={
+                'paymentId': str(uuid.uuid4()),
+                'userId': user_id,
+                'amount': Decimal(random.randint(100, 100000)) / 100,
+                'currency': 'USD',
+                'description': f'Invoice {n:08d} '.ljust(description_bytes, 'x'),
+                'status': 'PROCESSED',
+                'createdAt': f'2024-01-01T{n // 3600 % 24:02d}:{n // 60 % 60:02d}:{n % 60:02d}.{n:06d}Z',
+                'updatedAt': '2024-12-31T00:00:00.000000Z',
+            })
+
+
+def all_at_once(payment_processor, api_responses, user_id):
+    items, key = [], None
+    while True:
+        page, key = payment_processor.query_user_payments(user_id, payment_processor.LIST_PAYMENTS_MAX_LIMIT, key)
+        items.extend(page)
+        if not key:
+            yield len(items), api_responses.json_response(200, {'items': items, 'nextToken': None})['body']
+            return
+
+
+def handler_pages(payment_processor, user_id, limit):
+    next_token = None
+    while True:
+        params = {'limit': str(limit)}
+        if next_token:
+            params['nextToken'] = next_token
+        response = payment_processor.lambda_handler({
+            'httpMethod': 'GET',
+            'path': '/payments',
+            'queryStringParameters': params,
+            'requestContext': {'authorizer': {'principalId': user_id}},
+        }, None)
+        if response['statusCode'] != 200:
+            raise RuntimeError(f"GET /payments returned {response['statusCode']}: {response['body']}")
+        body = response['body']
+        page = payment_processor.api_responses.loads(body)
+        yield len(page['items']), body
+        next_token = page['nextToken']
+        if not next_token:
+            return
+
+
+def run(pages, traced):
+    """Drains `pages`; returns (responses, items, largest body in bytes, peak MB of one response, seconds)."""
+    responses = items = largest = 0
+    peak = 0.0
+    start = time.perf_counter()
+    if traced:
+        tracemalloc.start()
+    while True:
+        if traced:
+            tracemalloc.reset_peak()
+        try:
+            count, body = next(pages)
+        except StopIteration:
+            break
+        if traced:
+            peak = max(peak, tracemalloc.get_traced_memory()[1] / 1e6)
+        responses += 1
+        items += count
+        largest = max(largest, len(body.encode('utf-8')))
+        del body
+    if traced:
+        tracemalloc.stop()
+    return responses, items, largest, peak, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GET /payments memory and response size")
+    parser.add_argument("--sizes", default="1000,5000", help="Comma separated payments per listed user")
+    parser.add_argument("--description-bytes", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=1000, help="limit= of each GET /payments")
+    parser.add_argument("--max-bytes", type=int, default=1024 * 1024, help="LIST_PAYMENTS_MAX_BYTES")
+    args = parser.parse_args()
+
+    endpoint_url, server = start_stand_in()
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    os.environ["AWS_ENDPOINT_URL"] = endpoint_url
+    sys.path.insert(0, os.path.join(HERE, ".."))
+    import api_responses
+    import payment_processor
+
+    random.seed(1)
+    payment_processor.LIST_PAYMENTS_MAX_BYTES = args.max_bytes
+    table = create_table(payment_processor.get_dynamodb())
+    payment_processor.DYNAMODB_TABLE_NAME = table.name
+
+    print(f"{args.description_bytes} byte descriptions, limit={args.limit}, LIST_PAYMENTS_MAX_BYTES={args.max_bytes}")
+    print(f"{'payments':>8} {'path':>12} {'responses':>10} {'items':>7} {'max body KB':>12} {'peak MB/response':>17} {'total ms':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        user_id = f"user-{size}"
+        load_user(table, user_id, size, args.description_bytes)
+        for label, pages in (
+            ("all-at-once", lambda: all_at_once(payment_processor, api_responses, user_id)),
+            ("handler", lambda: handler_pages(payment_processor, user_id, args.limit)),
+        ):
+            *_, seconds = run(pages(), traced=False)
+            responses, items, largest, peak, _ = run(pages(), traced=True)
+            if items != size:
+                raise RuntimeError(f"{label} listed {items} of {size} payments")
+            print(f"{size:>8} {label:>12} {responses:>10} {items:>7} {largest / 1024:>12.0f} {peak:>17.1f} {seconds * 1000:>9.0f}")
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#####################################################################
+#Benchmark: list payments, table Scan vs userId-createdAt-index Query
+####################################################################
+# scripts/bench_list_payments.py
+#
+# Loads payments tables of increasing size into a local DynamoDB stand-in and
+# lists one user's payments (a fixed 100 of them) two ways:
+#   scan  - the old handle_list_payments: Scan + FilterExpression on userId,
+#           paginated to the end so the result is actually complete
+#   query - payment_processor.query_user_payments against the GSI
+# Reports latency, items read and read capacity for each.
+#
+# Read units are reported twice: as returned by the stand-in (DynamoDB Local
+# computes them, moto always answers 1.0 per call) and estimated from items read
+# and their size using DynamoDB's eventually consistent rate of 0.5 RCU per 4 KB.
+#
+# Usage (from the APIGateway-Payment-Microservice directory):
+#   docker run -p 8000:8000 amazon/dynamodb-local
+#   python scripts/bench_list_payments.py --endpoint-url http://localhost:8000
+# Without --endpoint-url an in-process moto server is started (pip install "moto[server]").
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from decimal import Decimal
+
+TARGET_USER = "user-bench"
+TARGET_USER_PAYMENTS = 100
+
+
+def start_stand_in(endpoint_url):
+    if endpoint_url:
+        return endpoint_url, None
+    from moto.server import ThreadedMotoServer
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return f"http://{host}:{port}", server
+
+
+def make_item(user_id, n):
+    return {
+        'paymentId': str(uuid.uuid4()),
+        'userId': user_id,
+        'amount': Decimal(random.randint(100, 100000)) / 100,
+        'currency': 'USD',
+        'description': f'Invoice {n:08d} for services rendered',
+        'status': random.choice(['PENDING', 'PROCESSED', 'FAILED']),
+        'createdAt': f'2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}T10:00:{n % 60:02d}.000000Z',
+        'updatedAt': '2024-12-31T00:00:00.000000Z',
+    }
+
+
+def create_table(dynamodb, name, size):
+    table = dynamodb.create_table(
+        TableName=name,
+        KeySchema=[{'AttributeName': 'paymentId', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[
+            {'AttributeName': 'paymentId', 'AttributeType': 'S'},
+            {'AttributeName': 'userId', 'AttributeType': 'S'},
+            {'AttributeName': 'createdAt', 'AttributeType': 'S'},
+        ],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'userId-createdAt-index',
+            'KeySchema': [
+                {'AttributeName': 'userId', 'KeyType': 'HASH'},
+                {'AttributeName': 'createdAt', 'KeyType': 'RANGE'},
+            ],
+            'Projection': {'ProjectionType': 'ALL'},
+        }],
+        BillingMode='PAY_PER_REQUEST',
+    )
+    table.wait_until_exists()
+    with table.batch_writer() as batch:
+        for n in range(size):
+            user_id = TARGET_USER if n < TARGET_USER_PAYMENTS else f"user-{random.randrange(size // 20 + 1)}"
+            batch.put_item(Item=make_item(user_id, n))
+    return table
+
+
+class ReadMeter:
+    """Asks for ConsumedCapacity on every Scan/Query and totals what comes back."""
+
+    def __init__(self, client):
+        self.reset()
+        for operation in ('Scan', 'Query'):
+            client.meta.events.register(f'before-parameter-build.dynamodb.{operation}', self._before)
+            client.meta.events.register(f'after-call.dynamodb.{operation}', self._after)
+
+    def reset(self):
+        self.calls = 0
+        self.items_read = 0
+        self.reported_units = 0.0
+
+    def _before(self, params, **kwargs):
+        params['ReturnConsumedCapacity'] = 'TOTAL'
+
+    def _after(self, parsed, **kwargs):
+        self.calls += 1
+        self.items_read += parsed.get('ScannedCount', 0)
+        self.reported_units += parsed.get('ConsumedCapacity', {}).get('CapacityUnits', 0.0)
+
+
+def scan_user_payments(table, user_id):
+    from boto3.dynamodb.conditions import Attr
+    kwargs = {'FilterExpression': Attr('userId').eq(user_id)}
+    items = []
+    while True:
+        response = table.scan(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def measure(meter, fn, repeats):
+    latencies = []
+    for _ in range(repeats):
+        meter.reset()
+        start = time.perf_counter()
+        count = len(fn())
+        latencies.append((time.perf_counter() - start) * 1000)
+    return count, statistics.median(latencies), meter.calls, meter.items_read, meter.reported_units
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Scan vs GSI Query for listing payments")
+    parser.add_argument("--endpoint-url", help="DynamoDB Local endpoint; defaults to an in-process moto server")
+    parser.add_argument("--sizes", default="1000,5000,20000", help="Comma separated table sizes")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    endpoint_url, server = start_stand_in(args.endpoint_url)
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    # boto3 picks up service specific endpoints from the environment, so payment_processor needs no changes
+    os.environ["AWS_ENDPOINT_URL_DYNAMODB"] = endpoint_url
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+    import payment_processor
+
+    meter = ReadMeter(payment_processor.get_dynamodb().meta.client)
+    item_size = len(json.dumps(make_item(TARGET_USER, 0), default=str))
+
+    print(f"stand-in: {endpoint_url}, approx item size {item_size} bytes, {TARGET_USER_PAYMENTS} payments for the listed user")
+    print(f"{'table size':>10} {'path':>6} {'items':>6} {'p50 ms':>8} {'calls':>6} {'items read':>11} {'RCU (est)':>10} {'RCU (stand-in)':>15}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        table_name = f"bench-payments-{size}-{uuid.uuid4().hex[:6]}"
+        table = create_table(payment_processor.get_dynamodb(), table_name, size)
+        payment_processor.DYNAMODB_TABLE_NAME = table_name
+
+        for label, fn in (
+            ("scan", lambda: scan_user_payments(table, TARGET_USER)),
+            ("query", lambda: payment_processor.query_user_payments(TARGET_USER, payment_processor.LIST_PAYMENTS_MAX_LIMIT)[0]),
+        ):
+            count, p50, calls, items_read, reported = measure(meter, fn, args.repeats)
+            estimated = math.ceil(items_read * item_size / 4096) * 0.5
+            print(f"{size:>10} {label:>6} {count:>6} {p50:>8.1f} {calls:>6} {items_read:>11} {estimated:>10.1f} {reported:>15.1f}")
+        table.delete()
+
+    if server:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
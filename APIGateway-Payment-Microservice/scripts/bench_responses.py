@@ -0,0 +1,103 @@
+#####################################################################
+#Microbenchmark: response encoding throughput
+####################################################################
+# scripts/bench_responses.py
+#
+# Encodes a single payment (GET /payments/{paymentId}) and a page of --page-size
+# payments (GET /payments) as read from DynamoDB, with Decimal amounts, and
+# reports encodes per second and MB/s for:
+#   json.dumps  - the old encoding: json.dumps with a Decimal -> int/float default
+#   stdlib      - api_responses.dumps without orjson
+#   orjson      - api_responses.dumps with orjson (when it is installed)
+# plus the time to build a whole response with api_responses.json_response,
+# and request decoding (api_responses.loads) of a POST /payments/batch body.
+#
+# Usage (from the APIGateway-Payment-Microservice directory):
+#   pip install orjson
+#   python scripts/bench_responses.py --page-size 1000
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from decimal import Decimal
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_item(n):
+    return {
+        'paymentId': str(uuid.uuid4()),
+        'userId': 'user-bench',
+        'amount': Decimal(random.randint(100, 100000)) / 100,
+        'currency': 'USD',
+        'description': f'Invoice {n:08d} for services rendered',
+        'status': 'PENDING',
+        'createdAt': '2024-06-01T10:00:00.000000Z',
+        'updatedAt': '2024-06-01T10:00:00.000000Z',
+    }
+
+
+def old_number(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def rate(fn, min_seconds):
+    """Calls fn until min_seconds have passed; returns (calls per second, result of the last call)."""
+    calls, start = 0, time.perf_counter()
+    while True:
+        result = fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return calls / elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response encoding")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=1.0, help="Minimum time per measurement")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(HERE, ".."))
+    import api_responses
+
+    random.seed(1)
+    single = make_item(0)
+    page = {'items': [make_item(n) for n in range(args.page_size)], 'nextToken': None}
+    orjson = api_responses.orjson
+
+    encoders = [("json.dumps", lambda value: json.dumps(value, default=old_number))]
+    def stdlib(value):
+        api_responses.orjson = None
+        try:
+            return api_responses.dumps(value)
+        finally:
+            api_responses.orjson = orjson
+    encoders.append(("stdlib", stdlib))
+    if orjson is not None:
+        fragment = "Fragment" if api_responses._Fragment is not None else "no Fragment"
+        encoders.append((f"orjson {orjson.__version__} ({fragment})", api_responses.dumps))
+
+    print(f"{'payload':>14} {'encoder':>30} {'encodes/s':>11} {'MB/s':>8}")
+    for label, value in (("1 payment", single), (f"{args.page_size} payments", page)):
+        for name, encode in encoders:
+            per_second, body = rate(lambda: encode(value), args.seconds)
+            print(f"{label:>14} {name:>30} {per_second:>11.0f} {per_second * len(body.encode('utf-8')) / 1e6:>8.1f}")
+
+    per_second, _ = rate(lambda: api_responses.json_response(200, page), args.seconds)
+    print(f"\njson_response(200, page of {args.page_size}): {per_second:.0f}/s")
+    per_second, _ = rate(lambda: api_responses.error_response('not_found'), args.seconds)
+    print(f"error_response('not_found'): {per_second:.0f}/s")
+
+    batch_body = json.dumps({'payments': [{'amount': float(make_item(n)['amount']), 'currency': 'USD'} for n in range(500)]})
+    per_second, _ = rate(lambda: api_responses.loads(batch_body), args.seconds)
+    print(f"loads(POST /payments/batch body of 500): {per_second:.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
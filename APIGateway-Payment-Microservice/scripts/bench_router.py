@@ -0,0 +1,108 @@
+#####################################################################
+#Microbenchmark: request routing cost as routes are added
+####################################################################
+# scripts/bench_router.py
+#
+# Routes the five payment endpoints' events, with --extra-routes synthetic
+# routes (e.g. /payments/{paymentId}/refunds/{refundId}, /orders/...) added,
+# and reports routings per second for:
+#   if/elif chain - the old lambda_handler dispatch, one branch per route,
+#                   the payment routes last (where new routes would push them)
+#   resource      - api_router.Router.dispatch with event['resource'] set,
+#                   as API Gateway sends it
+#   path          - Router.dispatch with only event['path'] (trie match)
+# Handlers are no-ops, so only the routing is measured.
+#
+# Usage (from the APIGateway-Payment-Microservice directory):
+#   python scripts/bench_router.py --extra-routes 0,100,1000
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PAYMENT_ROUTES = [
+    ('POST', '/payments'),
+    ('POST', '/payments/batch'),
+    ('GET', '/payments/{paymentId}'),
+    ('GET', '/payments/{paymentId}/wait'),
+    ('GET', '/payments'),
+]
+EVENTS = [
+    {'httpMethod': 'POST', 'resource': '/payments', 'path': '/payments'},
+    {'httpMethod': 'POST', 'resource': '/payments/batch', 'path': '/payments/batch'},
+    {'httpMethod': 'GET', 'resource': '/payments/{paymentId}', 'path': '/payments/3f2a9c1e-55aa-4c1b-9d0e-0a1b2c3d4e5f',
+     'pathParameters': {'paymentId': '3f2a9c1e-55aa-4c1b-9d0e-0a1b2c3d4e5f'}},
+    {'httpMethod': 'GET', 'resource': '/payments/{paymentId}/wait', 'path': '/payments/3f2a9c1e-55aa-4c1b-9d0e-0a1b2c3d4e5f/wait',
+     'pathParameters': {'paymentId': '3f2a9c1e-55aa-4c1b-9d0e-0a1b2c3d4e5f'}},
+    {'httpMethod': 'GET', 'resource': '/payments', 'path': '/payments'},
+]
+
+
+def extra_routes(count):
+    """Synthetic routes shaped like the ones the service would grow: nested resources and other collections."""
+    routes = []
+    for n in range(count):
+        if n % 2:
+            routes.append(('POST', f'/payments/{{paymentId}}/action{n}'))
+        else:
+            routes.append(('GET', f'/collection{n}/{{itemId}}'))
+    return routes
+
+
+def chain_dispatch(routes):
+    """An if/elif chain over `routes`: each branch a prefix/suffix test like the old lambda_handler."""
+    tests = []
+    for method, template in routes:
+        prefix, _, rest = template.partition('{')
+        suffix = rest.partition('}')[2]
+        if rest:
+            tests.append((method, lambda path, prefix=prefix, suffix=suffix: path.startswith(prefix) and path.endswith(suffix)))
+        else:
+            tests.append((method, lambda path, template=template: path == template))
+    def dispatch(event):
+        http_method, path = event.get('httpMethod'), event.get('path')
+        for method, test in tests:
+            if http_method == method and test(path):
+                return None
+        return None
+    return dispatch
+
+
+def rate(fn, min_seconds):
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return calls / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark request routing")
+    parser.add_argument("--extra-routes", default="0,100,1000", help="Comma separated numbers of synthetic routes")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Minimum time per measurement")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(HERE, ".."))
+    from api_router import Router
+
+    path_events = [{k: v for k, v in event.items() if k not in ('resource', 'pathParameters')} for event in EVENTS]
+    print(f"{'routes':>7} {'if/elif chain/s':>16} {'resource/s':>11} {'path/s':>11}")
+    for count in (int(n) for n in args.extra_routes.split(",")):
+        routes = extra_routes(count) + PAYMENT_ROUTES
+        router = Router()
+        for method, template in routes:
+            router.add(method, template, lambda event: None)
+        chain = chain_dispatch(routes)
+
+        results = []
+        for dispatch, events in ((chain, EVENTS), (router.dispatch, EVENTS), (router.dispatch, path_events)):
+            results.append(rate(lambda: [dispatch(event) for event in events], args.seconds) * len(events))
+        print(f"{len(routes):>7} {results[0]:>16.0f} {results[1]:>11.0f} {results[2]:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
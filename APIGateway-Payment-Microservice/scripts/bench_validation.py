@@ -0,0 +1,79 @@
+#####################################################################
+#Microbenchmark: payment request validation throughput
+####################################################################
+# scripts/bench_validation.py
+#
+# Validates a valid payment request, an invalid one (lower-case currency) and
+# the --batch-size payments of a POST /payments/batch body, and reports
+# validations per second for:
+#   presence check      - the old build_payment_item check, all([amount, currency])
+#   compiled            - payment_validation.payment_request_error
+#   jsonschema reused   - a jsonschema Draft4Validator built once (when installed)
+#   jsonschema.validate - jsonschema.validate(), which checks the schema and builds
+#                         a validator on every call (when installed)
+#
+# Usage (from the APIGateway-Payment-Microservice directory):
+#   pip install jsonschema
+#   python scripts/bench_validation.py
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def rate(fn, min_seconds):
+    """Calls fn until min_seconds have passed; returns calls per second."""
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return calls / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark payment request validation")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=1.0, help="Minimum time per measurement")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(HERE, ".."))
+    import payment_validation
+
+    valid = {"amount": Decimal("125.40"), "currency": "USD", "description": "Invoice 00001234"}
+    invalid = {**valid, "currency": "usd"}
+    batch = [{**valid, "amount": Decimal(n + 1) / 100} for n in range(args.batch_size)]
+
+    validators = [
+        ("presence check", lambda payment: isinstance(payment, dict) and all([payment.get("amount"), payment.get("currency")])),
+        ("compiled", payment_validation.payment_request_error),
+    ]
+    try:
+        import jsonschema
+    except ImportError:
+        print("jsonschema is not installed; comparing the compiled validator with the presence check only")
+    else:
+        schema = payment_validation.PAYMENT_REQUEST_SCHEMA
+        validators.append(("jsonschema reused", jsonschema.Draft4Validator(schema).is_valid))
+        def validate(payment):
+            try:
+                jsonschema.validate(payment, schema, cls=jsonschema.Draft4Validator)
+            except jsonschema.ValidationError:
+                return False
+            return True
+        validators.append(("jsonschema.validate", validate))
+
+    print(f"{'validator':>20} {'valid/s':>11} {'invalid/s':>11} {f'batch of {args.batch_size}/s':>16}")
+    for name, check in validators:
+        per_valid = rate(lambda: check(valid), args.seconds)
+        per_invalid = rate(lambda: check(invalid), args.seconds)
+        per_batch = rate(lambda: [check(payment) for payment in batch], args.seconds)
+        print(f"{name:>20} {per_valid:>11.0f} {per_invalid:>11.0f} {per_batch:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
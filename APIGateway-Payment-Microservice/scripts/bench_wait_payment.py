@@ -0,0 +1,193 @@
+#####################################################################
+#Load test: polling GET /payments/{paymentId} vs long-polling /wait
+####################################################################
+# scripts/bench_wait_payment.py
+#
+# Creates --payments PENDING payments and has one client thread per payment
+# wait for its outcome, while a stand-in for the queue consumer marks each
+# payment PROCESSED after a random 0.5..--max-settle-seconds. Each update is
+# handed to payment_change_feed.lambda_handler as a MODIFY stream record
+# after --stream-delay-ms, the way the table's stream would deliver it.
+# Four ways of waiting:
+#   poll          - GET /payments/{paymentId} every --poll-seconds
+#   wait, none    - GET /payments/{paymentId}/wait?timeout=--wait-timeout, the
+#                   handler re-reading the table every --poll-seconds
+#   wait, memory  - the same, woken by the change feed through the in-process
+#                   notifier
+#   wait, redis   - woken through Redis pub/sub, as main.tf deploys it
+# Reports HTTP requests and DynamoDB GetItem calls per completed payment,
+# and the lag between the update and the client seeing it.
+#
+# Usage (from the APIGateway-Payment-Microservice directory):
+#   python scripts/bench_wait_payment.py --payments 50 --poll-seconds 1
+# An in-process moto server is started (pip install "moto[server]"), and a
+# fakeredis TCP server (pip install redis fakeredis) unless --redis-url is given.
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+USER_ID = "user-bench"
+MODES = (("poll", "none"), ("wait", "none"), ("wait", "memory"), ("wait", "redis"))
+
+
+def start_stand_in():
+    from moto.server import ThreadedMotoServer
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return f"http://{host}:{port}", server
+
+
+def start_redis_stand_in():
+    from fakeredis import TcpFakeServer
+    server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return f"redis://{host}:{port}/0", server
+
+
+class GetItemCounter:
+    def __init__(self, client):
+        self.calls = 0
+        self._lock = threading.Lock()
+        client.meta.events.register("before-send.dynamodb.GetItem", self._count)
+
+    def _count(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+
+
+def create_table(dynamodb, payments):
+    table = dynamodb.create_table(
+        TableName=f"bench-payments-{uuid.uuid4().hex[:6]}",
+        KeySchema=[{"AttributeName": "paymentId", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "paymentId", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+    items = [{"paymentId": str(uuid.uuid4()), "userId": USER_ID, "amount": 100, "currency": "USD", "status": "PENDING"}
+             for _ in range(payments)]
+    with table.batch_writer() as batch:
+        for item in items:
+            batch.put_item(Item=item)
+    return table, items
+
+
+def get_event(payment_id, wait_timeout=None):
+    event = {
+        "httpMethod": "GET",
+        "path": f"/payments/{payment_id}",
+        "pathParameters": {"paymentId": payment_id},
+        "requestContext": {"authorizer": {"principalId": USER_ID}},
+    }
+    if wait_timeout is not None:
+        event["path"] += "/wait"
+        event["queryStringParameters"] = {"timeout": str(wait_timeout)}
+    return event
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test polling vs long-polling for payment status")
+    parser.add_argument("--payments", type=int, default=50)
+    parser.add_argument("--max-settle-seconds", type=float, default=6.0, help="Payments are processed 0.5..N seconds after the start")
+    parser.add_argument("--poll-seconds", type=float, default=1.0, help="Client poll interval, and the wait's re-read interval without a notifier")
+    parser.add_argument("--wait-timeout", type=float, default=4.0, help="timeout= of each /wait request")
+    parser.add_argument("--stream-delay-ms", type=float, default=200.0, help="Time from an update to its stream record reaching the change feed")
+    parser.add_argument("--dynamodb-ms", type=float, default=5.0, help="Latency added to every DynamoDB request")
+    parser.add_argument("--redis-url", help="Redis for the redis notifier; a fakeredis server by default")
+    args = parser.parse_args()
+
+    endpoint_url, server = start_stand_in()
+    redis_url, redis_server = (args.redis_url, None) if args.redis_url else start_redis_stand_in()
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    os.environ["AWS_ENDPOINT_URL"] = endpoint_url
+    sys.path.insert(0, os.path.join(HERE, ".."))
+    from boto3.dynamodb.types import TypeSerializer
+    import payment_change_feed
+    import payment_notifier
+    import payment_processor
+
+    dynamodb = payment_processor.get_dynamodb()
+    dynamodb.meta.client.meta.events.register("before-send.dynamodb", lambda **kwargs: time.sleep(args.dynamodb_ms / 1000.0))
+    counter = GetItemCounter(dynamodb.meta.client)
+    serializer = TypeSerializer()
+    payment_processor.PAYMENT_WAIT_POLL_SECONDS = args.poll_seconds
+    payment_notifier.PAYMENT_NOTIFIER_REDIS_URL = redis_url
+
+    print(f"{args.payments} payments settling within {args.max_settle_seconds} s, poll every {args.poll_seconds} s, "
+          f"wait timeout {args.wait_timeout} s, stream delay {args.stream_delay_ms:.0f} ms")
+    print(f"{'client':>6} {'notifier':>9} {'requests/payment':>17} {'GetItem/payment':>16} {'lag p50 ms':>11} {'lag p95 ms':>11}")
+    for client_mode, notifier_backend in MODES:
+        random.seed(1)
+        table, items = create_table(dynamodb, args.payments)
+        payment_processor.DYNAMODB_TABLE_NAME = table.name
+        payment_notifier.PAYMENT_NOTIFIER_BACKEND = notifier_backend
+        payment_notifier._notifier = None
+        counter.calls = 0
+
+        started = time.monotonic()
+        settle_at = sorted((started + random.uniform(0.5, args.max_settle_seconds), item) for item in items)
+        updated_at, seen_at, requests = {}, {}, []
+
+        def settle():
+            for at, item in settle_at:
+                time.sleep(max(0.0, at - time.monotonic()))
+                item = {**item, "status": "PROCESSED"}
+                table.put_item(Item=item)
+                updated_at[item["paymentId"]] = time.monotonic()
+                record = {
+                    "eventName": "MODIFY",
+                    "dynamodb": {
+                        "Keys": {"paymentId": {"S": item["paymentId"]}},
+                        "NewImage": {key: serializer.serialize(value) for key, value in item.items()},
+                    },
+                }
+                threading.Timer(args.stream_delay_ms / 1000.0, payment_change_feed.lambda_handler, ({"Records": [record]}, None)).start()
+
+        def client(payment_id):
+            sent = 0
+            while True:
+                sent += 1
+                if client_mode == "poll":
+                    response = payment_processor.lambda_handler(get_event(payment_id), None)
+                    done = '"PROCESSED"' in response["body"]
+                else:
+                    response = payment_processor.lambda_handler(get_event(payment_id, args.wait_timeout), None)
+                    done = response["headers"]["X-Payment-Wait"] == "changed"
+                if response["statusCode"] != 200:
+                    raise RuntimeError(f"GET returned {response['statusCode']}: {response['body']}")
+                if done:
+                    seen_at[payment_id] = time.monotonic()
+                    return sent
+                if client_mode == "poll":
+                    time.sleep(args.poll_seconds)
+
+        settler = threading.Thread(target=settle)
+        settler.start()
+        with ThreadPoolExecutor(max_workers=args.payments) as pool:
+            requests = list(pool.map(client, [item["paymentId"] for item in items]))
+        settler.join()
+
+        lags = [(seen_at[p] - updated_at[p]) * 1000 for p in seen_at]
+        p95 = statistics.quantiles(lags, n=20)[-1]
+        print(f"{client_mode:>6} {notifier_backend:>9} {sum(requests) / args.payments:>17.2f} "
+              f"{counter.calls / args.payments:>16.2f} {statistics.median(lags):>11.0f} {p95:>11.0f}")
+
+    server.stop()
+    if redis_server is not None:
+        redis_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#####################################################################
+#Check: the PaymentRequest schema is the same at the edge and in code
+####################################################################
+# scripts/check_payment_schema.py
+#
+# Exits with status 1, listing every problem, unless:
+#   - the payment_request_model in each Terraform file takes its schema from
+#     payment_request_schema.json with file(), not an inline copy
+#   - every Lambda zip that packages payment_validation.py also packages
+#     payment_request_schema.json (the module reads it at import)
+#   - payment_validation compiles the schema, i.e. it uses only keywords the
+#     compiled validator implements
+#   - the common layer copies in Needium-APIGateway-Serv-Int match these files
+#     (apart from the module's path comment)
+#   - with the jsonschema package installed, the compiled validator accepts and
+#     rejects exactly what a draft-04 validator does on a generated set of requests
+#
+# Usage (from the APIGateway-Payment-Microservice directory), e.g. in CI:
+#   pip install jsonschema
+#   python scripts/check_payment_schema.py
+import itertools
+import os
+import re
+import sys
+from decimal import Decimal
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+TERRAFORM_FILES = ("main.tf", "apigateway_Waf_main.tf")
+LAYER = os.path.join(ROOT, "..", "Needium-APIGateway-Serv-Int", "lambdas", "common_layer", "python")
+SCHEMA_FILE = "payment_request_schema.json"
+
+# Values tried for every property, missing fields, and non-object requests
+PROPERTY_VALUES = [
+    None, True, False, 0, 1, -5, 0.001, 0.01, 12.5, Decimal("0.009"), Decimal("0.01"), Decimal("1E+3"),
+    "", "USD", "usd", "US", "USDX", "U$D", "USD\n", "x" * 255, "x" * 256, [], {}, ["USD"],
+]
+BASE_REQUEST = {"amount": Decimal("10.00"), "currency": "USD", "description": "Invoice"}
+
+
+def resource_block(text, resource_type, name):
+    """Returns the body of `resource "<type>" "<name>" { ... }`, or None."""
+    match = re.search(rf'resource "{resource_type}" "{name}" {{\n(.*?)\n}}\n', text, re.S)
+    return match.group(1) if match else None
+
+
+def check_terraform(problems):
+    schema_line = re.compile(r'^\s*schema\s*=\s*file\("\$\{path\.module\}/' + re.escape(SCHEMA_FILE) + r'"\)\s*$', re.M)
+    for filename in TERRAFORM_FILES:
+        with open(os.path.join(ROOT, filename), encoding="utf-8") as f:
+            text = f.read()
+        model = resource_block(text, "aws_api_gateway_model", "payment_request_model")
+        if model is not None and not schema_line.search(model):
+            problems.append(f"{filename}: payment_request_model must use schema = file(\"${{path.module}}/{SCHEMA_FILE}\")")
+        for zip_name, body in re.findall(r'data "archive_file" "(\w+)" \{\n(.*?)\n\}\n', text, re.S):
+            if 'filename = "payment_validation.py"' in body and f'filename = "{SCHEMA_FILE}"' not in body:
+                problems.append(f"{filename}: {zip_name} packages payment_validation.py without {SCHEMA_FILE}")
+
+
+def without_path_comment(path):
+    with open(path, encoding="utf-8") as f:
+        return [line for line in f.read().splitlines() if not re.match(r"^# \S+\.py$", line)]
+
+
+def check_layer_copies(problems):
+    for filename in ("payment_validation.py", SCHEMA_FILE):
+        if without_path_comment(os.path.join(ROOT, filename)) != without_path_comment(os.path.join(LAYER, filename)):
+            problems.append(f"Needium-APIGateway-Serv-Int common layer: {filename} differs from this directory's copy")
+
+
+def generated_requests():
+    yield from (None, [], "payment", 10, [BASE_REQUEST])
+    yield dict(BASE_REQUEST)
+    for field in BASE_REQUEST:
+        yield {k: v for k, v in BASE_REQUEST.items() if k != field}
+        for value in PROPERTY_VALUES:
+            yield {**BASE_REQUEST, field: value}
+    yield {**BASE_REQUEST, "unknownField": 1}
+    for amount, currency in itertools.product(PROPERTY_VALUES, repeat=2):
+        yield {"amount": amount, "currency": currency}
+
+
+def check_against_jsonschema(payment_validation, problems):
+    try:
+        from jsonschema import Draft4Validator
+    except ImportError:
+        print("jsonschema is not installed; skipping the comparison with a draft-04 validator")
+        return 0
+    reference = Draft4Validator(payment_validation.PAYMENT_REQUEST_SCHEMA)
+    checked = 0
+    for request in generated_requests():
+        checked += 1
+        expected = reference.is_valid(request)
+        error = payment_validation.payment_request_error(request)
+        if expected != (error is None):
+            problems.append(f"{request!r}: draft-04 says {'valid' if expected else 'invalid'}, payment_validation says {error or 'valid'}")
+    return checked
+
+
+def main():
+    sys.path.insert(0, ROOT)
+    problems = []
+    check_terraform(problems)
+    check_layer_copies(problems)
+    try:
+        import payment_validation
+    except ValueError as e:
+        problems.append(f"payment_validation cannot compile {SCHEMA_FILE}: {e}")
+        checked = 0
+    else:
+        checked = check_against_jsonschema(payment_validation, problems)
+
+    for problem in problems:
+        print(problem)
+    if problems:
+        sys.exit(1)
+    print(f"OK: Terraform, layer copies and {checked} generated requests agree with {SCHEMA_FILE}")
+
+
+if __name__ == "__main__":
+    main()
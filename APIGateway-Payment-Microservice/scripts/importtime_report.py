@@ -0,0 +1,135 @@
+#####################################################################
+#Startup report: module import time per Lambda function
+####################################################################
+# scripts/importtime_report.py
+#
+# Imports each function's handler module in a fresh interpreter under
+# `python -X importtime` and reports the median cumulative import time over
+# --runs runs (after one warm-up run that compiles the .pyc files), plus the
+# heaviest direct imports. This is the part of a cold start's init duration
+# the function's own code controls.
+#
+# --output writes the report as JSON; --baseline compares against such a file
+# and exits with status 1 when a function got slower by more than --threshold
+# percent, so a CI job can catch init duration regressions.
+#
+# Usage (from the APIGateway-Payment-Microservice directory):
+#   python scripts/importtime_report.py --output importtime.json
+#   python scripts/importtime_report.py --baseline importtime.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+
+# function name -> (module to import, directories on the function's sys.path)
+FUNCTIONS = {
+    "lambda_authorizer": ("lambda_authorizer", [ROOT]),
+    "payment_processor": ("payment_processor", [ROOT]),
+    "payment_change_feed": ("payment_change_feed", [ROOT]),
+}
+
+# Module-level config lookups need these, but nothing should reach the network at import time
+FIXED_ENV = {
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "importtime",
+    "AWS_SECRET_ACCESS_KEY": "importtime",
+    "PYTHONHASHSEED": "0",
+}
+
+
+def parse_importtime(stderr):
+    """Returns [(depth, module, self_us, cumulative_us)] in the order -X importtime prints them."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        entries.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def import_once(module, paths):
+    env = {**{k: v for k, v in os.environ.items() if k in ("PATH", "HOME", "VIRTUAL_ENV")}, **FIXED_ENV}
+    env["PYTHONPATH"] = os.pathsep.join(os.path.abspath(p) for p in paths)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.splitlines()[-1] if result.stderr else ''}")
+    entries = parse_importtime(result.stderr)
+
+    # Children are printed before their parent, one indentation level deeper
+    for index, (depth, name, _, cumulative_us) in enumerate(entries):
+        if depth == 0 and name == module:
+            children = []
+            for child_depth, child_name, _, child_cumulative in reversed(entries[:index]):
+                if child_depth == 0:
+                    break
+                if child_depth == 1:
+                    children.append((child_name, child_cumulative))
+            return cumulative_us, children
+    raise RuntimeError(f"{module} not found in -X importtime output")
+
+
+def measure(module, paths, runs, top):
+    import_once(module, paths)  # warm-up: writes __pycache__
+    totals, children_by_run = [], []
+    for _ in range(runs):
+        total, children = import_once(module, paths)
+        totals.append(total)
+        children_by_run.append(dict(children))
+    names = set().union(*children_by_run)
+    heaviest = sorted(
+        ((name, statistics.median(run.get(name, 0) for run in children_by_run)) for name in names),
+        key=lambda item: item[1], reverse=True,
+    )[:top]
+    return {"import_ms": statistics.median(totals) / 1000, "heaviest": [[name, us / 1000] for name, us in heaviest]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import time per Lambda function")
+    parser.add_argument("--functions", default=",".join(FUNCTIONS), help="Comma separated subset of " + ", ".join(FUNCTIONS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest direct imports to list per function")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Allowed slowdown vs the baseline, in percent")
+    args = parser.parse_args()
+
+    report = {"python": sys.version.split()[0], "functions": {}}
+    for function in args.functions.split(","):
+        module, paths = FUNCTIONS[function]
+        report["functions"][function] = measure(module, paths, args.runs, args.top)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["functions"]
+
+    regressions = []
+    print(f"{'function':<32} {'import ms':>10} {'baseline':>10}  heaviest direct imports (ms)")
+    for function, result in report["functions"].items():
+        previous = baseline.get(function, {}).get("import_ms")
+        heaviest = ", ".join(f"{name} {ms:.1f}" for name, ms in result["heaviest"])
+        shown = f"{previous:.1f}" if previous is not None else "-"
+        print(f"{function:<32} {result['import_ms']:>10.1f} {shown:>10}  {heaviest}")
+        if previous and result["import_ms"] > previous * (1 + args.threshold / 100):
+            regressions.append(function)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if regressions:
+        print(f"import time regressed by more than {args.threshold:.0f}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
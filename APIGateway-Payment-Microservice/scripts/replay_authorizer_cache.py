@@ -0,0 +1,101 @@
+#####################################################################
+#Replay: API Gateway authorizer cache hit ratio per policy style
+####################################################################
+# scripts/replay_authorizer_cache.py
+#
+# Replays a mixed-route request log through a model of API Gateway's TOKEN
+# authorizer cache (keyed by the Authorization header, TTL 300s) and counts how
+# often the cached policy covers the next request. A request whose route is
+# not covered by the cached policy needs the authorizer to run again.
+#
+# Compares the old exact-methodArn policy with policy_builder.PolicyBuilder.
+#
+# Usage (from the APIGateway-Payment-Microservice directory):
+#   python scripts/replay_authorizer_cache.py --users 200 --requests 20000
+import argparse
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from policy_builder import PolicyBuilder  # noqa: E402
+
+STAGE_ARN = "arn:aws:execute-api:us-east-2:123456789012:a1b2c3d4e5/dev"
+ROUTES = [
+    ("POST", "payments"),
+    ("GET", "payments"),
+    ("GET", "payments/{id}"),
+    ("GET", "telemedicine/appointments"),
+    ("POST", "telemedicine/appointments"),
+]
+ROLE_ROUTES = {
+    "customer": ["GET/payments", "POST/payments", "GET/payments/*"],
+    "patient": ["GET/payments", "GET/payments/*", "*/telemedicine/*"],
+}
+
+
+def exact_arn_policy(principal_id, effect, method_arn, roles=()):
+    """The authorizer's original policy: only the methodArn that triggered it."""
+    return {
+        'principalId': principal_id,
+        'policyDocument': {'Statement': [{'Effect': effect, 'Resource': method_arn}]},
+    }
+
+
+def _compile(resource):
+    return re.compile("^" + ".*".join(re.escape(part) for part in resource.split("*")) + "$")
+
+
+def policy_allows(policy, method_arn):
+    for statement in policy['policyDocument']['Statement']:
+        resources = statement['Resource']
+        if isinstance(resources, str):
+            resources = [resources]
+        if statement['Effect'] == 'Allow' and any(_compile(r).match(method_arn) for r in resources):
+            return True
+    return False
+
+
+def build_log(users, requests, seed):
+    rng = random.Random(seed)
+    sessions = [(f"token-{i}", rng.choice(list(ROLE_ROUTES))) for i in range(users)]
+    log = []
+    for n in range(requests):
+        token, role = rng.choice(sessions)
+        allowed = [(m, p) for m, p in ROUTES if role == "patient" or not p.startswith("telemedicine")]
+        method, path = rng.choice(allowed)
+        path = path.replace("{id}", str(rng.randrange(50)))
+        log.append((n * 0.05, token, role, f"{STAGE_ARN}/{method}/{path}"))
+    return log
+
+
+def replay(log, policy_fn, ttl=300):
+    cache = {}  # token -> (expires_at, policy)
+    hits = invocations = 0
+    for now, token, role, method_arn in log:
+        entry = cache.get(token)
+        if entry and entry[0] > now and policy_allows(entry[1], method_arn):
+            hits += 1
+            continue
+        invocations += 1
+        cache[token] = (now + ttl, policy_fn(token, 'Allow', method_arn, [role]))
+    return hits, invocations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay mixed-route traffic through an authorizer cache model")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    log = build_log(args.users, args.requests, args.seed)
+    builder = PolicyBuilder(ROLE_ROUTES)
+    for label, policy_fn in (("exact methodArn", exact_arn_policy), ("role-scoped wildcard", builder.build)):
+        hits, invocations = replay(log, policy_fn)
+        print(f"{label:22} hit ratio {hits / len(log):6.1%}  authorizer invocations {invocations}")
+
+
+if __name__ == "__main__":
+    main()
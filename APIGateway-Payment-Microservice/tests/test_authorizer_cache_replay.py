@@ -0,0 +1,40 @@
+#######################################################
+#Tests for the Authorizer Cache Hit Ratio on Mixed Routes
+#######################################################
+# tests/test_authorizer_cache_replay.py
+#
+# Runs scripts/replay_authorizer_cache.py's model of API Gateway's authorizer
+# cache over its mixed-route trace, once per policy style.
+import importlib.util
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from policy_builder import PolicyBuilder  # noqa: E402
+
+_spec = importlib.util.spec_from_file_location(
+    "replay_authorizer_cache", os.path.join(HERE, "..", "scripts", "replay_authorizer_cache.py"))
+replay_authorizer_cache = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(replay_authorizer_cache)
+
+LOG = replay_authorizer_cache.build_log(users=50, requests=5000, seed=7)
+
+
+def hit_ratio(policy_fn):
+    hits, invocations = replay_authorizer_cache.replay(LOG, policy_fn)
+    assert hits + invocations == len(LOG)
+    return hits / len(LOG)
+
+
+def test_role_scoped_policy_beats_per_method_policy():
+    exact = hit_ratio(replay_authorizer_cache.exact_arn_policy)
+    role_scoped = hit_ratio(PolicyBuilder(replay_authorizer_cache.ROLE_ROUTES).build)
+    assert role_scoped > exact
+
+
+def test_stage_wide_policy_beats_per_method_policy():
+    exact = hit_ratio(replay_authorizer_cache.exact_arn_policy)
+    stage_wide = hit_ratio(PolicyBuilder().build)
+    assert stage_wide > exact
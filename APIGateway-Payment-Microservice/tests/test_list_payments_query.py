@@ -0,0 +1,41 @@
+#######################################################
+#Tests for the GET /payments Query String
+#######################################################
+# tests/test_list_payments_query.py
+#
+# Every request here is rejected before DynamoDB is queried.
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import payment_processor  # noqa: E402
+
+
+def list_payments(params):
+    event = {'requestContext': {'authorizer': {'principalId': 'user-1'}}, 'queryStringParameters': params}
+    response = payment_processor.handle_list_payments(event)
+    return response['statusCode'], json.loads(response['body'])['message']
+
+
+@pytest.fixture(autouse=True)
+def no_dynamodb(monkeypatch):
+    def query_user_payments(*args, **kwargs):
+        raise AssertionError("DynamoDB must not be queried")
+    monkeypatch.setattr(payment_processor, 'query_user_payments', query_user_payments)
+
+
+def test_from_later_than_to_is_rejected():
+    assert list_payments({'from': '2024-02-01T00:00:00Z', 'to': '2024-01-01T00:00:00Z'}) == (
+        400, 'Invalid query parameters: from must not be later than to')
+
+
+@pytest.mark.parametrize("name", ['from', 'to'])
+@pytest.mark.parametrize("value", ['yesterday', '2024-13-01', '2024-01-01T25:00:00Z'])
+def test_malformed_bound_is_rejected(name, value):
+    status_code, message = list_payments({name: value})
+    assert status_code == 400
+    assert message.startswith(f'Invalid query parameters: {name} must be an ISO 8601 date or time')
@@ -0,0 +1,54 @@
+#######################################################
+#Tests for NaN and Infinity in Payment Requests
+#######################################################
+# tests/test_non_finite_numbers.py
+import json
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import api_responses  # noqa: E402
+import payment_processor  # noqa: E402
+from payment_validation import payment_request_error  # noqa: E402
+
+NON_FINITE_BODIES = [
+    '{"amount": NaN, "currency": "USD"}',
+    '{"amount": Infinity, "currency": "USD"}',
+    '{"amount": -Infinity, "currency": "USD"}',
+]
+
+
+@pytest.mark.parametrize("body", NON_FINITE_BODIES)
+def test_loads_rejects_non_finite_numbers(body):
+    with pytest.raises(ValueError):
+        api_responses.loads(body)
+
+
+def test_loads_keeps_finite_numbers_exact():
+    assert api_responses.loads('{"amount": 10.10, "count": 3}') == {"amount": Decimal("10.10"), "count": 3}
+
+
+@pytest.mark.parametrize("amount", [float("nan"), float("inf"), Decimal("NaN"), Decimal("sNaN"), Decimal("-Infinity")])
+def test_validator_rejects_non_finite_amounts(amount):
+    assert payment_request_error({"amount": amount, "currency": "USD"}) == "amount must be a number"
+
+
+def test_validator_accepts_finite_amounts():
+    assert payment_request_error({"amount": Decimal("0.01"), "currency": "USD"}) is None
+
+
+@pytest.mark.parametrize("body", NON_FINITE_BODIES)
+def test_create_payment_answers_invalid_json(body):
+    response = payment_processor.handle_create_payment({"body": body})
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"]) == {"message": "Invalid JSON body"}
+
+
+def test_create_payments_batch_answers_invalid_json():
+    response = payment_processor.handle_create_payments_batch({"body": '{"payments": [{"amount": NaN, "currency": "USD"}]}'})
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"]) == {"message": "Invalid JSON body"}
@@ -0,0 +1,46 @@
+#######################################################
+#Tests for the Authorizer Policy Builder
+#######################################################
+# tests/test_policy_builder.py
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from policy_builder import PolicyBuilder  # noqa: E402
+
+METHOD_ARN = "arn:aws:execute-api:us-east-1:123456789012:abc123/prod/GET/payments/42"
+STAGE_ARN = "arn:aws:execute-api:us-east-1:123456789012:abc123/prod"
+ROLE_ROUTES = {"customer": ["GET/payments", "GET/payments/*"], "patient": ["*/telemedicine/*"]}
+
+
+def statement(policy):
+    (only,) = policy['policyDocument']['Statement']
+    return only['Effect'], only['Resource']
+
+
+def test_without_role_routes_a_valid_token_gets_the_whole_stage():
+    policy = PolicyBuilder().build("user-1", 'Allow', METHOD_ARN, roles=())
+    assert statement(policy) == ('Allow', [f"{STAGE_ARN}/*/*"])
+
+
+def test_mapped_roles_get_their_routes():
+    policy = PolicyBuilder(ROLE_ROUTES).build("user-1", 'Allow', METHOD_ARN, roles=["customer", "patient"])
+    assert statement(policy) == ('Allow', [
+        f"{STAGE_ARN}/GET/payments", f"{STAGE_ARN}/GET/payments/*", f"{STAGE_ARN}/*/telemedicine/*",
+    ])
+
+
+def test_caller_without_roles_is_denied_once_roles_are_mapped():
+    policy = PolicyBuilder(ROLE_ROUTES).build("user-1", 'Allow', METHOD_ARN, roles=())
+    assert statement(policy) == ('Deny', [f"{STAGE_ARN}/*"])
+
+
+def test_caller_with_only_unmapped_roles_is_denied():
+    policy = PolicyBuilder(ROLE_ROUTES).build("user-1", 'Allow', METHOD_ARN, roles=["admin"])
+    assert statement(policy) == ('Deny', [f"{STAGE_ARN}/*"])
+
+
+def test_deny_covers_the_whole_stage():
+    policy = PolicyBuilder(ROLE_ROUTES).build("user-1", 'Deny', METHOD_ARN, roles=["customer"])
+    assert statement(policy) == ('Deny', [f"{STAGE_ARN}/*"])
@@ -0,0 +1,73 @@
+#######################################################
+#Tests for GET /payments/{paymentId}/wait
+#######################################################
+# tests/test_wait_payment_notifier.py
+#
+# DynamoDB is replaced by a list of payment states, one per read.
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import payment_notifier  # noqa: E402
+import payment_processor  # noqa: E402
+
+PAYMENT_ID = 'pay-1'
+
+
+class UnreachableNotifier:
+    def subscribe(self, payment_id):
+        raise ConnectionError("Error 111 connecting to redis:6379. Connection refused.")
+
+
+def entry(status):
+    return payment_processor.payment_entry({'paymentId': PAYMENT_ID, 'userId': 'user-1', 'status': status})
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """The statuses the next reads return (the last one repeats); records each read."""
+    statuses = ['PENDING']
+    calls = []
+
+    def load_payment(payment_id):
+        calls.append(payment_id)
+        return entry(statuses[min(len(calls), len(statuses)) - 1])
+    monkeypatch.setattr(payment_processor, 'load_payment', load_payment)
+    monkeypatch.setattr(payment_processor, 'PAYMENT_WAIT_POLL_SECONDS', 0.01)
+    return statuses, calls
+
+
+def wait(timeout='1'):
+    event = {
+        'pathParameters': {'paymentId': PAYMENT_ID},
+        'requestContext': {'authorizer': {'principalId': 'user-1'}},
+        'queryStringParameters': {'timeout': timeout},
+    }
+    return payment_processor.handle_wait_payment(event)
+
+
+def test_notification_answers_after_a_single_read(monkeypatch, reads):
+    statuses, calls = reads
+    notifier = payment_notifier.MemoryNotifier()
+    monkeypatch.setattr(payment_notifier, '_notifier', notifier)
+    threading.Timer(0.05, notifier.publish, (PAYMENT_ID, entry('PROCESSED'))).start()
+
+    response = wait()
+    assert response['statusCode'] == 200
+    assert response['headers']['X-Payment-Wait'] == 'changed'
+    assert calls == [PAYMENT_ID]
+
+
+def test_unreachable_notifier_falls_back_to_polling(monkeypatch, reads):
+    statuses, calls = reads
+    statuses[:] = ['PENDING', 'PENDING', 'PROCESSED']
+    monkeypatch.setattr(payment_notifier, '_notifier', UnreachableNotifier())
+
+    response = wait()
+    assert response['statusCode'] == 200
+    assert response['headers']['X-Payment-Wait'] == 'changed'
+    assert len(calls) == 3
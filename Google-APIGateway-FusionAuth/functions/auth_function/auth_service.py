@@ -0,0 +1,153 @@
+#######################################################
+#FusionAuth ExtAuth Service for Cloud Run (ASGI)
+#######################################################
+# functions/auth_function/auth_service.py
+#
+# The Cloud Function serves one request per instance at a time, so each
+# instance spends nearly all of its time waiting on FusionAuth. This is the
+# same authorizer as an asyncio ASGI app, run by uvicorn on Cloud Run (see
+# auth.Dockerfile) where one instance serves up to `max_instance_request_concurrency`
+# requests at once over a shared pool of FusionAuth connections:
+# - Same contract as main.handler: any method and path, the Authorization
+#   header in, the status codes and JSON bodies of ext_auth.RESPONSES and
+#   the X-Identity-Envelope header of allowed requests out.
+# - Same TokenCache, shared by all requests on the instance.
+# - Concurrent requests carrying the same uncached token wait on a single
+#   FusionAuth call instead of each making their own.
+import asyncio
+import os
+
+import requests
+
+from ext_auth import JSON_HEADERS, RESPONSES, bearer_token, identity_headers, trace_id
+from fusionauth_async_client import AsyncFusionAuthClient
+from fusionauth_client import CircuitOpenError
+from structured_logging import get_logger, log_event, set_request_id
+from token_cache import TokenCache
+
+logger = get_logger('auth_service')
+
+FUSIONAUTH_DOMAIN = os.environ.get('FUSIONAUTH_DOMAIN')
+FUSIONAUTH_API_KEY = os.environ.get('FUSIONAUTH_API_KEY') # Use an API key with JWT validation permissions
+TOKEN_CACHE_MAX_ENTRIES = int(os.environ.get('TOKEN_CACHE_MAX_ENTRIES', '1024'))
+TOKEN_CACHE_MAX_TTL_SECONDS = int(os.environ.get('TOKEN_CACHE_MAX_TTL_SECONDS', '300'))
+
+_token_cache = TokenCache(max_entries=TOKEN_CACHE_MAX_ENTRIES, max_ttl_seconds=TOKEN_CACHE_MAX_TTL_SECONDS)
+_fusionauth_client = None
+_in_flight = {} # token -> Future of its FusionAuth validation result
+
+def encode_headers(headers):
+    return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()]
+
+RESPONSE_HEADERS = encode_headers(JSON_HEADERS)
+ENCODED_RESPONSES = {name: (status_code, body.encode('utf-8')) for name, (status_code, body) in RESPONSES.items()}
+
+
+def get_fusionauth_client():
+    """Created on first use inside the event loop, which its connection pool belongs to."""
+    global _fusionauth_client
+    if _fusionauth_client is None:
+        _fusionauth_client = AsyncFusionAuthClient.from_env(FUSIONAUTH_DOMAIN, FUSIONAUTH_API_KEY)
+    return _fusionauth_client
+
+
+async def validate_once(jwt):
+    """FusionAuth's validation of `jwt`, shared with every request asking about the same token meanwhile."""
+    future = _in_flight.get(jwt)
+    if future is not None:
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise # this request itself was cancelled
+            # The request making the call went away, taking the call with it
+            raise requests.exceptions.ConnectionError("FusionAuth validation was cancelled with the request that made it")
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[jwt] = future
+    try:
+        result = await get_fusionauth_client().validate_jwt(jwt)
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        future.exception() # retrieved, so an unawaited failure is not logged as such
+        raise
+    except asyncio.CancelledError:
+        future.cancel() # the requests waiting on this call are cancelled with it
+        raise
+    finally:
+        del _in_flight[jwt]
+
+
+async def authorize(headers):
+    """
+    The ext_auth.RESPONSES name for a request with these (lower-cased)
+    headers, and the token's claims when it is allowed.
+    """
+    jwt = bearer_token(headers.get('authorization'))
+
+    if jwt is None:
+        logger.warning("Invalid or missing Bearer token in Authorization header.")
+        return 'missing_token', None
+
+    claims = _token_cache.get(jwt)
+    if claims is not None:
+        logger.debug("Token cache hit, stats: %s", _token_cache.stats())
+        return 'ok', claims
+
+    try:
+        logger.debug("Calling FusionAuth for JWT validation: %s/api/jwt/validate", FUSIONAUTH_DOMAIN)
+        validation_result = await validate_once(jwt) # Raises for HTTP errors (4xx or 5xx)
+        logger.info("FusionAuth validation result: valid=%s", validation_result.get('isValid')) # the claims stay out of the logs
+
+        if validation_result.get('isValid'):
+            claims = validation_result.get('jwt', {})
+            _token_cache.put(jwt, claims)
+            return 'ok', claims
+        logger.warning("JWT validation failed by FusionAuth: %s", validation_result.get('error', 'No specific error provided'))
+        return 'invalid_token', None
+
+    except CircuitOpenError as e:
+        logger.error("%s", e)
+        return 'circuit_open', None
+    except requests.exceptions.RequestException as e:
+        logger.error("Error calling FusionAuth API: %s", e)
+        return 'fusionauth_error', None
+    except Exception as e:
+        logger.exception("Unexpected error in auth_service: %s", e)
+        return 'internal_error', None
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            get_fusionauth_client()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            global _fusionauth_client
+            if _fusionauth_client is not None:
+                await _fusionauth_client.aclose()
+                _fusionauth_client = None
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+    # The trace ID ties these lines to the gateway's request log
+    set_request_id(trace_id(headers.get('x-cloud-trace-context')))
+    log_event(logger, {'method': scope['method'], 'path': scope['path'], 'headers': headers}, "Received request for auth_service")
+
+    name, claims = await authorize(headers)
+    status_code, body = ENCODED_RESPONSES[name]
+    response_headers = RESPONSE_HEADERS + [(b'content-length', str(len(body)).encode('latin-1'))]
+    if claims is not None:
+        response_headers += encode_headers(identity_headers(claims))
+    await send({'type': 'http.response.start', 'status': status_code, 'headers': response_headers})
+    await send({'type': 'http.response.body', 'body': body})
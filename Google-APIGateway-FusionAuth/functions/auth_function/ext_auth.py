@@ -0,0 +1,52 @@
+#######################################################
+#ExtAuth Request/Response Contract of the FusionAuth Authorizer
+#######################################################
+# functions/auth_function/ext_auth.py
+#
+# What API Gateway's extensible authentication sends and gets back, shared by
+# the Cloud Function (main.py) and the Cloud Run service (auth_service.py) so
+# both answer every request identically.
+import json
+import os
+
+import identity_envelope
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Signs the X-Identity-Envelope header of allowed requests; no envelope is sent while it is unset
+IDENTITY_ENVELOPE_SECRET = os.environ.get('IDENTITY_ENVELOPE_SECRET')
+IDENTITY_ENVELOPE_TTL_SECONDS = int(os.environ.get('IDENTITY_ENVELOPE_TTL_SECONDS', '60'))
+
+# name -> (status code, encoded JSON body)
+RESPONSES = {
+    name: (status_code, json.dumps(body))
+    for name, (status_code, body) in {
+        'ok': (200, {"status": "OK"}),
+        'missing_token': (401, {"status": "UNAUTHENTICATED", "message": "Missing or invalid Authorization header"}),
+        'invalid_token': (401, {"status": "UNAUTHENTICATED", "message": "Invalid token"}),
+        # FusionAuth is degraded: the circuit breaker fails fast instead of holding the request on a hung socket.
+        # Same status as any other FusionAuth failure, which is what API Gateway has always been answered
+        'circuit_open': (500, {"status": "UNAUTHENTICATED", "message": "Authentication service unavailable"}),
+        'fusionauth_error': (500, {"status": "UNAUTHENTICATED", "message": "Authentication service unavailable"}),
+        'internal_error': (500, {"status": "UNAUTHENTICATED", "message": "Internal server error"}),
+    }.items()
+}
+
+
+def bearer_token(auth_header):
+    """The JWT of an 'Authorization: Bearer <jwt>' header, or None."""
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None
+    return auth_header.split(" ")[1]
+
+
+def trace_id(trace_context):
+    """The trace ID of an X-Cloud-Trace-Context header ("TRACE_ID/SPAN_ID;o=1"), or None."""
+    return (trace_context or '').split('/')[0] or None
+
+
+def identity_headers(claims):
+    """The headers, besides JSON_HEADERS, of a request allowed with these JWT claims."""
+    if not IDENTITY_ENVELOPE_SECRET:
+        return {}
+    return {identity_envelope.HEADER: identity_envelope.sign(claims, IDENTITY_ENVELOPE_SECRET, IDENTITY_ENVELOPE_TTL_SECONDS)}
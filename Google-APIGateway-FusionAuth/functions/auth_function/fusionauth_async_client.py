@@ -0,0 +1,112 @@
+#######################################################
+#Async Pooled HTTP Client for FusionAuth
+#######################################################
+# functions/auth_function/fusionauth_async_client.py
+import asyncio
+import json
+import os
+import random
+
+import httpx
+import requests
+
+from fusionauth_client import CircuitBreaker, CircuitOpenError, FusionAuthClient
+
+
+class AsyncFusionAuthClient:
+    """
+    FusionAuthClient for the asyncio auth service (auth_service.py): one
+    httpx.AsyncClient whose keep-alive pool is shared by every request the
+    instance is serving at once, the same timeouts, jittered retries and
+    circuit breaker, and the same exceptions (requests' ConnectionError,
+    Timeout and HTTPError, CircuitOpenError) so callers handle both alike.
+    """
+
+    RETRYABLE_STATUS = FusionAuthClient.RETRYABLE_STATUS
+
+    def __init__(self, base_url, api_key=None, connect_timeout=1.0, read_timeout=2.0,
+                 max_retries=2, backoff_base=0.05, pool_size=20, breaker=None):
+        self.base_url = (base_url or '').rstrip('/')
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.breaker = breaker or CircuitBreaker()
+
+        # Sent on the validate call only, never on public endpoints
+        self.api_key = api_key
+        # httpx does not retry either; retries happen in _request so the breaker sees them
+        self.client = httpx.AsyncClient(
+            headers={'Content-Type': 'application/json'},
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+        # Calls beyond the pool wait here: httpcore's own queue rescans every connection for every
+        # waiting request, which costs more CPU than the FusionAuth call itself once requests pile up
+        self._slots = asyncio.Semaphore(pool_size)
+
+    @classmethod
+    def from_env(cls, base_url, api_key=None):
+        return cls(
+            base_url,
+            api_key=api_key,
+            connect_timeout=float(os.environ.get('FUSIONAUTH_CONNECT_TIMEOUT', '1.0')),
+            read_timeout=float(os.environ.get('FUSIONAUTH_READ_TIMEOUT', '2.0')),
+            max_retries=int(os.environ.get('FUSIONAUTH_MAX_RETRIES', '2')),
+            # FusionAuth calls in flight at once; well below the instance's request concurrency,
+            # since most checks are answered from the token cache and httpcore's pool bookkeeping
+            # grows with the square of its open connections
+            pool_size=int(os.environ.get('FUSIONAUTH_POOL_SIZE', '20')),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.environ.get('FUSIONAUTH_BREAKER_FAILURES', '5')),
+                reset_timeout=float(os.environ.get('FUSIONAUTH_BREAKER_RESET_SECONDS', '30')),
+            ),
+        )
+
+    async def _request(self, method, url, **kwargs):
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"FusionAuth circuit open, not calling {url}")
+
+        # Every way out of here settles the call, otherwise a half-open trial would never end
+        outcome = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    async with self._slots:
+                        response = await self.client.request(method, url, **kwargs)
+                    if response.status_code not in self.RETRYABLE_STATUS:
+                        outcome = 'success'
+                        return response
+                    error = requests.exceptions.HTTPError(f"{response.status_code} from {url}")
+                except httpx.TimeoutException as e:
+                    error = requests.exceptions.Timeout(str(e) or f"Timed out calling {url}")
+                except httpx.TransportError as e:
+                    error = requests.exceptions.ConnectionError(str(e) or f"Cannot connect to {url}")
+                if attempt < self.max_retries:
+                    await asyncio.sleep(random.uniform(0, self.backoff_base * (2 ** attempt)))
+            raise error
+        except asyncio.CancelledError:
+            # The caller went away; that says nothing about FusionAuth
+            outcome = 'cancelled'
+            raise
+        finally:
+            if outcome == 'success':
+                self.breaker.record_success()
+            elif outcome == 'cancelled':
+                self.breaker.release_trial()
+            else:
+                self.breaker.record_failure()
+
+    async def validate_jwt(self, jwt):
+        """POST /api/jwt/validate; raises for HTTP errors, including FusionAuth's 401 for invalid tokens."""
+        url = f"{self.base_url}/api/jwt/validate"
+        headers = {'Authorization': self.api_key} if self.api_key else None
+        response = await self._request('POST', url, content=json.dumps({"jwt": jwt}), headers=headers)
+        if response.is_error:
+            raise requests.exceptions.HTTPError(f"{response.status_code} from {url}")
+        try:
+            return response.json()
+        except ValueError as e:
+            raise requests.exceptions.InvalidJSONError(f"Invalid JSON from {url}: {e}")
+
+    async def aclose(self):
+        await self.client.aclose()
+
@@ -0,0 +1,100 @@
+#######################################################
+#Signed Identity Envelope Passed from the Authorizer to the Backends
+#######################################################
+# functions/auth_function/identity_envelope.py
+#
+# The authorizer (main.handler, auth_service.app) answers a valid token with
+# an X-Identity-Envelope header that API Gateway forwards to the backend:
+#
+#   v1.<base64url JSON {"sub", "tid", "roles", "exp"}>.<base64url HMAC-SHA256>
+#
+# A backend verifies it with verify() and the shared IDENTITY_ENVELOPE_SECRET
+# instead of validating the JWT against FusionAuth a second time: one HMAC
+# per request. Standard library only, so the Pharmacy and PFM services can
+# copy this file as it is.
+#
+# Envelopes expire after IDENTITY_ENVELOPE_TTL_SECONDS (or with the token, if
+# sooner): long enough to reach the backend, short enough that a captured one
+# is of little use. Verifying against several secrets allows rotation: sign
+# with the new one while backends accept both.
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+HEADER = 'X-Identity-Envelope'
+VERSION = 'v1'
+
+
+class InvalidEnvelope(ValueError):
+    """The envelope is missing, malformed, wrongly signed or expired."""
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _signature(secret, signed_part):
+    if isinstance(secret, str):
+        secret = secret.encode('utf-8')
+    return hmac.new(secret, signed_part.encode('ascii'), hashlib.sha256).digest()
+
+
+def sign(claims, secret, ttl_seconds=60, now=None):
+    """
+    The envelope of a FusionAuth JWT's `claims`: subject, tenant, roles, and
+    an expiry of min(claims['exp'], now + ttl_seconds).
+    """
+    now = int(time.time() if now is None else now)
+    expires = now + ttl_seconds
+    if isinstance(claims.get('exp'), (int, float)):
+        expires = min(expires, int(claims['exp']))
+    identity = {
+        'sub': claims.get('sub'),
+        'tid': claims.get('tid'),
+        'roles': list(claims.get('roles') or []),
+        'exp': expires,
+    }
+    payload = _b64encode(json.dumps(identity, separators=(',', ':')).encode('utf-8'))
+    signed_part = f"{VERSION}.{payload}"
+    return f"{signed_part}.{_b64encode(_signature(secret, signed_part))}"
+
+
+def verify(envelope, secrets, now=None, leeway_seconds=5):
+    """
+    The identity dict ({'sub', 'tid', 'roles', 'exp'}) of `envelope` if it
+    was signed with one of `secrets` (a secret or a list of them) and has not
+    expired; raises InvalidEnvelope otherwise.
+    """
+    if not envelope:
+        raise InvalidEnvelope("Missing identity envelope")
+    parts = envelope.split('.')
+    # HTTP headers may carry any Latin-1 text; the signature covers ASCII only
+    if len(parts) != 3 or parts[0] != VERSION or not envelope.isascii():
+        raise InvalidEnvelope("Malformed identity envelope")
+    try:
+        signature = _b64decode(parts[2])
+    except ValueError:
+        raise InvalidEnvelope("Malformed identity envelope signature")
+
+    signed_part = f"{parts[0]}.{parts[1]}"
+    if isinstance(secrets, (str, bytes)):
+        secrets = [secrets]
+    if not any(hmac.compare_digest(_signature(secret, signed_part), signature) for secret in secrets if secret):
+        raise InvalidEnvelope("Identity envelope signature does not match")
+
+    try:
+        identity = json.loads(_b64decode(parts[1]))
+        expires = identity['exp']
+    except (ValueError, TypeError, KeyError):
+        raise InvalidEnvelope("Malformed identity envelope payload")
+    if not isinstance(expires, int):
+        raise InvalidEnvelope("Malformed identity envelope expiry")
+    if (time.time() if now is None else now) > expires + leeway_seconds:
+        raise InvalidEnvelope("Identity envelope expired")
+    return identity
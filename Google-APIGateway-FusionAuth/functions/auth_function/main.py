@@ -3,67 +3,84 @@
 #FusionAuth Custom Authorizer
 ###########################################################
 
-Python
+# Python
 
 # functions/auth_function/main.py
-import json
 import os
 import requests
-import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from ext_auth import JSON_HEADERS, RESPONSES, bearer_token, identity_headers, trace_id
+from fusionauth_client import CircuitOpenError, FusionAuthClient
+from structured_logging import get_logger, log_event, set_request_id
+from token_cache import TokenCache
+
+# JSON log lines at LOG_LEVEL (default INFO)
+logger = get_logger('auth_function')
 
 FUSIONAUTH_DOMAIN = os.environ.get("FUSIONAUTH_DOMAIN")
 FUSIONAUTH_API_KEY = os.environ.get("FUSIONAUTH_API_KEY")
 
+# Tokens FusionAuth has already validated, reused while the instance stays warm
+TOKEN_CACHE_MAX_ENTRIES = int(os.environ.get("TOKEN_CACHE_MAX_ENTRIES", "1024"))
+TOKEN_CACHE_MAX_TTL_SECONDS = int(os.environ.get("TOKEN_CACHE_MAX_TTL_SECONDS", "300"))
+_token_cache = TokenCache(max_entries=TOKEN_CACHE_MAX_ENTRIES, max_ttl_seconds=TOKEN_CACHE_MAX_TTL_SECONDS)
+
+# Keep-alive connection pool, timeouts, retries and circuit breaker shared by every request on this instance
+_fusionauth_client = FusionAuthClient.from_env(FUSIONAUTH_DOMAIN, FUSIONAUTH_API_KEY)
+
+def _response(name, claims=None):
+    status_code, body = RESPONSES[name]
+    if claims is None:
+        return body, status_code, JSON_HEADERS
+    # The backends take the caller's identity from the signed envelope instead of re-validating the JWT
+    return body, status_code, {**JSON_HEADERS, **identity_headers(claims)}
+
 def handler(request):
     """
     Cloud Function acting as an API Gateway Extensible Authentication (ExtAuth) service.
     It validates a JWT against FusionAuth.
     """
-    logging.info(f"Received request for auth_function: {request}")
+    # The trace ID ties these lines to the gateway's request log
+    set_request_id(trace_id(request.headers.get('X-Cloud-Trace-Context')))
+    log_event(logger, {'method': request.method, 'path': request.path, 'headers': dict(request.headers)}, "Received request for auth_function")
 
     # API Gateway sends the Authorization header in the 'Authorization' field of the request headers.
-    auth_header = request.headers.get('Authorization')
+    jwt = bearer_token(request.headers.get('Authorization'))
 
-    if not auth_header or not auth_header.startswith("Bearer "):
-        logging.warning("Invalid or missing Bearer token in Authorization header.")
-        return json.dumps({"status": "UNAUTHENTICATED", "message": "Missing or invalid Authorization header"}), 401, {'Content-Type': 'application/json'}
+    if jwt is None:
+        logger.warning("Invalid or missing Bearer token in Authorization header.")
+        return _response('missing_token')
 
-    jwt = auth_header.split(" ")[1]
+    claims = _token_cache.get(jwt)
+    if claims is not None:
+        logger.debug("Token cache hit, stats: %s", _token_cache.stats())
+        return _response('ok', claims)
 
     try:
-        # Call FusionAuth to validate the JWT
-        headers = {
-            "Authorization": FUSIONAUTH_API_KEY,
-            "Content-Type": "application/json"
-        }
-        validate_url = f"{FUSIONAUTH_DOMAIN}/api/jwt/validate"
-        body = json.dumps({"jwt": jwt})
-
-        logging.info(f"Calling FusionAuth for JWT validation: {validate_url}")
-        response = requests.post(validate_url, headers=headers, data=body)
-        response.raise_for_status() # Raise an exception for HTTP errors (4xx or 5xx)
-
-        validation_result = response.json()
-        logging.info(f"FusionAuth validation result: {validation_result}")
+        # Call FusionAuth to validate the JWT over the instance's pooled connection
+        logger.debug("Calling FusionAuth for JWT validation: %s/api/jwt/validate", FUSIONAUTH_DOMAIN)
+        validation_result = _fusionauth_client.validate_jwt(jwt) # Raises for HTTP errors (4xx or 5xx)
+        logger.info("FusionAuth validation result: valid=%s", validation_result.get('isValid')) # the claims stay out of the logs
 
         if validation_result.get('isValid'):
+            claims = validation_result.get('jwt', {})
+            _token_cache.put(jwt, claims)
             # If valid, return 200 OK to API Gateway.
             # API Gateway will then allow the request to proceed.
-            # You can also pass claims back to API Gateway if needed for backend services.
-            # For simplicity, we just return a success status.
-            return json.dumps({"status": "OK"}), 200, {'Content-Type': 'application/json'}
+            # The claims go back as the X-Identity-Envelope header, which API Gateway forwards to the backend.
+            return _response('ok', claims)
         else:
-            logging.warning(f"JWT validation failed by FusionAuth: {validation_result.get('error', 'No specific error provided')}")
-            return json.dumps({"status": "UNAUTHENTICATED", "message": "Invalid token"}), 401, {'Content-Type': 'application/json'}
+            logger.warning("JWT validation failed by FusionAuth: %s", validation_result.get('error', 'No specific error provided'))
+            return _response('invalid_token')
 
+    except CircuitOpenError as e:
+        logger.error("%s", e)
+        return _response('circuit_open')
     except requests.exceptions.RequestException as e:
-        logging.error(f"Error calling FusionAuth API: {e}")
-        return json.dumps({"status": "UNAUTHENTICATED", "message": "Authentication service unavailable"}), 500, {'Content-Type': 'application/json'}
+        logger.error("Error calling FusionAuth API: %s", e)
+        return _response('fusionauth_error')
     except Exception as e:
-        logging.error(f"Unexpected error in auth_function: {e}")
-        return json.dumps({"status": "UNAUTHENTICATED", "message": "Internal server error"}), 500, {'Content-Type': 'application/json'}
+        logger.exception("Unexpected error in auth_function: %s", e)
+        return _response('internal_error')
 
-functions/auth_function/requirements.txt
\ No newline at end of file
+# functions/auth_function/requirements.txt
@@ -1,26 +1,49 @@
 #################################################################
 #Payment Microservices
 #################################################################
-requests
-functions/payment_processor_function/main.py (Payment Microservice Cloud Function - Pub/Sub triggered)
+# requests
+# functions/payment_processor_function/main.py (Payment Microservice Cloud Function - Pub/Sub triggered)
 
-Python
 
 # functions/payment_processor_function/main.py
 import base64
 import json
 import logging
-from google.cloud import firestore
+import os
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from idempotency import create_once, document_id
+from structured_logging import get_logger, log_event, redact, set_request_id
+
+# JSON log lines at LOG_LEVEL (default INFO)
+logger = get_logger('payment_processor_function')
 
-db = firestore.Client()
 FIRESTORE_COLLECTION_NAME = os.environ.get('FIRESTORE_COLLECTION_NAME', 'payments')
+# Documents are stored under the request's transaction_id (else the Pub/Sub message ID), so a redelivery is a no-op
+DOCUMENT_ID_FIELD = 'transaction_id'
+# Pull subscription read by the batch worker (python main.py) instead of the function trigger
+PUBSUB_SUBSCRIPTION = os.environ.get('PUBSUB_SUBSCRIPTION', 'payment-processor-subscription')
+
+# google.cloud.firestore (and its gRPC stack) is imported and the client built on first use,
+# then reused while the instance stays warm; an event without data never pays for either.
+_db = None
+
+def get_db():
+    """Returns the instance-wide Firestore client, creating it on first use."""
+    global _db
+    if _db is None:
+        from google.cloud import firestore
+        _db = firestore.Client()
+    return _db
+
+def build_document(payment_request):
+    """The Firestore document stored for one payment request."""
+    from google.cloud import firestore # a no-op after the first call
+    return {**payment_request, 'status': 'processed', 'timestamp': firestore.SERVER_TIMESTAMP}
 
 def handler(event, context):
     """Triggered by a Pub/Sub message."""
-    logging.info(f"Payment processor function triggered by event: {event}")
+    set_request_id(getattr(context, 'event_id', None))
+    log_event(logger, event, "Payment processor function triggered by event")
 
     if 'data' in event:
         try:
@@ -28,23 +51,29 @@ def handler(event, context):
             message_data = base64.b64decode(event['data']).decode('utf-8')
             payment_request = json.loads(message_data)
 
-            logging.info(f"Processing payment request: {payment_request}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Processing payment request: %s", redact(payment_request))
 
-            # Add a timestamp and status
-            payment_request['status'] = 'processed'
-            payment_request['timestamp'] = firestore.SERVER_TIMESTAMP
-
-            # Store in Firestore
-            doc_ref = db.collection(FIRESTORE_COLLECTION_NAME).add(payment_request)
-            logging.info(f"Payment request stored in Firestore with ID: {doc_ref[1].id}")
+            # Store in Firestore; the function's event ID is the Pub/Sub message ID
+            doc_id = document_id(payment_request, DOCUMENT_ID_FIELD, getattr(context, 'event_id', None))
+            if create_once(get_db().collection(FIRESTORE_COLLECTION_NAME), doc_id, build_document(payment_request)):
+                logger.info("Payment request stored in Firestore with ID: %s", doc_id)
 
         except json.JSONDecodeError as e:
-            logging.error(f"Failed to decode JSON from Pub/Sub message: {e}")
+            logger.error("Failed to decode JSON from Pub/Sub message: %s", e)
             raise # Re-raise to indicate failure, Pub/Sub will retry
         except Exception as e:
-            logging.error(f"Error processing payment request: {e}")
+            logger.error("Error processing payment request: %s", e)
             raise # Re-raise to indicate failure, Pub/Sub will retry
     else:
-        logging.warning("No data found in Pub/Sub message event.")
+        logger.warning("No data found in Pub/Sub message event.")
+
+def run_worker():
+    """Batch consumer mode: stores PUBSUB_SUBSCRIPTION's messages with batched Firestore writes until SIGTERM."""
+    from pubsub_batch_worker import run_worker as run
+    run(PUBSUB_SUBSCRIPTION, get_db, FIRESTORE_COLLECTION_NAME, build_document, DOCUMENT_ID_FIELD)
+
+if __name__ == '__main__':
+    run_worker()
 
-functions/payment_processor_function/requirements.txt
+# functions/payment_processor_function/requirements.txt
@@ -0,0 +1,251 @@
+#######################################################
+#Pub/Sub Streaming-pull Consumer with Batched Firestore Writes
+#######################################################
+# functions/payment_processor_function/pubsub_batch_worker.py
+#
+# The Cloud Function stores one document per invocation, one Pub/Sub message
+# per invocation. BatchWorker instead holds a streaming pull on a
+# subscription and writes the messages it receives with Firestore WriteBatch
+# commits of up to BATCH_MAX_WRITES documents:
+# - A batch is committed when it is full or BATCH_MAX_WAIT_SECONDS after its
+#   first message arrived.
+# - Messages are acked only after the commit that stored them succeeded.
+# - A message whose data cannot be decoded or turned into a document is
+#   nacked on its own. If a commit fails, its documents are written one at a
+#   time so only the ones that still fail are nacked (and redelivered).
+# - Documents are created under IDs from idempotency.document_id. A batch
+#   that fails because some of them already exist (redeliveries) is
+#   committed again without those, which are acked as duplicates.
+# - Any other error nacks the messages not settled yet, so they are
+#   redelivered now rather than after their ack deadline.
+#
+# How its throughput compares with the function has not been measured yet:
+# scripts/bench_pubsub_batch.py does, given the Pub/Sub and Firestore emulators.
+#
+# Runs as a long-lived process: on Cloud Run (see workers.Dockerfile), or
+# locally against the emulators with PUBSUB_EMULATOR_HOST and
+# FIRESTORE_EMULATOR_HOST set. SIGTERM stops the pull and commits what was
+# already received before exiting.
+import json
+import os
+import queue
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from idempotency import create_once, document_id, is_already_exists, record_duplicate
+from structured_logging import get_logger
+
+logger = get_logger('pubsub_batch_worker')
+
+# A Firestore WriteBatch holds at most 500 writes
+FIRESTORE_MAX_BATCH_WRITES = 500
+BATCH_MAX_WRITES = min(int(os.environ.get('BATCH_MAX_WRITES', '500')), FIRESTORE_MAX_BATCH_WRITES)
+BATCH_MAX_WAIT_SECONDS = float(os.environ.get('BATCH_MAX_WAIT_SECONDS', '0.5'))
+# Messages leased and not yet acked or nacked; two batches' worth lets the next batch fill while one commits
+MAX_OUTSTANDING_MESSAGES = int(os.environ.get('MAX_OUTSTANDING_MESSAGES', str(2 * BATCH_MAX_WRITES)))
+
+
+def subscription_path(subscription, project=None):
+    """Accepts projects/{project}/subscriptions/{name} or a bare name in `project` (default GOOGLE_CLOUD_PROJECT)."""
+    if subscription.startswith('projects/'):
+        return subscription
+    project = project or os.environ.get('GOOGLE_CLOUD_PROJECT') or os.environ.get('GCP_PROJECT')
+    if not project:
+        raise ValueError(f"Subscription {subscription!r} needs GOOGLE_CLOUD_PROJECT or a full projects/.../subscriptions/... path")
+    return f"projects/{project}/subscriptions/{subscription}"
+
+
+class BatchWorker:
+    """
+    Stores the messages of `subscription` in `collection_name`, using
+    `build_document(decoded message data)` to build each document and
+    `get_db()` for the Firestore client. Documents are stored under the
+    request's `id_field`, or the message ID.
+    """
+
+    def __init__(self, subscription, get_db, collection_name, build_document, id_field=None,
+                 max_writes=BATCH_MAX_WRITES, max_wait_seconds=BATCH_MAX_WAIT_SECONDS,
+                 max_outstanding_messages=MAX_OUTSTANDING_MESSAGES):
+        self.subscription = subscription_path(subscription)
+        self.get_db = get_db
+        self.collection_name = collection_name
+        self.build_document = build_document
+        self.id_field = id_field
+        self.max_writes = min(max_writes, FIRESTORE_MAX_BATCH_WRITES)
+        self.max_wait_seconds = max_wait_seconds
+        self.max_outstanding_messages = max(max_outstanding_messages, self.max_writes)
+        # commits counts successful Firestore commits, batched or (after a failed batch) single
+        self.counts = {'received': 0, 'stored': 0, 'duplicates': 0, 'nacked': 0, 'commits': 0, 'failed_commits': 0}
+        self._messages = queue.Queue()
+        self._stopping = threading.Event()
+
+    def _receive(self, message):
+        """Streaming pull callback (runs on the subscriber's threads): hands the message to the committer."""
+        self._messages.put(message)
+
+    def next_batch(self):
+        """Waits for a message, then gathers up to max_writes of them for at most max_wait_seconds."""
+        try:
+            messages = [self._messages.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_wait_seconds
+        while len(messages) < self.max_writes:
+            remaining = deadline - time.monotonic()
+            try:
+                messages.append(self._messages.get(timeout=remaining) if remaining > 0 else self._messages.get_nowait())
+            except queue.Empty:
+                break
+        return messages
+
+    def write(self, messages):
+        """Stores `messages` with one WriteBatch commit and acks them; nacks the ones that cannot be stored."""
+        self.counts['received'] += len(messages)
+        writes = {} # document ID -> (message, document); a redelivery in the same batch is a duplicate
+        for message in messages:
+            try:
+                request = json.loads(message.data)
+                doc_id = document_id(request, self.id_field, message.message_id)
+                if doc_id in writes:
+                    self._duplicate(message, doc_id)
+                    continue
+                writes[doc_id] = (message, self.build_document(request))
+            except Exception as e:
+                logger.error("Cannot store message %s: %s", message.message_id, e)
+                message.nack()
+                self.counts['nacked'] += 1
+        if not writes:
+            return
+
+        try:
+            self._store(writes)
+        except Exception as e:
+            # Whatever is left in `writes` was neither acked nor nacked; leased until its
+            # ack deadline, it would also hold on to flow control until then
+            logger.error("Cannot store %d messages: %s", len(writes), e)
+            for message, _ in writes.values():
+                message.nack()
+            self.counts['nacked'] += len(writes)
+
+    def _store(self, writes):
+        """Writes `writes`, removing each entry once its message is acked or nacked."""
+        db = self.get_db()
+        collection = db.collection(self.collection_name)
+        try:
+            self._commit(db, collection, writes)
+        except Exception as e:
+            if is_already_exists(e):
+                # Redeliveries of messages stored earlier: drop them and commit the rest once more
+                refs = [collection.document(doc_id) for doc_id in writes]
+                for snapshot in db.get_all(refs, field_paths=[]):
+                    if snapshot.exists:
+                        self._duplicate(writes.pop(snapshot.id)[0], snapshot.id)
+                try:
+                    self._commit(db, collection, writes)
+                    return
+                except Exception as retry_error:
+                    e = retry_error
+            self.counts['failed_commits'] += 1
+            logger.warning("Commit of %d documents failed, writing them one at a time: %s", len(writes), e)
+            self._write_each(collection, writes)
+
+    def _commit(self, db, collection, writes):
+        if not writes:
+            return
+        batch = db.batch()
+        for doc_id, (_, document) in writes.items():
+            batch.create(collection.document(doc_id), document)
+        batch.commit()
+        self.counts['commits'] += 1
+        self.counts['stored'] += len(writes)
+        for message, _ in writes.values():
+            message.ack()
+        logger.debug("Stored %d documents in one commit", len(writes))
+        writes.clear()
+
+    def _duplicate(self, message, doc_id):
+        record_duplicate(self.collection_name, doc_id)
+        self.counts['duplicates'] += 1
+        message.ack()
+
+    def _write_each(self, collection, writes):
+        for doc_id, (message, document) in list(writes.items()):
+            del writes[doc_id]
+            try:
+                created = create_once(collection, doc_id, document)
+            except Exception as e:
+                logger.error("Cannot store message %s: %s", message.message_id, e)
+                message.nack()
+                self.counts['nacked'] += 1
+                continue
+            if created:
+                self.counts['commits'] += 1
+                self.counts['stored'] += 1
+            else:
+                self.counts['duplicates'] += 1
+            message.ack()
+
+    def stop(self, *args):
+        self._stopping.set()
+
+    def run(self):
+        """Pulls and stores messages until stop() is called (or SIGTERM/SIGINT in the main thread)."""
+        from google.cloud import pubsub_v1
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        subscriber = pubsub_v1.SubscriberClient()
+        flow_control = pubsub_v1.types.FlowControl(max_messages=self.max_outstanding_messages)
+        pull = subscriber.subscribe(self.subscription, callback=self._receive, flow_control=flow_control)
+        logger.info("Pulling %s into %s, up to %d documents per commit", self.subscription, self.collection_name, self.max_writes)
+        try:
+            while not self._stopping.is_set() and not pull.done():
+                self.write_pending()
+        finally:
+            pull.cancel() # no new messages; the ones already received are committed below
+            try:
+                pull.result(timeout=30)
+            except Exception:
+                pass
+            while not self._messages.empty():
+                self.write_pending()
+            subscriber.close()
+            logger.info("Stopped pulling %s", self.subscription, extra={'fields': dict(self.counts)})
+
+    def write_pending(self):
+        messages = self.next_batch()
+        if messages:
+            self.write(messages)
+
+
+def serve_health(worker, port):
+    """
+    Answers GET / with the worker's counters on `port`, in a daemon thread.
+    Cloud Run only starts a service revision that listens on $PORT.
+    """
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(worker.counts).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('', port), HealthHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_worker(subscription, get_db, collection_name, build_document, id_field=None):
+    """Entry point of the worker processes: BatchWorker.run(), with a health endpoint when PORT is set."""
+    worker = BatchWorker(subscription, get_db, collection_name, build_document, id_field)
+    if os.environ.get('PORT'):
+        serve_health(worker, int(os.environ['PORT']))
+    worker.run()
@@ -0,0 +1,66 @@
+#######################################################
+#Idempotent Firestore Writes for Redelivered Pub/Sub Messages
+#######################################################
+# functions/telemedicine_processor_function/idempotency.py
+#
+# Pub/Sub delivers at least once. With add() every redelivery stored another
+# copy of the request under a random ID; now a document's ID comes from the
+# request (transaction_id, appointment_id) or, failing that, from the Pub/Sub
+# message ID, and documents are written with create(). A redelivered message
+# then fails with ALREADY_EXISTS, is counted as a suppressed duplicate and
+# acked, and the stored document is left as it was.
+#
+# Every suppressed duplicate is logged with event=duplicate_suppressed and the
+# collection, which the processor_duplicates_suppressed log-based metric counts.
+from structured_logging import get_logger
+
+logger = get_logger('idempotency')
+
+# Since the instance started; also reported by the batch worker's health endpoint
+duplicate_counts = {'suppressed': 0}
+
+# Firestore rejects IDs longer than 1500 bytes, containing '/', equal to '.' or '..', or of the form __.*__
+MAX_DOCUMENT_ID_BYTES = 1500
+
+
+def valid_document_id(value):
+    if not isinstance(value, (str, int)) or isinstance(value, bool):
+        return None
+    value = str(value)
+    if (not value or '/' in value or value in ('.', '..') or len(value.encode('utf-8')) > MAX_DOCUMENT_ID_BYTES
+            or (value.startswith('__') and value.endswith('__'))):
+        return None
+    return value
+
+
+def document_id(request, id_field, message_id):
+    """
+    The ID to store `request` under: its `id_field` when that is a usable
+    document ID, else the Pub/Sub `message_id`. None (a random ID, so no
+    protection against redelivery) only when neither is available.
+    """
+    request_id = request.get(id_field) if isinstance(request, dict) else None
+    return valid_document_id(request_id) or valid_document_id(message_id)
+
+
+def is_already_exists(error):
+    from google.api_core.exceptions import AlreadyExists
+    return isinstance(error, AlreadyExists)
+
+
+def record_duplicate(collection_name, doc_id):
+    duplicate_counts['suppressed'] += 1
+    logger.info("Duplicate of %s/%s suppressed", collection_name, doc_id,
+                extra={'fields': {'event': 'duplicate_suppressed', 'collection': collection_name, 'document_id': doc_id}})
+
+
+def create_once(collection, doc_id, document):
+    """Creates `document` under `doc_id`; returns False, without writing, if that document already exists."""
+    try:
+        collection.document(doc_id).create(document)
+    except Exception as e:
+        if not is_already_exists(e):
+            raise
+        record_duplicate(collection.id, doc_id)
+        return False
+    return True
@@ -0,0 +1,86 @@
+#######################################################
+#Structured, Sampled Logging for the Cloud Functions
+#######################################################
+# functions/telemedicine_processor_function/structured_logging.py
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# Share of invocations whose full (redacted) event is logged when DEBUG is off
+LOG_EVENT_SAMPLE_RATE = float(os.environ.get('LOG_EVENT_SAMPLE_RATE', '0'))
+
+# Compared after lower-casing and dropping '-' and '_', so 'X-Api-Key' and 'api_key' both match
+REDACTED_KEYS = frozenset({
+    'authorization', 'authorizationtoken', 'token', 'accesstoken', 'refreshtoken', 'idtoken',
+    'password', 'apikey', 'xapikey', 'cookie', 'setcookie', 'cardnumber', 'cvv', 'secret',
+})
+REDACTED = '[REDACTED]'
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+
+
+def set_request_id(request_id):
+    """Tags every log line of the current invocation with `request_id`."""
+    _request_id.set(request_id)
+
+
+def redact(value):
+    """Returns a copy of `value` with the values of sensitive keys replaced, at any depth."""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower().replace('-', '').replace('_', '') in REDACTED_KEYS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `severity` is what Cloud Logging reads, `level` what CloudWatch users grep for."""
+
+    def format(self, record):
+        entry = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'severity': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(), # %-style args are only interpolated here, for records that pass the level check
+            'request_id': _request_id.get(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def get_logger(name):
+    """Returns a logger writing JSON lines to stdout at LOG_LEVEL."""
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(LOG_LEVEL)
+        logger.propagate = False # the root handler set up by the runtime would log it a second time
+    return logger
+
+
+def log_event(logger, event, message='Received event'):
+    """
+    Logs the full, redacted `event` at DEBUG, or at INFO for a sampled
+    LOG_EVENT_SAMPLE_RATE share of invocations. Nothing is copied or
+    serialized when neither applies.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        level = logging.DEBUG
+    elif LOG_EVENT_SAMPLE_RATE and logger.isEnabledFor(logging.INFO) and random.random() < LOG_EVENT_SAMPLE_RATE:
+        level = logging.INFO
+    else:
+        return
+    logger.log(level, message, extra={'fields': {'event': redact(event), 'sampled': level == logging.INFO}})
@@ -202,6 +202,7 @@ resource "google_project_iam_member" "compute_engine_monitoring_writer" {
 
 # Cloud Function for FusionAuth Authorizer
 resource "google_cloudfunctions_function" "auth_function" {
+  count                 = var.auth_service_mode == "function" ? 1 : 0
   name                  = "fusionauth-authorizer"
   runtime               = "python39"
   entry_point           = "handler"
@@ -215,9 +216,97 @@ resource "google_cloudfunctions_function" "auth_function" {
   environment_variables = {
     FUSIONAUTH_DOMAIN  = var.fusionauth_domain
     FUSIONAUTH_API_KEY = var.fusionauth_api_key # Use Secret Manager in production
+    # Allowed requests carry the caller's sub, tenant and roles to the backends in a signed header valid for 60 seconds
+    IDENTITY_ENVELOPE_SECRET      = var.identity_envelope_secret # Use Secret Manager in production
+    IDENTITY_ENVELOPE_TTL_SECONDS = "60"
+    # Tokens FusionAuth has validated are cached in-process for at most 5 minutes (or until they expire)
+    TOKEN_CACHE_MAX_ENTRIES     = "1024"
+    TOKEN_CACHE_MAX_TTL_SECONDS = "300"
+    # JSON log lines; requests are logged in full (headers redacted) only at DEBUG or for a sampled share
+    LOG_LEVEL             = "INFO"
+    LOG_EVENT_SAMPLE_RATE = "0"
   }
 }
 
+moved {
+  from = google_cloudfunctions_function.auth_function
+  to   = google_cloudfunctions_function.auth_function[0]
+}
+
+# The same authorizer as an ASGI service, replacing the function when auth_service_mode is "cloud_run":
+# one instance serves up to auth_service_concurrency checks at once instead of one
+resource "google_cloud_run_v2_service" "auth_service" {
+  count    = var.auth_service_mode == "cloud_run" ? 1 : 0
+  name     = "fusionauth-authorizer"
+  location = var.gcp_region
+
+  template {
+    service_account                  = google_service_account.cloud_function_sa.email
+    max_instance_request_concurrency = var.auth_service_concurrency
+    timeout                          = "30s"
+    scaling {
+      min_instance_count = 1 # no cold start in front of every API call
+      max_instance_count = 10
+    }
+    vpc_access {
+      connector = google_vpc_access_connector.connector.id # Connect to VPC
+    }
+    containers {
+      image = var.auth_service_image
+      resources {
+        limits = {
+          cpu    = "1"
+          memory = "512Mi"
+        }
+      }
+      env {
+        name  = "FUSIONAUTH_DOMAIN"
+        value = var.fusionauth_domain
+      }
+      env {
+        name  = "FUSIONAUTH_API_KEY"
+        value = var.fusionauth_api_key # Use Secret Manager in production
+      }
+      env {
+        name  = "IDENTITY_ENVELOPE_SECRET"
+        value = var.identity_envelope_secret # Use Secret Manager in production
+      }
+      env {
+        name  = "IDENTITY_ENVELOPE_TTL_SECONDS"
+        value = "60"
+      }
+      env {
+        # Keep-alive connections to FusionAuth shared by the requests in flight
+        name  = "FUSIONAUTH_POOL_SIZE"
+        value = "20"
+      }
+      env {
+        name  = "TOKEN_CACHE_MAX_ENTRIES"
+        value = "1024"
+      }
+      env {
+        name  = "TOKEN_CACHE_MAX_TTL_SECONDS"
+        value = "300"
+      }
+      env {
+        name  = "LOG_LEVEL"
+        value = "INFO"
+      }
+      env {
+        name  = "LOG_EVENT_SAMPLE_RATE"
+        value = "0"
+      }
+    }
+  }
+}
+
+resource "google_project_iam_member" "cloud_function_run_invoker" {
+  count   = var.auth_service_mode == "cloud_run" ? 1 : 0
+  project = var.gcp_project_id
+  role    = "roles/run.invoker"
+  member  = "serviceAccount:${google_service_account.cloud_function_sa.email}"
+}
+
 resource "google_storage_bucket" "functions_bucket" {
   name          = "${var.gcp_project_id}-functions-bucket"
   location      = "US" # Multi-region for functions bucket
@@ -258,6 +347,7 @@ resource "google_pubsub_subscription" "payment_subscription" {
 }
 
 resource "google_cloudfunctions_function" "payment_processor_function" {
+  count                 = var.pubsub_consumer_mode == "function" ? 1 : 0
   name                  = "payment-processor"
   runtime               = "python39"
   entry_point           = "handler"
@@ -273,6 +363,63 @@ resource "google_cloudfunctions_function" "payment_processor_function" {
   vpc_connector         = google_vpc_access_connector.connector.id
   environment_variables = {
     FIRESTORE_COLLECTION_NAME = "payments"
+    LOG_LEVEL                 = "INFO"
+    LOG_EVENT_SAMPLE_RATE     = "0"
+  }
+}
+
+moved {
+  from = google_cloudfunctions_function.payment_processor_function
+  to   = google_cloudfunctions_function.payment_processor_function[0]
+}
+
+# Batch consumer of the same messages, replacing the function when pubsub_consumer_mode is "worker"
+resource "google_cloud_run_v2_service" "payment_worker" {
+  count    = var.pubsub_consumer_mode == "worker" ? 1 : 0
+  name     = "payment-processor-worker"
+  location = var.gcp_region
+  ingress  = "INGRESS_TRAFFIC_INTERNAL_ONLY"
+
+  template {
+    service_account = google_service_account.cloud_function_sa.email
+    scaling {
+      min_instance_count = 1 # the streaming pull has to run without any request coming in
+      max_instance_count = 4
+    }
+    vpc_access {
+      connector = google_vpc_access_connector.connector.id
+    }
+    containers {
+      image   = var.processor_workers_image
+      command = ["python", "functions/payment_processor_function/main.py"]
+      resources {
+        cpu_idle = false # keep CPU allocated between requests; the worker only answers health checks
+        limits = {
+          cpu    = "1"
+          memory = "512Mi"
+        }
+      }
+      env {
+        name  = "PUBSUB_SUBSCRIPTION"
+        value = google_pubsub_subscription.payment_subscription.id
+      }
+      env {
+        name  = "FIRESTORE_COLLECTION_NAME"
+        value = "payments"
+      }
+      env {
+        name  = "BATCH_MAX_WRITES"
+        value = "500"
+      }
+      env {
+        name  = "BATCH_MAX_WAIT_SECONDS"
+        value = "0.5"
+      }
+      env {
+        name  = "LOG_LEVEL"
+        value = "INFO"
+      }
+    }
   }
 }
 
@@ -295,6 +442,23 @@ resource "google_firestore_database" "payment_firestore_db" {
   type        = "FIRESTORE_NATIVE"
 }
 
+# Redelivered Pub/Sub messages the processors did not store again (see functions/*/idempotency.py), per collection
+resource "google_logging_metric" "processor_duplicates_suppressed" {
+  name   = "processor_duplicates_suppressed"
+  filter = "jsonPayload.event=\"duplicate_suppressed\""
+  metric_descriptor {
+    metric_kind = "DELTA"
+    value_type  = "INT64"
+    labels {
+      key        = "collection"
+      value_type = "STRING"
+    }
+  }
+  label_extractors = {
+    collection = "EXTRACT(jsonPayload.collection)"
+  }
+}
+
 # --- Telemedicine Microservice (Pub/Sub -> Cloud Function -> Firestore) ---
 
 resource "google_pubsub_topic" "telemedicine_topic" {
@@ -309,6 +473,7 @@ resource "google_pubsub_subscription" "telemedicine_subscription" {
 }
 
 resource "google_cloudfunctions_function" "telemedicine_processor_function" {
+  count                 = var.pubsub_consumer_mode == "function" ? 1 : 0
   name                  = "telemedicine-processor"
   runtime               = "python39"
   entry_point           = "handler"
@@ -324,6 +489,63 @@ resource "google_cloudfunctions_function" "telemedicine_processor_function" {
   vpc_connector         = google_vpc_access_connector.connector.id
   environment_variables = {
     FIRESTORE_COLLECTION_NAME = "telemedicine_appointments"
+    LOG_LEVEL                 = "INFO"
+    LOG_EVENT_SAMPLE_RATE     = "0"
+  }
+}
+
+moved {
+  from = google_cloudfunctions_function.telemedicine_processor_function
+  to   = google_cloudfunctions_function.telemedicine_processor_function[0]
+}
+
+# Batch consumer of the same messages, replacing the function when pubsub_consumer_mode is "worker"
+resource "google_cloud_run_v2_service" "telemedicine_worker" {
+  count    = var.pubsub_consumer_mode == "worker" ? 1 : 0
+  name     = "telemedicine-processor-worker"
+  location = var.gcp_region
+  ingress  = "INGRESS_TRAFFIC_INTERNAL_ONLY"
+
+  template {
+    service_account = google_service_account.cloud_function_sa.email
+    scaling {
+      min_instance_count = 1 # the streaming pull has to run without any request coming in
+      max_instance_count = 4
+    }
+    vpc_access {
+      connector = google_vpc_access_connector.connector.id
+    }
+    containers {
+      image   = var.processor_workers_image
+      command = ["python", "functions/telemedicine_processor_function/main.py"]
+      resources {
+        cpu_idle = false # keep CPU allocated between requests; the worker only answers health checks
+        limits = {
+          cpu    = "1"
+          memory = "512Mi"
+        }
+      }
+      env {
+        name  = "PUBSUB_SUBSCRIPTION"
+        value = google_pubsub_subscription.telemedicine_subscription.id
+      }
+      env {
+        name  = "FIRESTORE_COLLECTION_NAME"
+        value = "telemedicine_appointments"
+      }
+      env {
+        name  = "BATCH_MAX_WRITES"
+        value = "500"
+      }
+      env {
+        name  = "BATCH_MAX_WAIT_SECONDS"
+        value = "0.5"
+      }
+      env {
+        name  = "LOG_LEVEL"
+        value = "INFO"
+      }
+    }
   }
 }
 
@@ -625,7 +847,7 @@ resource "google_api_gateway_api_config" "microservices_api_config" {
     document {
       path     = "openapi.yaml"
       contents = base64encode(templatefile("${path.module}/openapi.yaml", {
-        auth_function_url            = google_cloudfunctions_function.auth_function.url
+        auth_function_url            = var.auth_service_mode == "cloud_run" ? google_cloud_run_v2_service.auth_service[0].uri : google_cloudfunctions_function.auth_function[0].url
         payment_pubsub_topic_name    = google_pubsub_topic.payment_topic.name
         telemedicine_pubsub_topic_name = google_pubsub_topic.telemedicine_topic.name
         pharmacy_alb_ip              = google_compute_global_forwarding_rule.pharmacy_forwarding_rule.ip_address
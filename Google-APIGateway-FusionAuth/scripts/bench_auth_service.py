@@ -0,0 +1,169 @@
+#####################################################################
+#Benchmark: auth Cloud Function vs ASGI auth service per instance
+####################################################################
+# scripts/bench_auth_service.py
+#
+# Starts a stub FusionAuth (POST /api/jwt/validate answers isValid after
+# --latency-ms) in a separate process and runs --requests auth checks
+# against it two ways:
+#   function - main.handler, one request at a time, as one Cloud Function
+#              instance serves them
+#   asgi     - auth_service.app through httpx.ASGITransport, --concurrency
+#              requests in flight, as one Cloud Run instance with
+#              max_instance_request_concurrency = --concurrency serves them.
+#              The load generator shares the process (and its CPU) with the
+#              app, so these figures understate what one instance can serve.
+# Requests carry --tokens distinct tokens (default: all distinct, so every
+# check goes to FusionAuth unless the same token is already being checked).
+# Reports requests per second per instance, FusionAuth calls, and the
+# response status codes, which must match between the two.
+#
+# Usage (from the Google-APIGateway-FusionAuth directory):
+#   pip install requests httpx
+#   python scripts/bench_auth_service.py --requests 2000 --latency-ms 20 --concurrency 80
+import argparse
+import asyncio
+import importlib.util
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+AUTH_FUNCTION_DIR = os.path.join(HERE, "..", "functions", "auth_function")
+
+
+def serve_stub_fusionauth(port, latency, calls):
+    """FusionAuth's JWT validation endpoint: every token is valid for an hour, after `latency` seconds."""
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # keep-alive, as FusionAuth
+        disable_nagle_algorithm = True
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with calls.get_lock():
+                calls.value += 1
+            time.sleep(latency)
+            body = json.dumps({"isValid": True, "jwt": {"sub": "bench", "exp": int(time.time()) + 3600}}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    ThreadingHTTPServer.daemon_threads = True
+    ThreadingHTTPServer.request_queue_size = 1024
+    ThreadingHTTPServer(("127.0.0.1", port), StubHandler).serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    sys.exit(f"Stub FusionAuth did not start on port {port}")
+
+
+def load_module(name):
+    """Imports functions/auth_function/<name>.py with its directory first on sys.path, as the runtime does."""
+    if AUTH_FUNCTION_DIR not in sys.path:
+        sys.path.insert(0, AUTH_FUNCTION_DIR)
+    spec = importlib.util.spec_from_file_location(f"auth_function_{name}", os.path.join(AUTH_FUNCTION_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def authorization_headers(count, tokens):
+    return [{"Authorization": f"Bearer bench-token-{n % tokens:08d}"} for n in range(count)]
+
+
+def run_function(headers):
+    """main.handler for each request in turn; returns (seconds, status counts)."""
+    main = load_module("main")
+    statuses = Counter()
+    start = time.perf_counter()
+    for request_headers in headers:
+        _, status_code, _ = main.handler(SimpleNamespace(method="GET", path="/", headers=request_headers))
+        statuses[status_code] += 1
+    return time.perf_counter() - start, statuses
+
+
+async def run_asgi(headers, concurrency):
+    """auth_service.app with `concurrency` requests in flight; returns (seconds, status counts)."""
+    import httpx
+
+    auth_service = load_module("auth_service")
+    statuses = Counter()
+    pending = iter(headers)
+
+    async def client_loop(client):
+        for request_headers in pending:
+            response = await client.get("/", headers=request_headers)
+            statuses[response.status_code] += 1
+
+    transport = httpx.ASGITransport(app=auth_service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://auth-service") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    await auth_service.get_fusionauth_client().aclose()
+    return elapsed, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the auth Cloud Function against the ASGI auth service, per instance")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--tokens", type=int, default=0, help="Distinct bearer tokens (default: one per request)")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Stub FusionAuth response time")
+    parser.add_argument("--concurrency", type=int, default=80, help="Requests in flight on the ASGI instance")
+    parser.add_argument("--pool-size", type=int, default=20, help="FusionAuth connections of the ASGI instance")
+    args = parser.parse_args()
+
+    port = free_port()
+    calls = multiprocessing.Value("i", 0)
+    stub = multiprocessing.Process(target=serve_stub_fusionauth, args=(port, args.latency_ms / 1000, calls), daemon=True)
+    stub.start()
+    wait_for_port(port)
+
+    os.environ["FUSIONAUTH_DOMAIN"] = f"http://127.0.0.1:{port}"
+    os.environ["FUSIONAUTH_POOL_SIZE"] = str(args.pool_size)
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    tokens = args.tokens or args.requests
+    # The function only serves one request at a time, so it gets a tenth of the requests
+    function_requests = max(args.requests // 10, 1)
+
+    print(f"{args.requests} requests ({function_requests} for the function), {tokens} tokens, "
+          f"FusionAuth latency {args.latency_ms:g} ms, ASGI concurrency {args.concurrency} over {args.pool_size} connections")
+    print(f"{'mode':>9} {'requests':>9} {'req/s':>9} {'FusionAuth calls':>17}  statuses")
+    for mode in ("function", "asgi"):
+        calls_before = calls.value
+        if mode == "function":
+            count = function_requests
+            seconds, statuses = run_function(authorization_headers(count, tokens))
+        else:
+            count = args.requests
+            seconds, statuses = asyncio.run(run_asgi(authorization_headers(count, tokens), args.concurrency))
+        print(f"{mode:>9} {count:>9} {count / seconds:>9.0f} {calls.value - calls_before:>17}  {dict(statuses)}")
+
+    stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#####################################################################
+#Benchmark: backend re-validating the JWT vs verifying the envelope
+####################################################################
+# scripts/bench_identity_envelope.py
+#
+# What a backend pays per request to learn who the caller is:
+#   fusionauth - FusionAuthClient.validate_jwt against a stub FusionAuth
+#                answering after --latency-ms (the second validation the
+#                backends needed before the authorizer sent an identity)
+#   envelope   - identity_envelope.verify of the authorizer's header
+# and what the authorizer adds per allowed request (identity_envelope.sign).
+# Reports the mean and p99 microseconds per call.
+#
+# Usage (from the Google-APIGateway-FusionAuth directory):
+#   pip install requests
+#   python scripts/bench_identity_envelope.py --calls 20000 --latency-ms 20
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "functions", "auth_function"))
+sys.path.insert(0, HERE)
+
+from bench_auth_service import free_port, serve_stub_fusionauth, wait_for_port # noqa: E402
+
+CLAIMS = {"sub": "2f0c1e7a-5c9b-4a51-9a0e-3f1f2d8a6b11", "tid": "6b8f2a44-0d3c-4e2b-8a1d-1c9e7f5a3b20",
+          "roles": ["pharmacist", "pfm-viewer"], "exp": int(time.time()) + 3600}
+SECRET = "bench-identity-envelope-secret"
+
+
+def timed(fn, calls):
+    durations = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    return sum(durations) / calls * 1e6, durations[min(int(calls * 0.99), calls - 1)] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark re-validating the JWT against verifying the identity envelope")
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--fusionauth-calls", type=int, default=200, help="FusionAuth round trips (they take --latency-ms each)")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Stub FusionAuth response time")
+    args = parser.parse_args()
+
+    import identity_envelope
+    from fusionauth_client import FusionAuthClient
+
+    port = free_port()
+    stub = multiprocessing.Process(target=serve_stub_fusionauth, args=(port, args.latency_ms / 1000, multiprocessing.Value("i", 0)), daemon=True)
+    stub.start()
+    wait_for_port(port)
+    client = FusionAuthClient(f"http://127.0.0.1:{port}")
+    envelope = identity_envelope.sign(CLAIMS, SECRET)
+
+    print(f"envelope: {len(envelope)} bytes, FusionAuth latency {args.latency_ms:g} ms")
+    print(f"{'check':>22} {'calls':>7} {'mean us':>10} {'p99 us':>10}")
+    for name, fn, calls in (
+        ("fusionauth validate", lambda: client.validate_jwt("bench-token"), args.fusionauth_calls),
+        ("envelope verify", lambda: identity_envelope.verify(envelope, SECRET), args.calls),
+        ("envelope sign", lambda: identity_envelope.sign(CLAIMS, SECRET), args.calls),
+    ):
+        mean, p99 = timed(fn, calls)
+        print(f"{name:>22} {calls:>7} {mean:>10.1f} {p99:>10.1f}")
+
+    stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
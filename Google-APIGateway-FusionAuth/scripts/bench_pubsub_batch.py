@@ -0,0 +1,169 @@
+#####################################################################
+#Benchmark: one write per message vs batched Firestore writes
+####################################################################
+# scripts/bench_pubsub_batch.py
+#
+# Publishes --messages requests to a fresh topic and stores them from a fresh
+# subscription two ways, against the Pub/Sub and Firestore emulators:
+#   function - each message handed to the processor's handler() as the Cloud
+#              Function event it would get, --function-concurrency at a time
+#              (one message per invocation per instance), acked after it returns
+#   worker   - pubsub_batch_worker.BatchWorker on the processor's build_document,
+#              committing up to --batch-size documents per WriteBatch
+# Reports messages per second from the first message received to the last
+# one stored, Firestore commits, and the documents found in the collection.
+#
+# Usage (from the Google-APIGateway-FusionAuth directory):
+#   gcloud beta emulators pubsub start --host-port=localhost:8085 &
+#   gcloud beta emulators firestore start --host-port=localhost:8086 &
+#   export PUBSUB_EMULATOR_HOST=localhost:8085 FIRESTORE_EMULATOR_HOST=localhost:8086 GOOGLE_CLOUD_PROJECT=bench
+#   pip install google-cloud-pubsub google-cloud-firestore
+#   python scripts/bench_pubsub_batch.py --function payment_processor_function --messages 5000
+import argparse
+import base64
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FUNCTIONS_DIR = os.path.join(HERE, "..", "functions")
+
+
+def load_function(name):
+    """Imports functions/<name>/main.py with its directory first on sys.path, as the runtime does."""
+    directory = os.path.join(FUNCTIONS_DIR, name)
+    sys.path.insert(0, directory)
+    spec = importlib.util.spec_from_file_location(f"{name}_main", os.path.join(directory, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_request(n):
+    return {
+        "transaction_id": str(uuid.uuid4()),
+        "amount": 1000 + n % 9000,
+        "currency": "USD",
+        "description": f"Request {n:08d}",
+    }
+
+
+def create_subscription(project, tag):
+    from google.cloud import pubsub_v1
+    publisher, subscriber = pubsub_v1.PublisherClient(), pubsub_v1.SubscriberClient()
+    topic = publisher.topic_path(project, f"bench-{tag}")
+    subscription = subscriber.subscription_path(project, f"bench-{tag}")
+    publisher.create_topic(name=topic)
+    subscriber.create_subscription(name=subscription, topic=topic, ack_deadline_seconds=60)
+    subscriber.close()
+    return publisher, topic, subscription
+
+
+def publish(publisher, topic, count):
+    futures = [publisher.publish(topic, json.dumps(make_request(n)).encode("utf-8")) for n in range(count)]
+    for future in futures:
+        future.result()
+
+
+def run_function(module, subscription, count, concurrency):
+    """Streaming pull calling handler() per message; returns (seconds, commits)."""
+    from google.cloud import pubsub_v1
+    from google.cloud.pubsub_v1.subscriber.scheduler import ThreadScheduler
+
+    done, lock = threading.Event(), threading.Lock()
+    state = {"stored": 0, "first": None}
+
+    def callback(message):
+        with lock:
+            state["first"] = state["first"] or time.perf_counter()
+        try:
+            module.handler({"data": base64.b64encode(message.data).decode("ascii")}, SimpleNamespace(event_id=message.message_id))
+        except Exception:
+            message.nack()
+            return
+        message.ack()
+        with lock:
+            state["stored"] += 1
+            if state["stored"] >= count:
+                done.set()
+
+    subscriber = pubsub_v1.SubscriberClient()
+    pull = subscriber.subscribe(
+        subscription, callback,
+        flow_control=pubsub_v1.types.FlowControl(max_messages=concurrency),
+        scheduler=ThreadScheduler(ThreadPoolExecutor(max_workers=concurrency)),
+    )
+    done.wait()
+    elapsed = time.perf_counter() - state["first"]
+    pull.cancel()
+    subscriber.close()
+    return elapsed, state["stored"] # one add(), i.e. one commit, per message
+
+
+def run_worker(module, subscription, collection, count, batch_size):
+    """BatchWorker.run() in a thread until `count` documents are stored; returns (seconds, commits)."""
+    from pubsub_batch_worker import BatchWorker
+
+    worker = BatchWorker(subscription, module.get_db, collection, module.build_document, module.DOCUMENT_ID_FIELD, max_writes=batch_size)
+    first = {}
+    receive = worker._receive
+    def timed_receive(message):
+        first.setdefault("at", time.perf_counter())
+        receive(message)
+    worker._receive = timed_receive
+
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    while worker.counts["stored"] < count:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - first["at"]
+    worker.stop()
+    thread.join()
+    return elapsed, worker.counts["commits"]
+
+
+def count_documents(db, collection):
+    return sum(1 for _ in db.collection(collection).select([]).stream())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-message vs batched Firestore writes from Pub/Sub")
+    parser.add_argument("--function", default="payment_processor_function",
+                        choices=["payment_processor_function", "telemedicine_processor_function"])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--function-concurrency", type=int, default=10, help="Function instances processing messages at once")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents per WriteBatch in worker mode")
+    args = parser.parse_args()
+
+    for variable in ("PUBSUB_EMULATOR_HOST", "FIRESTORE_EMULATOR_HOST", "GOOGLE_CLOUD_PROJECT"):
+        if not os.environ.get(variable):
+            sys.exit(f"{variable} must be set; this benchmark runs against the emulators only")
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    project = os.environ["GOOGLE_CLOUD_PROJECT"]
+    module = load_function(args.function)
+
+    print(f"{args.function}: {args.messages} messages, function concurrency {args.function_concurrency}, batch size {args.batch_size}")
+    print(f"{'mode':>9} {'messages/s':>11} {'commits':>8} {'documents':>10}")
+    for mode in ("function", "worker"):
+        tag = f"{mode}-{uuid.uuid4().hex[:8]}"
+        collection = f"bench-{tag}"
+        publisher, topic, subscription = create_subscription(project, tag)
+        publish(publisher, topic, args.messages)
+
+        if mode == "function":
+            module.FIRESTORE_COLLECTION_NAME = collection
+            seconds, commits = run_function(module, subscription, args.messages, args.function_concurrency)
+        else:
+            seconds, commits = run_worker(module, subscription, collection, args.messages, args.batch_size)
+        documents = count_documents(module.get_db(), collection)
+        print(f"{mode:>9} {args.messages / seconds:>11.0f} {commits:>8} {documents:>10}")
+
+
+if __name__ == "__main__":
+    main()
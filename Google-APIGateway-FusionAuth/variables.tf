@@ -26,6 +26,12 @@ variable "fusionauth_api_key" {
   sensitive   = true
 }
 
+variable "identity_envelope_secret" {
+  description = "HMAC key the authorizer signs the X-Identity-Envelope header with; the Pharmacy and PFM backends verify it with the same key (functions/auth_function/identity_envelope.py)"
+  type        = string
+  sensitive   = true
+}
+
 variable "db_username" {
   description = "Username for the Cloud SQL databases."
   type        = string
@@ -36,4 +42,35 @@ variable "db_password" {
   description = "Password for the Cloud SQL databases."
   type        = string
   sensitive   = true
-}
\ No newline at end of file
+}
+# How payment and telemedicine Pub/Sub messages are consumed (see functions/*/pubsub_batch_worker.py)
+variable "pubsub_consumer_mode" {
+  description = "function (a Cloud Function invocation and Firestore write per message) or worker (Cloud Run streaming-pull workers committing up to 500 documents per write batch)"
+  type        = string
+  default     = "function"
+}
+
+variable "processor_workers_image" {
+  description = "Image built from workers.Dockerfile; required when pubsub_consumer_mode is worker"
+  type        = string
+  default     = ""
+}
+
+# Where API Gateway's extensible authentication calls (see functions/auth_function/auth_service.py)
+variable "auth_service_mode" {
+  description = "function (the Cloud Function, one request per instance at a time) or cloud_run (the ASGI service, auth_service_concurrency requests per instance)"
+  type        = string
+  default     = "function"
+}
+
+variable "auth_service_image" {
+  description = "Image built from auth.Dockerfile; required when auth_service_mode is cloud_run"
+  type        = string
+  default     = ""
+}
+
+variable "auth_service_concurrency" {
+  description = "Requests one auth service instance serves at once (Cloud Run max_instance_request_concurrency)"
+  type        = number
+  default     = 80
+}
@@ -0,0 +1,105 @@
+#######################################################
+#Local JWT Verification for the FusionAuth Authorizer
+#######################################################
+# lambdas/auth_lambda/jwt_verifier.py
+import threading
+import time
+
+import jwt
+
+# Only asymmetric algorithms are accepted; FusionAuth signs access tokens with
+# RS256 by default and ES256 when the signing key is an EC key.
+SUPPORTED_ALGORITHMS = ("RS256", "ES256")
+
+
+class TokenInvalid(Exception):
+    """Raised when a token fails signature or claim verification."""
+
+
+class JWKSKeySet:
+    """
+    Caches the FusionAuth JWKS document for `ttl_seconds`, indexed by `kid`.
+    A token carrying an unknown `kid` triggers a refresh, but no more often
+    than every `min_refresh_interval` seconds.
+    """
+
+    def __init__(self, jwks_url, http_client, ttl_seconds=300, min_refresh_interval=30):
+        self.jwks_url = jwks_url
+        self.http_client = http_client
+        self.ttl_seconds = ttl_seconds
+        self.min_refresh_interval = min_refresh_interval
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        keys = {}
+        for jwk in self.http_client.get_json(self.jwks_url).get('keys', []):
+            if jwk.get('use', 'sig') != 'sig' or 'kid' not in jwk:
+                continue
+            try:
+                keys[jwk['kid']] = jwt.PyJWK(jwk)
+            except jwt.exceptions.PyJWKError as e:
+                print(f"Skipping unusable JWK {jwk.get('kid')}: {e}")
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    def get(self, kid):
+        with self._lock:
+            age = time.monotonic() - self._fetched_at
+            if age > self.ttl_seconds or (kid not in self._keys and age > self.min_refresh_interval):
+                try:
+                    self._refresh()
+                except Exception as e:
+                    # Keep verifying with the keys we have; only a cold container has nothing to fall back on
+                    if not self._keys:
+                        raise
+                    print(f"JWKS refresh failed, using cached keys: {e}")
+            key = self._keys.get(kid)
+        if key is None:
+            raise TokenInvalid(f"No signing key found for kid {kid!r}")
+        return key
+
+
+class LocalJWTVerifier:
+    """
+    Verifies the signature and exp/nbf/iss/aud claims of a JWT without calling FusionAuth.
+
+    `audience` is required: every application of the tenant gets tokens signed
+    with the same keys, so without it a token for any of them would pass.
+    """
+
+    def __init__(self, key_set, issuer, audience, leeway=0):
+        if not audience:
+            raise ValueError("Local JWT verification needs an audience (FUSIONAUTH_AUDIENCE)")
+        self.key_set = key_set
+        self.issuer = issuer
+        self.audience = audience
+        self.leeway = leeway
+
+    def verify(self, token):
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.exceptions.DecodeError as e:
+            raise TokenInvalid(f"Malformed token: {e}")
+
+        algorithm = header.get('alg')
+        if algorithm not in SUPPORTED_ALGORITHMS:
+            raise TokenInvalid(f"Unsupported signing algorithm {algorithm!r}")
+
+        signing_key = self.key_set.get(header.get('kid'))
+        if signing_key.algorithm_name != algorithm:
+            raise TokenInvalid(f"Token algorithm {algorithm!r} does not match key {header.get('kid')!r}")
+        try:
+            # exp and nbf are checked by PyJWT whenever they are present
+            return jwt.decode(
+                token,
+                signing_key.key,
+                algorithms=[algorithm],
+                issuer=self.issuer,
+                audience=self.audience,
+                leeway=self.leeway,
+                options={"require": ["exp", "iss", "aud"]},
+            )
+        except jwt.exceptions.PyJWTError as e:
+            raise TokenInvalid(str(e))
@@ -2,30 +2,61 @@
 #Lambda Function Code for Fusion Auth Authorizer
 ###################################################
 # lambdas/auth_lambda/main.py
-import json
 import os
 import requests
 
+from fusionauth_client import CircuitOpenError, FusionAuthClient
+from jwt_verifier import JWKSKeySet, LocalJWTVerifier, TokenInvalid
+from policy_builder import PolicyBuilder
+
 FUSIONAUTH_DOMAIN = os.environ.get("FUSIONAUTH_DOMAIN")
 FUSIONAUTH_API_KEY = os.environ.get("FUSIONAUTH_API_KEY")
 
-def generate_policy(principal_id, effect, resource):
-    auth_response = {}
-    auth_response['principalId'] = principal_id
+# "remote" validates every token with FusionAuth's /api/jwt/validate endpoint.
+# "local" verifies the signature and claims against the cached JWKS key set and
+# only calls FusionAuth when REMOTE_REVOCATION_CHECK is enabled.
+AUTH_MODE = os.environ.get("AUTH_MODE", "remote")
+REMOTE_REVOCATION_CHECK = os.environ.get("REMOTE_REVOCATION_CHECK", "false").lower() == "true"
+FUSIONAUTH_ISSUER = os.environ.get("FUSIONAUTH_ISSUER", FUSIONAUTH_DOMAIN)
+FUSIONAUTH_AUDIENCE = os.environ.get("FUSIONAUTH_AUDIENCE") or None
+FUSIONAUTH_JWKS_URL = os.environ.get("FUSIONAUTH_JWKS_URL", f"{FUSIONAUTH_DOMAIN}/.well-known/jwks.json")
+JWKS_CACHE_TTL_SECONDS = int(os.environ.get("JWKS_CACHE_TTL_SECONDS", "300"))
+
+# Optional JSON mapping of FusionAuth role -> "METHOD/path" patterns the role may call,
+# e.g. {"patient": ["*/payments*", "*/telemedicine*"], "pharmacist": ["*/pharmacy*"]}
+POLICY_ROLE_ROUTES = os.environ.get("POLICY_ROLE_ROUTES", "")
+_policy_builder = PolicyBuilder.from_json(POLICY_ROLE_ROUTES)
+
+# Built on first use and kept for the lifetime of the container
+_fusionauth_client = None
+_local_verifier = None
+
+def get_fusionauth_client():
+    """Shared keep-alive client, so warm invocations reuse the FusionAuth connection."""
+    global _fusionauth_client
+    if _fusionauth_client is None:
+        _fusionauth_client = FusionAuthClient.from_env(FUSIONAUTH_DOMAIN, FUSIONAUTH_API_KEY)
+    return _fusionauth_client
 
-    if effect and resource:
-        policy_document = {
-            'Version': '2012-10-17',
-            'Statement': [
-                {
-                    'Action': 'execute-api:Invoke',
-                    'Effect': effect,
-                    'Resource': resource
-                }
-            ]
-        }
-        auth_response['policyDocument'] = policy_document
-    return auth_response
+def get_local_verifier():
+    global _local_verifier
+    if _local_verifier is None:
+        key_set = JWKSKeySet(FUSIONAUTH_JWKS_URL, get_fusionauth_client(), ttl_seconds=JWKS_CACHE_TTL_SECONDS)
+        _local_verifier = LocalJWTVerifier(key_set, FUSIONAUTH_ISSUER, FUSIONAUTH_AUDIENCE)
+    return _local_verifier
+
+def generate_policy(principal_id, effect, resource, roles=()):
+    """Builds a policy covering every route the caller's roles allow on the stage of `resource`."""
+    return _policy_builder.build(principal_id, effect, resource, roles)
+
+def validate_remotely(jwt):
+    """Calls FusionAuth to validate the JWT and returns its claims."""
+    validation_result = get_fusionauth_client().validate_jwt(jwt)
+
+    if not validation_result.get('isValid'):
+        print(f"Token validation failed: {validation_result.get('error')}")
+        raise Exception("Unauthorized")
+    return validation_result.get('jwt', {})
 
 def handler(event, context):
     try:
@@ -36,34 +67,33 @@ def handler(event, context):
 
         jwt = token.split(" ")[1]
 
-        # Call FusionAuth to validate the JWT
-        headers = {
-            "Authorization": FUSIONAUTH_API_KEY,
-            "Content-Type": "application/json"
-        }
-        validate_url = f"{FUSIONAUTH_DOMAIN}/api/jwt/validate"
-        body = json.dumps({"jwt": jwt})
-
-        response = requests.post(validate_url, headers=headers, data=body)
-        response.raise_for_status() # Raise an exception for HTTP errors (4xx or 5xx)
-
-        validation_result = response.json()
-
-        if validation_result.get('isValid'):
-            principal_id = validation_result.get('jwt', {}).get('sub', 'unknown')
-            print(f"Token is valid for principal: {principal_id}")
-            return generate_policy(principal_id, 'Allow', event['methodArn'])
+        if AUTH_MODE == "local":
+            claims = get_local_verifier().verify(jwt)
+            if REMOTE_REVOCATION_CHECK:
+                # Signature and claims already passed; FusionAuth only confirms the token was not revoked.
+                # While FusionAuth is failing the check is skipped rather than denying every caller.
+                try:
+                    validate_remotely(jwt)
+                except CircuitOpenError:
+                    print("FusionAuth circuit open, skipping revocation check")
         else:
-            print(f"Token validation failed: {validation_result.get('error')}")
-            raise Exception("Unauthorized")
+            claims = validate_remotely(jwt)
 
+        principal_id = claims.get('sub', 'unknown')
+        print(f"Token is valid for principal: {principal_id}")
+        return generate_policy(principal_id, 'Allow', event['methodArn'], claims.get('roles') or ())
+
+    except TokenInvalid as e:
+        print(f"Local JWT verification failed: {e}")
+        raise Exception("Unauthorized")
     except requests.exceptions.RequestException as e:
         print(f"Error calling FusionAuth: {e}")
         raise Exception("Unauthorized")
     except Exception as e:
         print(f"Authentication error: {e}")
         raise Exception("Unauthorized")
-lambdas/auth_lambda/requirements.txt
-
-requests
-lambdas/payment_sqs_lambda/main.py (Payment Microservice Lambda - SQS triggered)
+# lambdas/auth_lambda/requirements.txt
+#
+# requests
+# PyJWT[crypto]
+# lambdas/payment_sqs_lambda/main.py (Payment Microservice Lambda - SQS triggered)
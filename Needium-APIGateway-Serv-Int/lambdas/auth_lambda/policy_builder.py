@@ -0,0 +1,76 @@
+#######################################################
+#IAM Policy Builder for the FusionAuth Custom Authorizer
+#######################################################
+# lambdas/auth_lambda/policy_builder.py
+import json
+from functools import lru_cache
+
+
+def split_method_arn(method_arn):
+    """
+    Splits arn:aws:execute-api:{region}:{account}:{apiId}/{stage}/{method}/{path}
+    into the stage-level ARN prefix and the method/path suffix.
+    """
+    arn_prefix, _, api_path = method_arn.partition(':execute-api:')
+    region_account_api, *rest = api_path.split('/', 2)
+    stage = rest[0] if rest else '*'
+    return f"{arn_prefix}:execute-api:{region_account_api}/{stage}", '/'.join(rest[1:])
+
+
+class PolicyBuilder:
+    """
+    Builds authorizer policies that cover every route a caller may use on the
+    stage, not just the route that triggered the authorizer. API Gateway caches
+    the policy per token, so one invocation then serves all of those routes.
+
+    `role_routes` maps a FusionAuth role to "METHOD/path" patterns relative to
+    the stage, e.g. {"patient": ["*/payments*", "*/telemedicine*"]}.
+    Without any `role_routes` every valid token gets `default_routes`; the
+    default of ["*/*"] allows every route on the stage, which is what a valid
+    token got before policies were scoped. Once roles are mapped, a caller
+    whose roles grant nothing is denied the whole stage.
+    """
+
+    def __init__(self, role_routes=None, default_routes=("*/*",)):
+        self.role_routes = {role: tuple(routes) for role, routes in (role_routes or {}).items()}
+        self.default_routes = tuple(default_routes)
+        # One template per (stage ARN, role set); rebuilt only when a new combination shows up
+        self._resources = lru_cache(maxsize=256)(self._build_resources)
+
+    @classmethod
+    def from_json(cls, role_routes_json):
+        return cls(json.loads(role_routes_json) if role_routes_json else None)
+
+    def _build_resources(self, stage_arn, roles):
+        if not self.role_routes:
+            routes = self.default_routes
+        else:
+            routes = []
+            for role in sorted(roles):
+                routes.extend(self.role_routes.get(role, ()))
+        return tuple(f"{stage_arn}/{route}" for route in dict.fromkeys(routes))
+
+    def build(self, principal_id, effect, method_arn, roles=(), context=None):
+        stage_arn, _ = split_method_arn(method_arn)
+        resources = list(self._resources(stage_arn, frozenset(roles))) if effect == 'Allow' else []
+        if not resources:
+            # A rejected token, or one whose roles grant no route, is denied every route of the stage
+            effect = 'Deny'
+            resources = [f"{stage_arn}/*"]
+
+        auth_response = {
+            'principalId': principal_id,
+            'policyDocument': {
+                'Version': '2012-10-17',
+                'Statement': [
+                    {
+                        'Action': 'execute-api:Invoke',
+                        'Effect': effect,
+                        'Resource': resources
+                    }
+                ]
+            }
+        }
+        if context:
+            auth_response['context'] = context
+        return auth_response
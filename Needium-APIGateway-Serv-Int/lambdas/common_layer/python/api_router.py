@@ -0,0 +1,108 @@
+#######################################################
+#Request Routing for API Gateway Proxy Integrations
+#######################################################
+# lambdas/common_layer/python/api_router.py
+#
+# Dispatches a REST API proxy event to the handler registered for its HTTP
+# method and resource template, e.g. ('GET', '/payments/{paymentId}').
+# - API Gateway sends the matched template as event['resource'] and fills
+#   pathParameters itself, so the usual case is one dict lookup.
+# - Without a known resource (direct invocations, a greedy {proxy+}
+#   resource) event['path'] is matched against a trie of the templates, one
+#   step per path segment however many routes there are. A path that still
+#   starts with the stage name (custom domain base path mappings) is matched
+#   again without it.
+# - A path matching a template with no handler for the method gets 405 with
+#   an Allow header; anything else gets 404.
+import api_responses
+
+# Handler for any method a template has no specific handler for, like API Gateway's ANY
+ANY = 'ANY'
+
+
+class _Node:
+    __slots__ = ('children', 'param_name', 'param_child', 'handlers')
+
+    def __init__(self):
+        self.children = {} # static segment -> _Node
+        self.param_name = None
+        self.param_child = None
+        self.handlers = {} # HTTP method -> handler
+
+
+class Router:
+    """
+    Maps (HTTP method, resource template) to handlers taking the event.
+
+    At each position a static segment takes precedence over a {parameter},
+    without backtracking: with /payments/batch and /payments/{paymentId}/wait
+    registered, /payments/batch/wait does not match the second one.
+    """
+
+    def __init__(self):
+        self._routes = {} # (method, template) -> handler
+        self._root = _Node()
+
+    def add(self, method, template, handler):
+        node = self._root
+        for segment in _segments(template):
+            if segment.startswith('{') and segment.endswith('}'):
+                name = segment[1:-1]
+                if node.param_child is None:
+                    node.param_name, node.param_child = name, _Node()
+                elif node.param_name != name:
+                    raise ValueError(f"{template}: {{{name}}} conflicts with {{{node.param_name}}} at the same position")
+                node = node.param_child
+            else:
+                node = node.children.setdefault(segment, _Node())
+        if method in node.handlers:
+            raise ValueError(f"Duplicate route: {method} {template}")
+        node.handlers[method] = handler
+        self._routes[(method, template)] = handler
+
+    def route(self, method, template):
+        """Decorator form of add()."""
+        def register(handler):
+            self.add(method, template, handler)
+            return handler
+        return register
+
+    def match(self, method, path):
+        """
+        Returns (handler, path parameters, allowed methods) for `path`. The
+        handler is None when nothing matches (allowed is empty: 404) or when
+        only other methods do (405).
+        """
+        node, params = self._root, {}
+        for segment in _segments(path):
+            child = node.children.get(segment)
+            if child is None:
+                if node.param_child is None:
+                    return None, {}, ()
+                params[node.param_name] = segment
+                child = node.param_child
+            node = child
+        handler = node.handlers.get(method) or node.handlers.get(ANY)
+        return handler, params, tuple(sorted(node.handlers))
+
+    def dispatch(self, event):
+        """Calls the handler for `event` and returns its response, or a 404/405 response."""
+        method = event.get('httpMethod')
+        handler = self._routes.get((method, event.get('resource'))) or self._routes.get((ANY, event.get('resource')))
+        if handler is not None:
+            return handler(event)
+
+        path = event.get('path') or '/'
+        handler, params, allowed = self.match(method, path)
+        stage = (event.get('requestContext') or {}).get('stage')
+        if not allowed and stage and path.startswith(f'/{stage}/'):
+            handler, params, allowed = self.match(method, path[len(stage) + 1:])
+        if handler is not None:
+            return handler({**event, 'pathParameters': {**params, **(event.get('pathParameters') or {})}})
+        if allowed:
+            return api_responses.error_response('method_not_allowed', {'Allow': ', '.join(allowed)})
+        return api_responses.error_response('route_not_found')
+
+
+def _segments(path):
+    return [segment for segment in path.split('/') if segment]
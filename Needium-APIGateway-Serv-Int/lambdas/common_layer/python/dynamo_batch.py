@@ -0,0 +1,110 @@
+############################################################
+#Shared DynamoDB helpers for the SQS consumer Lambdas
+############################################################
+# lambdas/common_layer/python/dynamo_batch.py
+import random
+import time
+
+from structured_logging import get_logger
+
+logger = get_logger('dynamo_batch')
+
+# BatchWriteItem accepts at most 25 put/delete requests per call
+MAX_BATCH_WRITE_ITEMS = 25
+
+
+def _write_chunk(client, table_name, chunk, max_attempts, base_delay):
+    """Writes one chunk of up to 25 items; returns the items still unprocessed."""
+    request_items = {table_name: [{'PutRequest': {'Item': item}} for item in chunk]}
+
+    for attempt in range(max_attempts):
+        try:
+            response = client.batch_write_item(RequestItems=request_items)
+        except Exception as e:
+            # The whole chunk failed (botocore already retried throttling); report it as unprocessed
+            logger.error("BatchWriteItem failed for %d items: %s", len(request_items[table_name]), e)
+            break
+        request_items = response.get('UnprocessedItems') or {}
+        if not request_items:
+            break
+        if attempt < max_attempts - 1:
+            time.sleep(random.uniform(0, base_delay * (2 ** attempt)))
+
+    return [request['PutRequest']['Item'] for request in request_items.get(table_name, [])]
+
+
+def batch_put_items(table, items, key_name='id', max_attempts=5, base_delay=0.05, executor=None):
+    """
+    Writes `items` to `table` with BatchWriteItem in chunks of 25.
+
+    UnprocessedItems (throttling or partition limits) are retried with
+    exponential backoff and full jitter, up to `max_attempts` calls per chunk.
+    BatchWriteItem rejects a chunk containing the same key twice, so repeated
+    keys are collapsed to the last item seen. With an `executor` the chunks
+    are written concurrently.
+
+    Returns the items that were still unprocessed after the last attempt,
+    including every item of a chunk whose BatchWriteItem call raised.
+    """
+    unique_items = list({item[key_name]: item for item in items}.values())
+    client = table.meta.client
+    chunks = [unique_items[start:start + MAX_BATCH_WRITE_ITEMS] for start in range(0, len(unique_items), MAX_BATCH_WRITE_ITEMS)]
+
+    def write(chunk):
+        return _write_chunk(client, table.name, chunk, max_attempts, base_delay)
+
+    results = executor.map(write, chunks) if executor else map(write, chunks)
+    return [item for unprocessed in results for item in unprocessed]
+
+
+def _put_if_absent(client, table_name, item, key_name):
+    """Conditional PutItem for one item; returns 'written', 'duplicate' or 'failed'."""
+    try:
+        client.put_item(
+            TableName=table_name,
+            Item=item,
+            ConditionExpression='attribute_not_exists(#key)',
+            ExpressionAttributeNames={'#key': key_name},
+        )
+        return 'written'
+    except client.exceptions.ConditionalCheckFailedException:
+        return 'duplicate'
+    except Exception as e:
+        logger.error("PutItem failed for %s=%s: %s", key_name, item[key_name], e)
+        return 'failed'
+
+
+def put_items_if_absent(table, items, key_name='id', executor=None):
+    """
+    Writes each item with a conditional PutItem that only succeeds when no item
+    with the same key exists yet, so a redelivered message never overwrites
+    a record (and its status) written earlier.
+
+    BatchWriteItem cannot carry a condition, which is why this costs one
+    request per item; with an `executor` those requests run concurrently on
+    the table's (thread-safe) client. Repeated keys within `items` are
+    written once.
+
+    Returns (written, duplicates, failed) lists of items; duplicates are the
+    items whose key was already present.
+    """
+    client = table.meta.client
+    outcomes = {'written': [], 'duplicate': [], 'failed': []}
+    unique_items = []
+    seen_keys = set()
+
+    for item in items:
+        if item[key_name] in seen_keys:
+            outcomes['duplicate'].append(item)
+            continue
+        seen_keys.add(item[key_name])
+        unique_items.append(item)
+
+    def write(item):
+        return _put_if_absent(client, table.name, item, key_name)
+
+    results = executor.map(write, unique_items) if executor else map(write, unique_items)
+    for item, outcome in zip(unique_items, results):
+        outcomes[outcome].append(item)
+
+    return outcomes['written'], outcomes['duplicate'], outcomes['failed']
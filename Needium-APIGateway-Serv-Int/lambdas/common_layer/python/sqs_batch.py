@@ -0,0 +1,128 @@
+############################################################
+#Shared SQS batch processing for the SQS consumer Lambdas
+############################################################
+# lambdas/common_layer/python/sqs_batch.py
+import os
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from dynamo_batch import batch_put_items, put_items_if_absent
+from structured_logging import get_logger
+
+logger = get_logger('sqs_batch')
+
+# SQS delivers at least once, so by default items are only written if their key is new.
+# Set IDEMPOTENT_WRITES=false to go back to unconditional BatchWriteItem (last write wins).
+IDEMPOTENT_WRITES = os.environ.get('IDEMPOTENT_WRITES', 'true').lower() == 'true'
+DEDUPE_CACHE_SIZE = int(os.environ.get('DEDUPE_CACHE_SIZE', '10000'))
+# Opt-in: more than 1 sends the DynamoDB writes of a batch through a bounded thread pool
+SQS_WORKERS = int(os.environ.get('SQS_WORKERS', '1'))
+
+BatchResult = namedtuple('BatchResult', ['failed_message_ids', 'duplicates'])
+
+
+class RecentMessages:
+    """
+    LRU of messageIds this container has already processed. A redelivered
+    message that is still in here is skipped without any DynamoDB request.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._ids = OrderedDict()
+
+    def __contains__(self, message_id):
+        if message_id in self._ids:
+            self._ids.move_to_end(message_id)
+            return True
+        return False
+
+    def add(self, message_id):
+        self._ids[message_id] = None
+        self._ids.move_to_end(message_id)
+        while len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+
+
+# Per container; survives across invocations while the container is warm
+recent_messages = RecentMessages(DEDUPE_CACHE_SIZE)
+dedupe_counts = {'cache': 0, 'conditional': 0}
+_executors = {}
+
+
+def get_executor(workers=None):
+    """Returns the (reused) thread pool for `workers` threads, or None to write sequentially."""
+    workers = workers or SQS_WORKERS
+    if workers <= 1:
+        return None
+    if workers not in _executors:
+        _executors[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sqs-writer')
+    return _executors[workers]
+
+
+def client_config():
+    """botocore Config with enough pooled connections for every worker thread to share one client."""
+    from botocore.config import Config
+    return Config(max_pool_connections=max(10, SQS_WORKERS))
+
+
+def process_records(records, build_item, get_table, key_name='id', workers=None):
+    """
+    Builds one DynamoDB item per SQS record and writes them to the table
+    returned by `get_table`, which is only called when there is something to write.
+
+    Messages seen recently by this container are skipped before decoding, and
+    with IDEMPOTENT_WRITES an item whose key already exists in the table is not
+    overwritten; both count as duplicates and are acknowledged. Writes go
+    through a pool of `workers` threads (default SQS_WORKERS) when it is above 1;
+    every item's outcome is still captured separately.
+
+    Returns a BatchResult with the messageIds of the records that failed, either
+    because `build_item` raised (bad JSON, missing fields) or because their item
+    could not be written, and the number of duplicates. Records that succeeded
+    are never reported, so SQS only redelivers the failures.
+    """
+    failed_message_ids = []
+    duplicates = 0
+    items = []
+    message_ids_by_key = {} # several messages can carry the same transaction/appointment id
+
+    for record in records:
+        if record['messageId'] in recent_messages:
+            duplicates += 1
+            dedupe_counts['cache'] += 1
+            continue
+        try:
+            item = build_item(record)
+        except Exception as e:
+            # The body itself is not logged (it can hold payment data); the message keeps it in the DLQ
+            logger.warning("Error building item from SQS message %s: %s", record.get('messageId'), e)
+            failed_message_ids.append(record['messageId'])
+            continue
+        items.append(item)
+        message_ids_by_key.setdefault(item[key_name], []).append(record['messageId'])
+
+    if not items:
+        unprocessed = []
+    elif IDEMPOTENT_WRITES:
+        _, duplicate_items, unprocessed = put_items_if_absent(get_table(), items, key_name=key_name, executor=get_executor(workers))
+        duplicates += len(duplicate_items)
+        dedupe_counts['conditional'] += len(duplicate_items)
+    else:
+        unprocessed = batch_put_items(get_table(), items, key_name=key_name, executor=get_executor(workers))
+
+    for item in unprocessed:
+        failed_message_ids.extend(message_ids_by_key[item[key_name]])
+
+    failed = set(failed_message_ids)
+    for message_ids in message_ids_by_key.values():
+        for message_id in message_ids:
+            if message_id not in failed:
+                recent_messages.add(message_id)
+
+    return BatchResult(failed_message_ids, duplicates)
+
+
+def batch_response(failed_message_ids):
+    """Response shape Lambda expects when the event source mapping reports batch item failures."""
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_message_ids]}
@@ -2,48 +2,60 @@
 #Payment Microservices
 ############################################################
 # lambdas/payment_sqs_lambda/main.py
-import json
 import os
-import boto3
+import urllib.parse
+
+from api_responses import loads # Provided by the common Lambda layer
+from payment_validation import validate_payment_request # Provided by the common Lambda layer
+from sqs_batch import batch_response, client_config, process_records # Provided by the common Lambda layer
+from structured_logging import get_logger, log_event, set_request_id
+
+logger = get_logger('payment_sqs_lambda')
 
-dynamodb = boto3.resource('dynamodb')
 table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'PaymentData') # Default for local testing
-payment_table = dynamodb.Table(table_name)
 
-def handler(event, context):
-    print(f"Payment SQS Lambda received event: {json.dumps(event)}")
-
-    for record in event['Records']:
-        message_body = record['body']
-        try:
-            # The message_body from API Gateway SQS integration is URL-encoded string of the original JSON body
-            # So we need to URL-decode it first, then load it as JSON
-            import urllib.parse
-            decoded_body = urllib.parse.unquote_plus(message_body)
-            payment_data = json.loads(decoded_body)
-
-            # Process payment_data and store in DynamoDB
-            # In a real application, you'd add more robust processing and error handling
-            item = {
-                'id': payment_data.get('transaction_id', record['messageId']), # Use a provided ID or SQS message ID
-                'amount': payment_data.get('amount'),
-                'currency': payment_data.get('currency'),
-                'status': 'processed',
-                'timestamp': record['attributes']['SentTimestamp']
-            }
-            payment_table.put_item(Item=item)
-            print(f"Successfully processed payment and stored in DynamoDB: {item}")
-
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON from SQS message: {e} - Body: {message_body}")
-            # Depending on your DLQ strategy, you might re-raise or log this
-        except Exception as e:
-            print(f"Error processing SQS message or writing to DynamoDB: {e}")
-            # Re-raise the exception to trigger SQS redelivery/DLQ
-            raise e
+# Built on first use and reused while the container is warm; a batch made only of
+# redelivered (cached) or undecodable messages never needs it.
+_payment_table = None
+
+def get_table():
+    """Returns the container-wide Table, on one client shared by the writer threads."""
+    global _payment_table
+    if _payment_table is None:
+        import boto3
+        _payment_table = boto3.resource('dynamodb', config=client_config()).Table(table_name)
+    return _payment_table
+
+def build_item(record):
+    """Turns one SQS record into the DynamoDB item to store."""
+    # The message_body from API Gateway SQS integration is URL-encoded string of the original JSON body
+    # So we need to URL-decode it first, then load it as JSON
+    decoded_body = urllib.parse.unquote_plus(record['body'])
+    payment_data = loads(decoded_body) # amounts as Decimal, which DynamoDB accepts (it rejects float)
+    # API Gateway hands the body straight to SQS without a request model, so this is where it is checked;
+    # an invalid payment raises ValueError and is reported as a failed (poison) message
+    validate_payment_request(payment_data)
 
+    # In a real application, you'd add more robust processing and error handling
     return {
-        'statusCode': 200,
-        'body': json.dumps('Messages processed successfully')
+        'id': payment_data.get('transaction_id', record['messageId']), # Use a provided ID or SQS message ID
+        'amount': payment_data.get('amount'),
+        'currency': payment_data.get('currency'),
+        'status': 'processed',
+        'timestamp': record['attributes']['SentTimestamp']
     }
-lambdas/payment_sqs_lambda/requirements.txt
\ No newline at end of file
+
+def handler(event, context):
+    set_request_id(getattr(context, 'aws_request_id', None))
+    log_event(logger, event, "Payment SQS Lambda received event")
+
+    # Build every item first, then write them together instead of one put_item round trip per record.
+    # Only the records that failed are reported back, so SQS does not redeliver the ones already written;
+    # undecodable (poison) messages are reported too and end up in the dead-letter queue.
+    # Redelivered messages and already-stored ids are acknowledged as duplicates without being rewritten.
+    result = process_records(event['Records'], build_item, get_table)
+
+    processed = len(event['Records']) - len(result.failed_message_ids) - result.duplicates
+    logger.info("Processed %d payments, %d duplicates, %d failed", processed, result.duplicates, len(result.failed_message_ids))
+    return batch_response(result.failed_message_ids)
+# lambdas/payment_sqs_lambda/requirements.txt
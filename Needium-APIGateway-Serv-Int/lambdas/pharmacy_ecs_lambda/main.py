@@ -1,20 +0,0 @@
-############################################################
-#Pharmacy Microservices
-#########################################################
-lambdas/pharmacy_ecs_lambda/main.py (Placeholder for Pharmacy ECS service)
-This Lambda is a placeholder. The actual logic for Pharmacy will reside in the ECS service behind the ALB.
-
-Python
-
-# lambdas/pharmacy_ecs_lambda/main.py
-import json
-
-def handler(event, context):
-    # This Lambda is just a placeholder for the zip archive.
-    # The actual Pharmacy microservice logic runs on ECS.
-    return {
-        "statusCode": 200,
-        "body": json.dumps("This is a placeholder Lambda for Pharmacy ECS service.")
-    }
-lambdas/pharmacy_ecs_lambda/requirements.txt
-(Empty)
\ No newline at end of file
@@ -1,49 +1,59 @@
 #######################################################
 #Telemedicine Microservices
 #########################################################
-lambdas/telemedicine_sqs_lambda/main.py (Telemedicine Microservice Lambda - SQS triggered)
+# lambdas/telemedicine_sqs_lambda/main.py (Telemedicine Microservice Lambda - SQS triggered)
 
-Python
+# Python
 
 # lambdas/telemedicine_sqs_lambda/main.py
-import json
 import os
-import boto3
+import urllib.parse
+
+from api_responses import loads # Provided by the common Lambda layer
+from sqs_batch import batch_response, client_config, process_records # Provided by the common Lambda layer
+from structured_logging import get_logger, log_event, set_request_id
+
+logger = get_logger('telemedicine_sqs_lambda')
 
-dynamodb = boto3.resource('dynamodb')
 table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'TelemedicineData') # Default for local testing
-telemedicine_table = dynamodb.Table(table_name)
 
-def handler(event, context):
-    print(f"Telemedicine SQS Lambda received event: {json.dumps(event)}")
-
-    for record in event['Records']:
-        message_body = record['body']
-        try:
-            import urllib.parse
-            decoded_body = urllib.parse.unquote_plus(message_body)
-            appointment_data = json.loads(decoded_body)
-
-            # Process appointment_data and store in DynamoDB
-            item = {
-                'id': appointment_data.get('appointment_id', record['messageId']),
-                'patient_id': appointment_data.get('patient_id'),
-                'doctor_id': appointment_data.get('doctor_id'),
-                'appointment_time': appointment_data.get('appointment_time'),
-                'status': 'scheduled',
-                'timestamp': record['attributes']['SentTimestamp']
-            }
-            telemedicine_table.put_item(Item=item)
-            print(f"Successfully processed telemedicine appointment and stored in DynamoDB: {item}")
-
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON from SQS message: {e} - Body: {message_body}")
-        except Exception as e:
-            print(f"Error processing SQS message or writing to DynamoDB: {e}")
-            raise e
+# Built on first use and reused while the container is warm; a batch made only of
+# redelivered (cached) or undecodable messages never needs it.
+_telemedicine_table = None
+
+def get_table():
+    """Returns the container-wide Table, on one client shared by the writer threads."""
+    global _telemedicine_table
+    if _telemedicine_table is None:
+        import boto3
+        _telemedicine_table = boto3.resource('dynamodb', config=client_config()).Table(table_name)
+    return _telemedicine_table
+
+def build_item(record):
+    """Turns one SQS record into the DynamoDB item to store."""
+    decoded_body = urllib.parse.unquote_plus(record['body'])
+    appointment_data = loads(decoded_body)
 
     return {
-        'statusCode': 200,
-        'body': json.dumps('Messages processed successfully')
+        'id': appointment_data.get('appointment_id', record['messageId']),
+        'patient_id': appointment_data.get('patient_id'),
+        'doctor_id': appointment_data.get('doctor_id'),
+        'appointment_time': appointment_data.get('appointment_time'),
+        'status': 'scheduled',
+        'timestamp': record['attributes']['SentTimestamp']
     }
-lambdas/telemedicine_sqs_lambda/requirements.txt
\ No newline at end of file
+
+def handler(event, context):
+    set_request_id(getattr(context, 'aws_request_id', None))
+    log_event(logger, event, "Telemedicine SQS Lambda received event")
+
+    # Build every item first, then write them together instead of one put_item round trip per record.
+    # Only the records that failed are reported back, so SQS does not redeliver the ones already written;
+    # undecodable (poison) messages are reported too and end up in the dead-letter queue.
+    # Redelivered messages and already-stored ids are acknowledged as duplicates without being rewritten.
+    result = process_records(event['Records'], build_item, get_table)
+
+    processed = len(event['Records']) - len(result.failed_message_ids) - result.duplicates
+    logger.info("Processed %d telemedicine appointments, %d duplicates, %d failed", processed, result.duplicates, len(result.failed_message_ids))
+    return batch_response(result.failed_message_ids)
+# lambdas/telemedicine_sqs_lambda/requirements.txt
@@ -391,6 +391,13 @@ resource "aws_lambda_function" "auth_lambda" {
     variables = {
       FUSIONAUTH_DOMAIN  = var.fusionauth_domain
       FUSIONAUTH_API_KEY = var.fusionauth_api_key # Consider Secrets Manager for production
+      # Verify JWTs locally against the cached JWKS instead of calling /api/jwt/validate per request
+      AUTH_MODE               = "local"
+      REMOTE_REVOCATION_CHECK = var.fusionauth_revocation_check ? "true" : "false"
+      FUSIONAUTH_ISSUER       = var.fusionauth_issuer != "" ? var.fusionauth_issuer : var.fusionauth_domain
+      FUSIONAUTH_AUDIENCE     = var.fusionauth_audience
+      # Optional role -> "METHOD/path" grants; empty allows a valid token on every route of the stage
+      POLICY_ROLE_ROUTES      = var.authorizer_role_routes
     }
   }
   # Lambdas that need to access VPC resources must be in a VPC
@@ -406,6 +413,20 @@ data "archive_file" "auth_lambda_zip" {
   output_path = "lambdas/auth_lambda.zip"
 }
 
+# Shared helpers for the SQS consumer Lambdas, published as a layer (modules live under python/)
+resource "aws_lambda_layer_version" "common_layer" {
+  layer_name          = "needium-common"
+  filename            = data.archive_file.common_layer_zip.output_path
+  source_code_hash    = data.archive_file.common_layer_zip.output_base64sha256
+  compatible_runtimes = ["python3.9"]
+}
+
+data "archive_file" "common_layer_zip" {
+  type        = "zip"
+  source_dir  = "lambdas/common_layer"
+  output_path = "lambdas/common_layer.zip"
+}
+
 # Payment Microservice Lambda (triggered by SQS)
 resource "aws_lambda_function" "payment_sqs_lambda" {
   function_name = "payment-sqs-processor"
@@ -414,6 +435,16 @@ resource "aws_lambda_function" "payment_sqs_lambda" {
   role          = aws_iam_role.lambda_exec_role.arn
   filename      = data.archive_file.payment_sqs_lambda_zip.output_path
   source_code_hash = data.archive_file.payment_sqs_lambda_zip.output_base64sha256
+  layers        = [aws_lambda_layer_version.common_layer.arn]
+  # A 100-record batch is 100 conditional PutItems; the 3 s default leaves no room for throttling retries
+  timeout       = var.sqs_consumer_timeout
+  environment {
+    variables = {
+      SQS_WORKERS           = var.sqs_consumer_workers
+      LOG_LEVEL             = "INFO"
+      LOG_EVENT_SAMPLE_RATE = "0" # share of batches logged in full (redacted) when not at DEBUG
+    }
+  }
   vpc_config {
     subnet_ids         = [aws_subnet.private_a.id, aws_subnet.private_b.id]
     security_group_ids = [aws_security_group.lambda_sg.id]
@@ -434,6 +465,16 @@ resource "aws_lambda_function" "telemedicine_sqs_lambda" {
   role          = aws_iam_role.lambda_exec_role.arn
   filename      = data.archive_file.telemedicine_sqs_lambda_zip.output_path
   source_code_hash = data.archive_file.telemedicine_sqs_lambda_zip.output_base64sha256
+  layers        = [aws_lambda_layer_version.common_layer.arn]
+  # A 100-record batch is 100 conditional PutItems; the 3 s default leaves no room for throttling retries
+  timeout       = var.sqs_consumer_timeout
+  environment {
+    variables = {
+      SQS_WORKERS           = var.sqs_consumer_workers
+      LOG_LEVEL             = "INFO"
+      LOG_EVENT_SAMPLE_RATE = "0" # share of batches logged in full (redacted) when not at DEBUG
+    }
+  }
   vpc_config {
     subnet_ids         = [aws_subnet.private_a.id, aws_subnet.private_b.id]
     security_group_ids = [aws_security_group.lambda_sg.id]
@@ -446,26 +487,7 @@ data "archive_file" "telemedicine_sqs_lambda_zip" {
   output_path = "lambdas/telemedicine_sqs_lambda.zip"
 }
 
-# Placeholder Lambdas for ECS/EC2 (not directly invoked by API GW, but needed for zip data source)
-resource "aws_lambda_function" "pharmacy_ecs_lambda_placeholder" {
-  function_name = "pharmacy-ecs-placeholder"
-  handler       = "main.handler"
-  runtime       = "python3.9"
-  role          = aws_iam_role.lambda_exec_role.arn
-  filename      = data.archive_file.pharmacy_ecs_lambda_zip.output_path
-  source_code_hash = data.archive_file.pharmacy_ecs_lambda_zip.output_base64sha256
-  vpc_config {
-    subnet_ids         = [aws_subnet.private_a.id, aws_subnet.private_b.id]
-    security_group_ids = [aws_security_group.lambda_sg.id]
-  }
-}
-
-data "archive_file" "pharmacy_ecs_lambda_zip" {
-  type        = "zip"
-  source_dir  = "lambdas/pharmacy_ecs_lambda"
-  output_path = "lambdas/pharmacy_ecs_lambda.zip"
-}
-
+# Placeholder Lambda for EC2 (not directly invoked by API GW, but needed for zip data source)
 resource "aws_lambda_function" "pfm_ec2_lambda_placeholder" {
   function_name = "pfm-ec2-placeholder"
   handler       = "main.handler"
@@ -493,7 +515,17 @@ resource "aws_sqs_queue" "payment_queue" {
   max_message_size          = 262144 # 256 KB
   message_retention_seconds = 345600 # 4 days
   receive_wait_time_seconds = 0
-  visibility_timeout_seconds = 30
+  visibility_timeout_seconds = 6 * var.sqs_consumer_timeout # as AWS advises for Lambda consumers; never below the timeout
+  # Messages the consumer keeps reporting as failed (e.g. undecodable JSON) are parked after 5 attempts
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.payment_dlq.arn
+    maxReceiveCount     = 5
+  })
+}
+
+resource "aws_sqs_queue" "payment_dlq" {
+  name                      = "payment-microservice-dlq"
+  message_retention_seconds = 1209600 # 14 days
 }
 
 resource "aws_sqs_queue" "telemedicine_queue" {
@@ -502,7 +534,16 @@ resource "aws_sqs_queue" "telemedicine_queue" {
   max_message_size          = 262144
   message_retention_seconds = 345600
   receive_wait_time_seconds = 0
-  visibility_timeout_seconds = 30
+  visibility_timeout_seconds = 6 * var.sqs_consumer_timeout # as AWS advises for Lambda consumers; never below the timeout
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.telemedicine_dlq.arn
+    maxReceiveCount     = 5
+  })
+}
+
+resource "aws_sqs_queue" "telemedicine_dlq" {
+  name                      = "telemedicine-microservice-dlq"
+  message_retention_seconds = 1209600
 }
 
 # --- SQS Event Source Mappings for Lambdas ---
@@ -510,14 +551,24 @@ resource "aws_sqs_queue" "telemedicine_queue" {
 resource "aws_lambda_event_source_mapping" "payment_sqs_event_source" {
   event_source_arn = aws_sqs_queue.payment_queue.arn
   function_name    = aws_lambda_function.payment_sqs_lambda.arn
-  batch_size       = 10
+  # Records are written in parallel (SQS_WORKERS threads), so larger batches cost few extra round trips.
+  # Batches above 10 need a batching window on standard queues.
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 1
+  # Handlers return batchItemFailures so only the failed messages are redelivered
+  function_response_types            = ["ReportBatchItemFailures"]
   enabled          = true
 }
 
 resource "aws_lambda_event_source_mapping" "telemedicine_sqs_event_source" {
   event_source_arn = aws_sqs_queue.telemedicine_queue.arn
   function_name    = aws_lambda_function.telemedicine_sqs_lambda.arn
-  batch_size       = 10
+  # Records are written in parallel (SQS_WORKERS threads), so larger batches cost few extra round trips.
+  # Batches above 10 need a batching window on standard queues.
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 1
+  # Handlers return batchItemFailures so only the failed messages are redelivered
+  function_response_types            = ["ReportBatchItemFailures"]
   enabled          = true
 }
 
@@ -656,7 +707,7 @@ resource "aws_ecs_task_definition" "pharmacy_task_def" {
   container_definitions = jsonencode([
     {
       name        = "pharmacy-app"
-      image       = "nginx:latest" # Replace with your actual Pharmacy microservice image
+      image       = var.pharmacy_service_image # Built from pharmacy.Dockerfile
       essential   = true
       portMappings = [
         {
@@ -681,6 +732,24 @@ resource "aws_ecs_task_definition" "pharmacy_task_def" {
         {
           name  = "DB_PASSWORD"
           value = var.db_password # Use Secrets Manager in production
+        },
+        # The task's requests share this asyncpg pool; desired_count x DB_POOL_MAX_SIZE
+        # has to stay under the RDS instance's max_connections (about 80 on a db.t3.micro)
+        {
+          name  = "DB_POOL_MIN_SIZE"
+          value = "2"
+        },
+        {
+          name  = "DB_POOL_MAX_SIZE"
+          value = "10"
+        },
+        {
+          name  = "PORT"
+          value = "80"
+        },
+        {
+          name  = "LOG_LEVEL"
+          value = "INFO"
         }
       ]
       logConfiguration = {
@@ -768,7 +837,7 @@ resource "aws_lb_target_group" "pharmacy_tg" {
   target_type = "ip" # For Fargate tasks
 
   health_check {
-    path = "/"
+    path = "/health" # answered without a database round trip
     protocol = "HTTP"
     matcher = "200"
   }
@@ -18,12 +18,16 @@
 │   ├── telemedicine_sqs_lambda/
 │   │   ├── main.py
 │   │   └── requirements.txt
-│   ├── pharmacy_ecs_lambda/ # Placeholder, actual ECS service handles logic
-│   │   ├── main.py
-│   │   └── requirements.txt
 │   └── pfm_ec2_lambda/    # Placeholder, actual EC2 instance handles logic
 │       ├── main.py
 │       └── requirements.txt
+├── services/
+│   └── pharmacy_service/  # Pharmacy microservice on ECS (asyncpg + uvicorn)
+│       ├── main.py
+│       ├── db.py
+│       ├── schema.sql
+│       └── requirements.txt
+├── pharmacy.Dockerfile
 └── scripts/
     └── package_lambdas.sh
 
@@ -226,8 +230,9 @@ Pharmacy Service (API Gateway -> ALB -> ECS -> PostgreSQL):
 ECS Cluster (aws_ecs_cluster): A logical grouping for your ECS services.
 
 ECS Task Definition (aws_ecs_task_definition): Defines your application container, CPU/memory, network mode (awsvpc for Fargate), 
-and environment variables (e.g., for database connection details). You'll need to replace nginx:latest with your actual microservice
-Docker image.
+and environment variables (e.g., for database connection details). The container is the Pharmacy microservice in
+services/pharmacy_service (medications catalog and orders over an asyncpg pool), built from pharmacy.Dockerfile and passed
+in as var.pharmacy_service_image. scripts/bench_pharmacy_service.py load-tests it against a local PostgreSQL container.
 
 ECS Service (aws_ecs_service): Maintains the desired count of tasks, handles deployments, and integrates with the ALB.
 
@@ -0,0 +1,151 @@
+#####################################################################
+#Benchmark: auth_lambda local vs remote JWT verification
+####################################################################
+# scripts/bench_auth_lambda.py
+#
+# Starts a stand-in FusionAuth server on localhost (JWKS + /api/jwt/validate),
+# then drives lambdas/auth_lambda/main.handler in each verification mode and
+# reports verifications/sec.
+#
+# Usage (from the Needium-APIGateway-Serv-Int directory):
+#   pip install requests "PyJWT[crypto]"
+#   python scripts/bench_auth_lambda.py --iterations 2000 --fusionauth-latency-ms 15
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jwt.algorithms import ECAlgorithm, RSAAlgorithm
+
+ISSUER = "https://fusionauth.local"
+AUDIENCE = "needium-api"
+
+
+def build_keys():
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+
+    rsa_jwk = RSAAlgorithm.to_jwk(rsa_key.public_key(), as_dict=True)
+    rsa_jwk.update({"kid": "rsa-1", "alg": "RS256", "use": "sig"})
+    ec_jwk = ECAlgorithm.to_jwk(ec_key.public_key(), as_dict=True)
+    ec_jwk.update({"kid": "ec-1", "alg": "ES256", "use": "sig"})
+
+    signers = {"RS256": ("rsa-1", rsa_key), "ES256": ("ec-1", ec_key)}
+    return {"keys": [rsa_jwk, ec_jwk]}, signers
+
+
+def issue_token(signers, algorithm, subject="user-1"):
+    kid, key = signers[algorithm]
+    now = int(time.time())
+    claims = {"sub": subject, "iss": ISSUER, "aud": AUDIENCE, "iat": now, "exp": now + 3600}
+    return jwt.encode(claims, key, algorithm=algorithm, headers={"kid": kid})
+
+
+def start_fake_fusionauth(jwks, latency_seconds):
+    """Serves the JWKS document and a /api/jwt/validate endpoint that verifies with the same keys."""
+    public_keys = {k["kid"]: jwt.PyJWK(k) for k in jwks["keys"]}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # keep-alive responses are written in two sends
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/.well-known/jwks.json":
+                self._reply(200, jwks)
+            else:
+                self._reply(404, {})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            token = json.loads(self.rfile.read(length))["jwt"]
+            time.sleep(latency_seconds)
+            try:
+                key = public_keys[jwt.get_unverified_header(token)["kid"]]
+                claims = jwt.decode(token, key.key, algorithms=["RS256", "ES256"], audience=AUDIENCE, issuer=ISSUER)
+                self._reply(200, {"isValid": True, "jwt": claims})
+            except Exception as e:
+                self._reply(200, {"isValid": False, "error": str(e)})
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(handler_module, mode, revocation_check, tokens, iterations):
+    handler_module.AUTH_MODE = mode
+    handler_module.REMOTE_REVOCATION_CHECK = revocation_check
+    event = {"methodArn": "arn:aws:execute-api:us-east-1:123456789012:api/dev/GET/payment"}
+
+    # One warm-up call so the JWKS fetch is not counted against local mode
+    handler_module.handler(dict(event, authorizationToken=f"Bearer {tokens[0]}"), None)
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        token = tokens[i % len(tokens)]
+        handler_module.handler(dict(event, authorizationToken=f"Bearer {token}"), None)
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark auth_lambda verification modes")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--fusionauth-latency-ms", type=float, default=10.0,
+                        help="Artificial latency added to each /api/jwt/validate call")
+    args = parser.parse_args()
+
+    jwks, signers = build_keys()
+    server = start_fake_fusionauth(jwks, args.fusionauth_latency_ms / 1000.0)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    os.environ.update({
+        "FUSIONAUTH_DOMAIN": base_url,
+        "FUSIONAUTH_API_KEY": "bench",
+        "FUSIONAUTH_ISSUER": ISSUER,
+        "FUSIONAUTH_AUDIENCE": AUDIENCE,
+    })
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambdas", "auth_lambda"))
+    import main as auth_lambda
+
+    # auth_lambda prints one line per invocation; keep the benchmark output readable
+    real_stdout = sys.stdout
+    results = []
+    for algorithm in ("RS256", "ES256"):
+        tokens = [issue_token(signers, algorithm, f"user-{i}") for i in range(50)]
+        for label, mode, revocation_check in (
+            ("remote /api/jwt/validate", "remote", False),
+            ("local JWKS", "local", False),
+            ("local JWKS + revocation check", "local", True),
+        ):
+            sys.stdout = open(os.devnull, "w")
+            try:
+                rate = run(auth_lambda, mode, revocation_check, tokens, args.iterations)
+            finally:
+                sys.stdout.close()
+                sys.stdout = real_stdout
+            results.append((algorithm, label, rate))
+
+    server.shutdown()
+    print(f"FusionAuth stand-in latency: {args.fusionauth_latency_ms:.1f} ms, iterations: {args.iterations}")
+    for algorithm, label, rate in results:
+        print(f"{algorithm:6} {label:32} {rate:10.1f} verifications/sec")
+
+
+if __name__ == "__main__":
+    main()
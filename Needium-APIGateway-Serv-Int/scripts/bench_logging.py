@@ -0,0 +1,92 @@
+#####################################################################
+#Microbenchmark: logging cost per SQS consumer invocation
+####################################################################
+# scripts/bench_logging.py
+#
+# Measures the CPU time the SQS consumers spend logging one invocation, for
+# synthetic batches of increasing size:
+#   print         - the old print(f"... event: {json.dumps(event)}") plus the summary line
+#   info          - structured_logging at INFO: the event is not logged at all
+#   sampled 1%    - INFO with LOG_EVENT_SAMPLE_RATE=0.01
+#   debug         - every event logged in full, redacted
+# Output goes to /dev/null so the terminal does not dominate the numbers.
+#
+# Usage (from the Needium-APIGateway-Serv-Int directory):
+#   python scripts/bench_logging.py --batch-sizes 1,10,100
+import argparse
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+import urllib.parse
+import uuid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_event(batch_size):
+    records = []
+    for n in range(batch_size):
+        body = json.dumps({"transaction_id": str(uuid.uuid4()), "amount": n + 1, "currency": "USD"})
+        records.append({
+            "messageId": str(uuid.uuid4()),
+            "receiptHandle": uuid.uuid4().hex * 4,
+            "body": urllib.parse.quote_plus(body),
+            "attributes": {"SentTimestamp": str(int(time.time() * 1000)), "ApproximateReceiveCount": "1"},
+            "messageAttributes": {},
+            "eventSource": "aws:sqs",
+        })
+    return {"Records": records}
+
+
+def cpu_per_call(fn, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark logging cost per SQS consumer invocation")
+    parser.add_argument("--batch-sizes", default="1,10,100")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(HERE, "..", "lambdas", "common_layer", "python"))
+    import structured_logging
+
+    devnull = open(os.devnull, "w")
+    logger = structured_logging.get_logger("bench_logging")
+    logger.handlers[0].setStream(devnull)
+
+    def old(event):
+        with contextlib.redirect_stdout(devnull):
+            print(f"Payment SQS Lambda received event: {json.dumps(event)}")
+            print(f"Processed {len(event['Records'])} payments, 0 duplicates, 0 failed")
+
+    def structured(event):
+        structured_logging.set_request_id("bench-request")
+        structured_logging.log_event(logger, event, "Payment SQS Lambda received event")
+        logger.info("Processed %d payments, %d duplicates, %d failed", len(event['Records']), 0, 0)
+
+    modes = (
+        ("print", old, logging.INFO, 0.0),
+        ("info", structured, logging.INFO, 0.0),
+        ("sampled 1%", structured, logging.INFO, 0.01),
+        ("debug", structured, logging.DEBUG, 0.0),
+    )
+
+    print(f"{'batch':>6} {'mode':>12} {'CPU us/call':>12}")
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        event = make_event(batch_size)
+        for label, fn, level, sample_rate in modes:
+            logger.setLevel(level)
+            structured_logging.LOG_EVENT_SAMPLE_RATE = sample_rate
+            elapsed = cpu_per_call(lambda: fn(event), args.iterations)
+            print(f"{batch_size:>6} {label:>12} {elapsed * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#####################################################################
+#Load test: Pharmacy microservice against a local PostgreSQL
+####################################################################
+# scripts/bench_pharmacy_service.py
+#
+# Starts services/pharmacy_service under uvicorn (or targets --url) and
+# drives it with --concurrency clients for --duration seconds over a mix of:
+#   list    GET /pharmacy/medications, following next_cursor to --max-depth pages
+#   get     GET /pharmacy/medications/{id} of a random medication
+#   order   POST /pharmacy/orders of 1-3 random medications (--order-share)
+# Reports requests/sec and p50/p90/p99/max latency per request type.
+#
+# Seeds --medications rows when the catalog is empty (or always, with
+# --reseed, which TRUNCATEs the pharmacy tables). Then compares, in SQL on
+# one connection, what the service does against what it replaces:
+#   - the page at --max-depth by keyset vs by OFFSET
+#   - the medication lookup as a cached prepared statement vs re-parsed and
+#     planned every time (statement_cache_size=0)
+#
+# Usage (from the Needium-APIGateway-Serv-Int directory):
+#   docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=pharmacy -e POSTGRES_DB=pharmacydb postgres:16
+#   export DB_HOST=localhost DB_USER=postgres DB_PASSWORD=pharmacy DB_NAME=pharmacydb
+#   pip install asyncpg "uvicorn[standard]" httpx
+#   python scripts/bench_pharmacy_service.py --concurrency 50 --duration 30
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.join(HERE, "..", "services", "pharmacy_service")
+LAYER_DIR = os.path.join(HERE, "..", "lambdas", "common_layer", "python")
+sys.path[:0] = [SERVICE_DIR, LAYER_DIR]
+
+FORMS = ["tablet", "capsule", "syrup", "injection", "cream", "inhaler"]
+STEMS = ["amoxi", "ator", "metfor", "lisino", "omepra", "sertra", "levo", "amlodi", "gaba", "prednis",
+         "cetiri", "losar", "simva", "ibupro", "parace", "clopido", "warfa", "insul", "salbu", "fluox"]
+SUFFIXES = ["cillin", "vastatin", "min", "pril", "zole", "line", "thyroxine", "pine", "pentin", "olone"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def seed(count, reseed):
+    """Applies the schema and fills an empty catalog with `count` medications."""
+    import db
+    pool = await db.create_pool()
+    try:
+        if reseed:
+            await pool.execute("TRUNCATE order_items, orders, medications RESTART IDENTITY")
+        existing = await pool.fetchval("SELECT count(*) FROM medications")
+        if existing == 0:
+            rng = random.Random(42)
+            rows = [(f"{rng.choice(STEMS)}{rng.choice(SUFFIXES)} {n:06d}", rng.choice(FORMS),
+                     f"{rng.choice([5, 10, 20, 25, 50, 100, 250, 500])} mg", rng.randint(100, 20000), 1_000_000)
+                    for n in range(count)]
+            async with pool.acquire() as connection:
+                await connection.copy_records_to_table(
+                    "medications", records=rows, columns=["name", "form", "strength", "price_cents", "stock"])
+            await pool.execute("ANALYZE medications")
+            existing = count
+        return await pool.fetchval("SELECT max(id) FROM medications"), existing
+    finally:
+        await pool.close()
+
+
+async def time_query(connection, query, args, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        await connection.fetch(query, *args)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def compare_sql(page_size, depth, calls):
+    import asyncpg
+    import db
+    cached = await asyncpg.connect(**db.connect_args())
+    uncached = await asyncpg.connect(**db.connect_args(), statement_cache_size=0)
+    try:
+        offset = page_size * (depth - 1)
+        boundary = await cached.fetchrow(
+            "SELECT name, id FROM medications ORDER BY name, id OFFSET $1 LIMIT 1", max(offset - 1, 0))
+        offset_query = (f"SELECT {db.MEDICATION_COLUMNS} FROM medications ORDER BY name, id OFFSET $1 LIMIT $2")
+        print(f"\nSQL on one connection, {calls} calls each:")
+        print(f"{'query':>42} {'mean us':>9}")
+        for label, query, args in (
+            (f"page {depth} by keyset", db.LIST_MEDICATIONS_AFTER, (boundary["name"], boundary["id"], page_size + 1)),
+            (f"page {depth} by OFFSET {offset}", offset_query, (offset, page_size + 1)),
+        ):
+            print(f"{label:>42} {await time_query(cached, query, args, calls):>9.0f}")
+        for label, connection in (("lookup by id, cached prepared statement", cached),
+                                  ("lookup by id, parsed and planned per call", uncached)):
+            print(f"{label:>42} {await time_query(connection, db.GET_MEDICATION, (1,), calls):>9.0f}")
+    finally:
+        await cached.close()
+        await uncached.close()
+
+
+def percentile(sorted_values, share):
+    return sorted_values[min(int(len(sorted_values) * share), len(sorted_values) - 1)]
+
+
+async def run_load(base_url, concurrency, duration, max_id, max_depth, order_share):
+    import httpx
+
+    latencies = {"list": [], "get": [], "order": []}
+    statuses = {}
+    deadline = time.monotonic() + duration
+
+    async def client_loop(client, rng):
+        cursor, depth = None, 0
+        while time.monotonic() < deadline:
+            roll = rng.random()
+            if roll < order_share:
+                kind = "order"
+                items = [{"medication_id": rng.randint(1, max_id), "quantity": rng.randint(1, 3)} for _ in range(rng.randint(1, 3))]
+                request = client.post("/pharmacy/orders", json={"patient_id": f"patient-{rng.randint(1, 10000)}", "items": items})
+            elif roll < 0.5:
+                kind = "list"
+                params = {"limit": 20, **({"cursor": cursor} if cursor else {})}
+                request = client.get("/pharmacy/medications", params=params)
+            else:
+                kind = "get"
+                request = client.get(f"/pharmacy/medications/{rng.randint(1, max_id)}")
+            start = time.perf_counter()
+            response = await request
+            latencies[kind].append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if kind == "list":
+                depth += 1
+                cursor = response.json().get("next_cursor") if depth < max_depth else None
+                depth = depth if cursor else 0
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        start = time.monotonic()
+        await asyncio.gather(*(client_loop(client, random.Random(n)) for n in range(concurrency)))
+        elapsed = time.monotonic() - start
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"\n{total} requests in {elapsed:.1f} s: {total / elapsed:.0f} req/s, statuses {statuses}")
+    print(f"{'request':>8} {'count':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for kind, values in latencies.items():
+        if values:
+            values.sort()
+            print(f"{kind:>8} {len(values):>7} " + " ".join(
+                f"{percentile(values, share) * 1000:>8.1f}" for share in (0.5, 0.9, 0.99, 1.0)))
+
+
+def start_service(port):
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([SERVICE_DIR, LAYER_DIR, os.environ.get("PYTHONPATH", "")]),
+           "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING")}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--no-access-log", "--log-level", "warning"],
+        cwd=SERVICE_DIR, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit("The service exited while starting")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    sys.exit("The service did not start listening")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Pharmacy microservice against a local PostgreSQL")
+    parser.add_argument("--url", help="A running service to test instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load")
+    parser.add_argument("--medications", type=int, default=100000, help="Catalog size to seed when it is empty")
+    parser.add_argument("--reseed", action="store_true", help="TRUNCATE the pharmacy tables and seed again")
+    parser.add_argument("--max-depth", type=int, default=50, help="Pages a client follows before starting over")
+    parser.add_argument("--order-share", type=float, default=0.05, help="Share of requests placing an order")
+    parser.add_argument("--sql-calls", type=int, default=500, help="Calls per query in the SQL comparison (0 to skip)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    max_id, count = asyncio.run(seed(args.medications, args.reseed))
+    print(f"{count} medications; {args.concurrency} clients for {args.duration:g} s, "
+          f"{args.order_share:.0%} orders, lists up to {args.max_depth} pages deep")
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        port = free_port()
+        process = start_service(port)
+        base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(run_load(base_url, args.concurrency, args.duration, max_id, args.max_depth, args.order_share))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    if args.sql_calls:
+        asyncio.run(compare_sql(20, args.max_depth * 20, args.sql_calls))
+
+
+if __name__ == "__main__":
+    main()
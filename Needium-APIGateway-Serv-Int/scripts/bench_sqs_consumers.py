@@ -0,0 +1,198 @@
+#####################################################################
+#Benchmark: SQS consumer Lambdas against a local DynamoDB stand-in
+####################################################################
+# scripts/bench_sqs_consumers.py
+#
+# Feeds synthetic SQS batches to lambdas/payment_sqs_lambda/main.handler and
+# reports wall-clock time and records/sec per invocation, next to the old
+# one-put_item-per-record loop.
+#
+# --latency-ms adds a fixed delay to every DynamoDB request so the local
+# stand-in behaves more like a network hop to the real service.
+#
+# --workers runs the handler path (process_records) once per worker count, to
+# show wall-clock time per batch as SQS_WORKERS grows. The in-process moto
+# server shares the GIL with the workers and levels off at a few workers;
+# DynamoDB Local runs in its own process and shows the scaling more faithfully.
+#
+# --poison-rate replays a batch containing undecodable messages until SQS would
+# dead-letter them (5 receives) and counts the items sent to DynamoDB, for
+# whole-batch redelivery (the handler raising) vs partial batch failure reporting.
+# It then redelivers an already processed batch, as a redrive would, to a warm
+# container (messageIds still in the dedupe cache) and a cold one (only the
+# conditional put stops the overwrite).
+#
+# Usage (from the Needium-APIGateway-Serv-Int directory):
+#   docker run -p 8000:8000 amazon/dynamodb-local
+#   python scripts/bench_sqs_consumers.py --endpoint-url http://localhost:8000 --batch-sizes 10,100,1000
+# Without --endpoint-url an in-process moto server is started (pip install "moto[server]").
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import urllib.parse
+import uuid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def start_stand_in(endpoint_url):
+    if endpoint_url:
+        return endpoint_url, None
+    from moto.server import ThreadedMotoServer
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return f"http://{host}:{port}", server
+
+
+MAX_RECEIVE_COUNT = 5
+
+
+def make_event(batch_size, poison_rate=0.0):
+    records = []
+    for n in range(batch_size):
+        body = json.dumps({"transaction_id": str(uuid.uuid4()), "amount": n + 1, "currency": "USD"})
+        if n < batch_size * poison_rate:
+            body = body[:-1]  # truncated JSON never decodes
+        records.append({
+            "messageId": str(uuid.uuid4()),
+            "body": urllib.parse.quote_plus(body),
+            "attributes": {"SentTimestamp": str(int(time.time() * 1000))},
+        })
+    return {"Records": records}
+
+
+def put_item_loop(consumer, event):
+    """The consumer before batching: one put_item round trip per record."""
+    for record in event["Records"]:
+        consumer.get_table().put_item(Item=consumer.build_item(record))
+
+
+def add_latency(client, latency_seconds):
+    def delay(**kwargs):
+        time.sleep(latency_seconds)
+    client.meta.events.register("before-send.dynamodb", delay)
+
+
+class WriteCounter:
+    """Counts items sent to DynamoDB by PutItem and BatchWriteItem."""
+
+    def __init__(self, client):
+        self.items = 0
+        client.meta.events.register("before-parameter-build.dynamodb.PutItem", self._put_item)
+        client.meta.events.register("before-parameter-build.dynamodb.BatchWriteItem", self._batch_write_item)
+
+    def _put_item(self, **kwargs):
+        self.items += 1
+
+    def _batch_write_item(self, params, **kwargs):
+        self.items += sum(len(requests) for requests in params["RequestItems"].values())
+
+
+def replay_until_dead_lettered(consumer, records, whole_batch):
+    """Redelivers failed messages the way SQS would, up to MAX_RECEIVE_COUNT receives."""
+    pending = records
+    invocations = 0
+    for _ in range(MAX_RECEIVE_COUNT):
+        invocations += 1
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = consumer.handler({"Records": pending}, None)
+        failed = {failure["itemIdentifier"] for failure in result["batchItemFailures"]}
+        if not failed:
+            break
+        pending = pending if whole_batch else [r for r in pending if r["messageId"] in failed]
+    return invocations
+
+
+def timed(fn, repeats):
+    best = None
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):  # the handlers log every batch
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SQS consumer Lambdas")
+    parser.add_argument("--endpoint-url", help="DynamoDB Local endpoint; defaults to an in-process moto server")
+    parser.add_argument("--batch-sizes", default="10,100,1000")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Delay added to every DynamoDB request")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--workers", default="1,2,4,8,16", help="Comma separated SQS_WORKERS values")
+    parser.add_argument("--poison-rate", type=float, default=0.05, help="Share of undecodable messages in the redelivery run")
+    args = parser.parse_args()
+
+    endpoint_url, server = start_stand_in(args.endpoint_url)
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    os.environ["AWS_ENDPOINT_URL_DYNAMODB"] = endpoint_url
+    os.environ["DYNAMODB_TABLE_NAME"] = f"bench-payments-{uuid.uuid4().hex[:6]}"
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    os.environ["SQS_WORKERS"] = str(max(worker_counts))  # sizes the shared client's connection pool
+    os.environ.setdefault("LOG_LEVEL", "ERROR")  # the handlers log to stdout as JSON lines
+    sys.path.insert(0, os.path.join(HERE, "..", "lambdas", "common_layer", "python"))
+    sys.path.insert(0, os.path.join(HERE, "..", "lambdas", "payment_sqs_lambda"))
+    import main as consumer
+    import sqs_batch
+
+    table = consumer.get_table()
+    table.meta.client.create_table(
+        TableName=table.name,
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+    add_latency(table.meta.client, args.latency_ms / 1000.0)
+    writes = WriteCounter(table.meta.client)
+
+    print(f"stand-in: {endpoint_url}, added latency {args.latency_ms} ms per DynamoDB request")
+    print(f"{'batch':>6} {'mode':>16} {'wall ms':>9} {'records/s':>10}")
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        for label, fn in (
+            ("put_item loop", lambda: put_item_loop(consumer, make_event(batch_size))),
+            ("handler", lambda: sqs_batch.process_records(make_event(batch_size)["Records"], consumer.build_item, consumer.get_table, workers=1)),
+        ):
+            elapsed = timed(fn, args.repeats)
+            print(f"{batch_size:>6} {label:>16} {elapsed * 1000:>9.1f} {batch_size / elapsed:>10.0f}")
+
+    print(f"\n{'batch':>6} {'workers':>16} {'wall ms':>9} {'records/s':>10}")
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        for workers in worker_counts:
+            elapsed = timed(lambda: sqs_batch.process_records(make_event(batch_size)["Records"], consumer.build_item, consumer.get_table, workers=workers), args.repeats)
+            print(f"{batch_size:>6} {workers:>16} {elapsed * 1000:>9.1f} {batch_size / elapsed:>10.0f}")
+
+    print(f"\nredelivery of a 100 message batch with {args.poison_rate:.0%} poison messages, {MAX_RECEIVE_COUNT} receives max")
+    print(f"{'mode':>24} {'invocations':>12} {'items sent':>14}")
+    for label, whole_batch in (("whole-batch redelivery", True), ("batchItemFailures", False)):
+        records = make_event(100, args.poison_rate)["Records"]
+        writes.items = 0
+        invocations = replay_until_dead_lettered(consumer, records, whole_batch)
+        print(f"{label:>24} {invocations:>12} {writes.items:>14}")
+
+    print("\nredelivery of an already processed 100 message batch")
+    print(f"{'container':>24} {'duplicates':>12} {'items sent':>14}")
+    event = make_event(100)
+    with contextlib.redirect_stdout(io.StringIO()):
+        consumer.handler(event, None)
+    for label, cold in (("warm", False), ("cold", True)):
+        if cold:
+            sqs_batch.recent_messages = sqs_batch.RecentMessages(sqs_batch.DEDUPE_CACHE_SIZE)
+        writes.items = 0
+        result = sqs_batch.process_records(event["Records"], consumer.build_item, consumer.get_table)
+        print(f"{label:>24} {result.duplicates:>12} {writes.items:>14}")
+
+    if server:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
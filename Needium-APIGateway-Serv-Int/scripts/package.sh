@@ -35,13 +35,7 @@ zip -r ../telemedicine_sqs_lambda.zip .
 rm -rf lib python *.dist-info
 cd ../..
 
-# Pharmacy ECS Lambda (Placeholder)
-echo "Packaging pharmacy_ecs_lambda..."
-cd lambdas/pharmacy_ecs_lambda
-# No requirements.txt for this example, but if there were:
-# pip install -r requirements.txt -t .
-zip -r ../pharmacy_ecs_lambda.zip .
-cd ../..
+# Pharmacy runs on ECS from pharmacy.Dockerfile (services/pharmacy_service), not from a Lambda zip
 
 # PFM EC2 Lambda (Placeholder)
 echo "Packaging pfm_ec2_lambda..."
@@ -0,0 +1,197 @@
+#######################################################
+#Pooled Async PostgreSQL Access for the Pharmacy Service
+#######################################################
+# services/pharmacy_service/db.py
+#
+# - One asyncpg pool per ECS task, DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE
+#   connections. The task's event loop multiplexes every request in flight
+#   over them, so the pool is sized to the task (0.25 vCPU: a handful of
+#   queries actually running at once) and to the database: tasks x
+#   DB_POOL_MAX_SIZE has to stay under RDS max_connections (about 80 on a
+#   db.t3.micro).
+# - asyncpg prepares each query server-side as a named statement the first
+#   time a connection runs it and reuses it from the connection's statement
+#   cache afterwards. _prepare_hot_statements runs the catalog lookups once
+#   on every new connection, so no request pays for parsing and planning them.
+# - /pharmacy/medications pages by keyset: ORDER BY name, id from the
+#   (name, id) of the last row served, an index range scan whatever the
+#   page number, instead of an OFFSET that reads and discards every row
+#   before the page.
+import base64
+import binascii
+import json
+import os
+
+import asyncpg
+
+DB_HOST = os.environ.get('DB_HOST', 'localhost')
+DB_PORT = int(os.environ.get('DB_PORT', '5432'))
+DB_NAME = os.environ.get('DB_NAME', 'pharmacydb')
+DB_USER = os.environ.get('DB_USER', 'postgres')
+DB_PASSWORD = os.environ.get('DB_PASSWORD') # Use Secrets Manager in production
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '10'))
+DB_COMMAND_TIMEOUT = float(os.environ.get('DB_COMMAND_TIMEOUT', '5'))
+# Idle connections above DB_POOL_MIN_SIZE are closed after this long, giving the slots back to other tasks
+DB_MAX_INACTIVE_SECONDS = float(os.environ.get('DB_MAX_INACTIVE_SECONDS', '300'))
+DB_APPLY_SCHEMA = os.environ.get('DB_APPLY_SCHEMA', 'true').lower() == 'true'
+# Ids are PostgreSQL bigints; a larger number would only get asyncpg's DataError
+MAX_INT = 2 ** 63 - 1
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.sql')
+
+MEDICATION_COLUMNS = 'id, name, form, strength, price_cents, stock'
+GET_MEDICATION = f"SELECT {MEDICATION_COLUMNS} FROM medications WHERE id = $1"
+LIST_MEDICATIONS = f"SELECT {MEDICATION_COLUMNS} FROM medications ORDER BY name, id LIMIT $1"
+LIST_MEDICATIONS_AFTER = (f"SELECT {MEDICATION_COLUMNS} FROM medications WHERE (name, id) > ($1, $2) "
+                          f"ORDER BY name, id LIMIT $3")
+
+# query -> arguments that run it without returning anything, for _prepare_hot_statements
+HOT_STATEMENTS = {
+    GET_MEDICATION: (0,),
+    LIST_MEDICATIONS: (0,),
+    LIST_MEDICATIONS_AFTER: ('', 0, 0),
+}
+
+
+class OrderRejected(ValueError):
+    """An order that cannot be placed as requested; `error` names its response in main.ERRORS."""
+
+    def __init__(self, error, message):
+        super().__init__(message)
+        self.error = error
+
+
+async def _prepare_hot_statements(connection):
+    for query, args in HOT_STATEMENTS.items():
+        await connection.fetch(query, *args)
+
+
+def connect_args():
+    return dict(host=DB_HOST, port=DB_PORT, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
+
+
+async def create_pool():
+    # Before the pool: its connections prepare statements on tables the schema creates
+    if DB_APPLY_SCHEMA:
+        await apply_schema()
+    return await asyncpg.create_pool(
+        **connect_args(),
+        min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+        command_timeout=DB_COMMAND_TIMEOUT,
+        max_inactive_connection_lifetime=DB_MAX_INACTIVE_SECONDS,
+        init=_prepare_hot_statements,
+    )
+
+
+async def apply_schema():
+    with open(SCHEMA_PATH) as f:
+        schema = f.read()
+    connection = await asyncpg.connect(**connect_args(), timeout=DB_COMMAND_TIMEOUT)
+    try:
+        # Tasks starting together would otherwise race on CREATE ... IF NOT EXISTS
+        async with connection.transaction():
+            await connection.execute("SELECT pg_advisory_xact_lock(hashtext('pharmacy_service.schema'))")
+            await connection.execute(schema)
+    finally:
+        await connection.close()
+
+
+def encode_cursor(record):
+    """The opaque cursor of the page after `record`."""
+    return base64.urlsafe_b64encode(json.dumps([record['name'], record['id']]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """(name, id) of an encode_cursor() cursor; raises ValueError for anything else."""
+    try:
+        name, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (binascii.Error, UnicodeError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(name, str) or not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise ValueError("Invalid cursor")
+    # Neither fits the query's parameters: a text cannot hold NUL, and ids are bigints from 1
+    if '\x00' in name or not 0 < last_id <= MAX_INT:
+        raise ValueError("Invalid cursor")
+    return name, last_id
+
+
+async def get_medication(pool, medication_id):
+    record = await pool.fetchrow(GET_MEDICATION, medication_id)
+    return dict(record) if record is not None else None
+
+
+async def list_medications(pool, limit, after=None):
+    """
+    Up to `limit` medications by name after `after` (the decode_cursor() of a
+    previous page's cursor), and the cursor of the next page, or None on the last one.
+    """
+    # One row more than the page tells whether there is a next page
+    if after is None:
+        records = await pool.fetch(LIST_MEDICATIONS, limit + 1)
+    else:
+        name, last_id = after
+        records = await pool.fetch(LIST_MEDICATIONS_AFTER, name, last_id, limit + 1)
+    next_cursor = encode_cursor(records[limit - 1]) if len(records) > limit else None
+    return [dict(record) for record in records[:limit]], next_cursor
+
+
+async def create_order(pool, patient_id, items):
+    """
+    Places an order of `items` ({medication_id: quantity}) in one
+    transaction: the medications are locked in id order (so concurrent
+    orders cannot deadlock), their stock checked and decremented, and the
+    order stored at their current prices. Raises OrderRejected.
+    """
+    medication_ids = sorted(items)
+    quantities = [items[medication_id] for medication_id in medication_ids]
+    async with pool.acquire() as connection:
+        async with connection.transaction():
+            records = await connection.fetch(
+                "SELECT id, price_cents, stock FROM medications WHERE id = ANY($1::bigint[]) ORDER BY id FOR UPDATE",
+                medication_ids,
+            )
+            found = {record['id']: record for record in records}
+            missing = [medication_id for medication_id in medication_ids if medication_id not in found]
+            if missing:
+                raise OrderRejected('unknown_medication', f"Unknown medications: {missing}")
+            short = [medication_id for medication_id, quantity in zip(medication_ids, quantities)
+                     if found[medication_id]['stock'] < quantity]
+            if short:
+                raise OrderRejected('insufficient_stock', f"Not enough stock of medications: {short}")
+
+            prices = [found[medication_id]['price_cents'] for medication_id in medication_ids]
+            total_cents = sum(price * quantity for price, quantity in zip(prices, quantities))
+            await connection.execute(
+                "UPDATE medications AS m SET stock = m.stock - i.quantity "
+                "FROM unnest($1::bigint[], $2::int[]) AS i(id, quantity) WHERE m.id = i.id",
+                medication_ids, quantities,
+            )
+            order = await connection.fetchrow(
+                "INSERT INTO orders (patient_id, total_cents) VALUES ($1, $2) RETURNING id, patient_id, status, total_cents, created_at",
+                patient_id, total_cents,
+            )
+            await connection.execute(
+                "INSERT INTO order_items (order_id, medication_id, quantity, unit_price_cents) "
+                "SELECT $1, * FROM unnest($2::bigint[], $3::int[], $4::int[])",
+                order['id'], medication_ids, quantities, prices,
+            )
+    items = [{'medication_id': medication_id, 'quantity': quantity, 'unit_price_cents': price}
+             for medication_id, quantity, price in zip(medication_ids, quantities, prices)]
+    return order_dict(order, items)
+
+
+async def get_order(pool, order_id):
+    async with pool.acquire() as connection:
+        order = await connection.fetchrow(
+            "SELECT id, patient_id, status, total_cents, created_at FROM orders WHERE id = $1", order_id)
+        if order is None:
+            return None
+        items = await connection.fetch(
+            "SELECT medication_id, quantity, unit_price_cents FROM order_items WHERE order_id = $1 ORDER BY medication_id",
+            order_id)
+    return order_dict(order, [dict(item) for item in items])
+
+
+def order_dict(order, items):
+    return {**dict(order), 'created_at': order['created_at'].isoformat(), 'items': items}
@@ -0,0 +1,251 @@
+#######################################################
+#Pharmacy Microservice (ECS behind the Pharmacy ALB)
+#######################################################
+# services/pharmacy_service/main.py
+#
+# Medications catalog and orders over the RDS PostgreSQL database, as an
+# asyncio ASGI app run by uvicorn (see pharmacy.Dockerfile):
+#   GET  /health
+#   GET  /medications?limit=&cursor=    keyset-paginated by name
+#   GET  /medications/{medicationId}
+#   POST /orders                        {"patient_id": ..., "items": [{"medication_id": ..., "quantity": ...}]}
+#   GET  /orders/{orderId}
+# API Gateway's /pharmacy/{proxy+} reaches the ALB without the /pharmacy
+# prefix; paths that still carry it are served as well.
+#
+# Routing and JSON encoding come from the Lambda common layer
+# (api_router.Router, api_responses), which the image copies in as they are.
+import asyncio
+import os
+from urllib.parse import unquote_plus
+
+import asyncpg
+
+import api_responses
+import db
+from api_router import Router
+from structured_logging import get_logger, set_request_id
+
+logger = get_logger('pharmacy_service')
+
+PATH_PREFIX = os.environ.get('PATH_PREFIX', '/pharmacy')
+MEDICATIONS_DEFAULT_LIMIT = int(os.environ.get('MEDICATIONS_DEFAULT_LIMIT', '20'))
+MEDICATIONS_MAX_LIMIT = int(os.environ.get('MEDICATIONS_MAX_LIMIT', '100'))
+ORDER_MAX_ITEMS = int(os.environ.get('ORDER_MAX_ITEMS', '50'))
+MAX_BODY_BYTES = int(os.environ.get('MAX_BODY_BYTES', '65536'))
+MAX_INT = db.MAX_INT
+
+# error name -> (status code, message); routing and JSON body errors come from api_responses.ERRORS
+ERRORS = {
+    'invalid_limit': (400, f'limit must be an integer from 1 to {MEDICATIONS_MAX_LIMIT}'),
+    'invalid_cursor': (400, 'Invalid cursor'),
+    'medication_not_found': (404, 'Medication not found'),
+    'order_not_found': (404, 'Order not found'),
+    'invalid_order': (400, 'Invalid order'),
+    'body_too_large': (413, 'Request body too large'),
+    'unknown_medication': (422, 'Unknown medication'),
+    'insufficient_stock': (409, 'Insufficient stock'),
+    'database_unavailable': (503, 'Database unavailable'),
+    'internal_error': (500, 'Internal server error'),
+}
+
+router = Router()
+_pool = None
+_pool_lock = asyncio.Lock()
+
+
+class Request:
+    __slots__ = ('method', 'path', 'query', 'headers', 'params', 'body')
+
+    def __init__(self, method, path, query, headers, params, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.params = params
+        self.body = body
+
+
+class HTTPError(Exception):
+    def __init__(self, error, message=None):
+        super().__init__(message)
+        self.error = error
+        self.message = message
+
+
+async def get_pool():
+    """The task's connection pool, created (and the schema applied) on first use."""
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await db.create_pool()
+    return _pool
+
+
+def error_body(name, message=None):
+    status_code, default_message = ERRORS.get(name) or api_responses.ERRORS[name]
+    return status_code, {'message': message or default_message}
+
+
+def positive_int(value):
+    """`value` as an int from 1 to MAX_INT, or None; bools and floats are not ids."""
+    if isinstance(value, str):
+        # isdigit() alone also takes e.g. '²', which int() rejects; past 19 digits it is above MAX_INT anyway
+        digits = value.isascii() and value.isdigit() and len(value.lstrip('0')) <= 19
+        value = int(value) if digits else None
+    if isinstance(value, int) and not isinstance(value, bool) and 0 < value <= MAX_INT:
+        return value
+    return None
+
+
+@router.route('GET', '/health')
+async def health(request):
+    # The ALB health check: answers without a database round trip
+    return 200, {'status': 'OK', 'pool_size': _pool.get_size() if _pool is not None else 0}
+
+
+@router.route('GET', '/medications')
+async def list_medications(request):
+    limit = request.query.get('limit', MEDICATIONS_DEFAULT_LIMIT)
+    limit = positive_int(limit)
+    if limit is None or limit > MEDICATIONS_MAX_LIMIT:
+        raise HTTPError('invalid_limit')
+    cursor = request.query.get('cursor')
+    try:
+        after = db.decode_cursor(cursor) if cursor is not None else None
+    except ValueError:
+        raise HTTPError('invalid_cursor')
+    medications, next_cursor = await db.list_medications(await get_pool(), limit, after)
+    return 200, {'medications': medications, 'next_cursor': next_cursor}
+
+
+@router.route('GET', '/medications/{medicationId}')
+async def get_medication(request):
+    medication_id = positive_int(request.params['medicationId'])
+    medication = await db.get_medication(await get_pool(), medication_id) if medication_id else None
+    if medication is None:
+        raise HTTPError('medication_not_found')
+    return 200, medication
+
+
+def order_items(body):
+    """{medication_id: quantity} of a POST /orders body; raises HTTPError('invalid_order')."""
+    if not isinstance(body, dict):
+        raise HTTPError('invalid_order', 'Order must be a JSON object')
+    patient_id = body.get('patient_id')
+    if not isinstance(patient_id, str) or not 0 < len(patient_id) <= 128:
+        raise HTTPError('invalid_order', 'patient_id must be a string of 1 to 128 characters')
+    items = body.get('items')
+    if not isinstance(items, list) or not 0 < len(items) <= ORDER_MAX_ITEMS:
+        raise HTTPError('invalid_order', f'items must be a list of 1 to {ORDER_MAX_ITEMS} items')
+    quantities = {}
+    for item in items:
+        medication_id = positive_int(item.get('medication_id')) if isinstance(item, dict) else None
+        quantity = positive_int(item.get('quantity')) if isinstance(item, dict) else None
+        if medication_id is None or quantity is None or quantity > 1000:
+            raise HTTPError('invalid_order', 'Each item needs a medication_id and a quantity from 1 to 1000')
+        quantities[medication_id] = quantities.get(medication_id, 0) + quantity
+    return patient_id, quantities
+
+
+@router.route('POST', '/orders')
+async def create_order(request):
+    try:
+        body = api_responses.loads(request.body or b'null')
+    except ValueError:
+        raise HTTPError('invalid_json')
+    patient_id, items = order_items(body)
+    try:
+        order = await db.create_order(await get_pool(), patient_id, items)
+    except db.OrderRejected as e:
+        raise HTTPError(e.error, str(e))
+    return 201, order
+
+
+@router.route('GET', '/orders/{orderId}')
+async def get_order(request):
+    order_id = positive_int(request.params['orderId'])
+    order = await db.get_order(await get_pool(), order_id) if order_id else None
+    if order is None:
+        raise HTTPError('order_not_found')
+    return 200, order
+
+
+async def read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        size += len(chunks[-1])
+        if size > MAX_BODY_BYTES:
+            raise HTTPError('body_too_large')
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def handle(scope, receive):
+    """(status code, JSON-encodable body, extra headers) for an HTTP request."""
+    method, path = scope['method'], scope['path']
+    handler, params, allowed = router.match(method, path)
+    if not allowed and PATH_PREFIX and path.startswith(PATH_PREFIX + '/'):
+        handler, params, allowed = router.match(method, path[len(PATH_PREFIX):])
+    if handler is None:
+        if allowed:
+            return (*error_body('method_not_allowed'), {'Allow': ', '.join(allowed)})
+        return (*error_body('route_not_found'), None)
+
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+    set_request_id(headers.get('x-amzn-trace-id'))
+    query = {}
+    for pair in scope['query_string'].decode('latin-1').split('&'):
+        if pair:
+            name, _, value = pair.partition('=')
+            query.setdefault(unquote_plus(name), unquote_plus(value))
+    try:
+        body = await read_body(receive) if method in ('POST', 'PUT', 'PATCH') else b''
+        status_code, value = await handler(Request(method, path, query, headers, params, body))
+        return status_code, value, None
+    except HTTPError as e:
+        return (*error_body(e.error, e.message), None)
+    except (asyncpg.PostgresConnectionError, asyncpg.TooManyConnectionsError, OSError, asyncio.TimeoutError) as e:
+        logger.error("Database unavailable for %s %s: %s", method, path, e)
+        return (*error_body('database_unavailable'), None)
+    except Exception as e:
+        logger.exception("Unexpected error for %s %s: %s", method, path, e)
+        return (*error_body('internal_error'), None)
+
+
+async def lifespan(receive, send):
+    global _pool
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                await get_pool()
+            except Exception as e:
+                logger.exception("Cannot connect to the database: %s", e)
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _pool is not None:
+                await _pool.close()
+                _pool = None
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    status_code, value, headers = await handle(scope, receive)
+    body = api_responses.dumps_bytes(value)
+    response_headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode('latin-1'))]
+    if headers:
+        response_headers += [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()]
+    await send({'type': 'http.response.start', 'status': status_code, 'headers': response_headers})
+    await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,33 @@
+-- services/pharmacy_service/schema.sql
+-- Applied by db.apply_schema at startup (DB_APPLY_SCHEMA); every statement is idempotent.
+
+CREATE TABLE IF NOT EXISTS medications (
+    id          bigserial PRIMARY KEY,
+    name        text        NOT NULL,
+    form        text        NOT NULL,                -- tablet, capsule, syrup, ...
+    strength    text        NOT NULL,                -- e.g. '500 mg'
+    price_cents integer     NOT NULL CHECK (price_cents >= 0),
+    stock       integer     NOT NULL DEFAULT 0 CHECK (stock >= 0),
+    created_at  timestamptz NOT NULL DEFAULT now()
+);
+
+-- Keyset pagination of /pharmacy/medications walks this index: ORDER BY name, id from (name, id) > cursor
+CREATE INDEX IF NOT EXISTS medications_name_id_idx ON medications (name, id);
+
+CREATE TABLE IF NOT EXISTS orders (
+    id          bigserial PRIMARY KEY,
+    patient_id  text        NOT NULL,
+    status      text        NOT NULL DEFAULT 'PLACED',
+    total_cents bigint      NOT NULL,
+    created_at  timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS orders_patient_id_idx ON orders (patient_id, id);
+
+CREATE TABLE IF NOT EXISTS order_items (
+    order_id         bigint  NOT NULL REFERENCES orders (id),
+    medication_id    bigint  NOT NULL REFERENCES medications (id),
+    quantity         integer NOT NULL CHECK (quantity > 0),
+    unit_price_cents integer NOT NULL,
+    PRIMARY KEY (order_id, medication_id)
+);
@@ -0,0 +1,93 @@
+#######################################################
+#Tests for the Pharmacy Service's Request Parsing
+#######################################################
+# tests/test_pharmacy_service.py
+#
+# None of these requests reach the database: they are answered before
+# get_pool() is called, so no PostgreSQL is needed (asyncpg still is:
+# pip install -r tests/requirements.txt). test_pharmacy_service_db.py
+# covers the queries.
+import asyncio
+import base64
+import json
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "lambdas", "common_layer", "python"))
+sys.path.insert(0, os.path.join(HERE, "..", "services", "pharmacy_service"))
+
+pytest.importorskip("asyncpg")
+
+import main  # noqa: E402
+
+
+def request(method, path, query=b"", body=b""):
+    scope = {"type": "http", "method": method, "path": path, "query_string": query, "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    status_code, value, _ = asyncio.run(main.handle(scope, receive))
+    return status_code, value
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1", 1),
+    ("0042", 42),
+    (7, 7),
+    (str(2 ** 63 - 1), 2 ** 63 - 1),
+    (2 ** 63 - 1, 2 ** 63 - 1),
+])
+def test_positive_int_accepts_bigint_ids(value, expected):
+    assert main.positive_int(value) == expected
+
+
+@pytest.mark.parametrize("value", [
+    "0", "-1", "", "1.5", " 1", "abc",
+    "²",                  # superscript two: isdigit() but not int()
+    "٣",                  # Arabic-Indic three: int() would take it
+    str(2 ** 63), 2 ** 63, "9" * 5000,
+    0, -3, 1.0, True, None, [1],
+])
+def test_positive_int_rejects(value):
+    assert main.positive_int(value) is None
+
+
+@pytest.mark.parametrize("path", ["/medications/²", "/medications/" + str(2 ** 63), "/pharmacy/medications/99999999999999999999"])
+def test_unusable_medication_id_is_not_found(path):
+    assert request("GET", path) == (404, {"message": "Medication not found"})
+
+
+@pytest.mark.parametrize("path", ["/orders/²", "/orders/" + str(2 ** 64)])
+def test_unusable_order_id_is_not_found(path):
+    assert request("GET", path) == (404, {"message": "Order not found"})
+
+
+@pytest.mark.parametrize("limit", ["%C2%B2", "0", "101", str(2 ** 63)])
+def test_unusable_limit_is_rejected(limit):
+    status_code, _ = request("GET", "/medications", query=f"limit={limit}".encode())
+    assert status_code == 400
+
+
+def cursor(name, last_id):
+    return base64.urlsafe_b64encode(json.dumps([name, last_id]).encode()).decode()
+
+
+@pytest.mark.parametrize("value", [
+    cursor("Aspirin", 2 ** 63), cursor("Aspirin", -2 ** 63), cursor("Aspirin", 0),
+    cursor("Aspirin\x00", 1), cursor("Aspirin", True), cursor(None, 1), "not-a-cursor",
+])
+def test_unusable_cursor_is_rejected(value):
+    query = f"cursor={value}".encode()
+    assert request("GET", "/medications", query=query) == (400, {"message": "Invalid cursor"})
+
+
+@pytest.mark.parametrize("medication_id", [2 ** 63, "²", "NaN"])
+def test_unusable_order_item_is_rejected(medication_id):
+    body = json.dumps({"patient_id": "p-1", "items": [{"medication_id": medication_id, "quantity": 1}]}).encode()
+    status_code, value = request("POST", "/orders", body=body)
+    assert status_code == 400
+    assert value["message"] == "Each item needs a medication_id and a quantity from 1 to 1000"
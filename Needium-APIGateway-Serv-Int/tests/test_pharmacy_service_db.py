@@ -0,0 +1,111 @@
+#######################################################
+#Tests for the Pharmacy Service against PostgreSQL
+#######################################################
+# tests/test_pharmacy_service_db.py
+#
+# Skipped unless DB_HOST points at a PostgreSQL the tests may write to, e.g.:
+#   docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=pharmacy -e POSTGRES_DB=pharmacydb postgres:16
+#   export DB_HOST=localhost DB_USER=postgres DB_PASSWORD=pharmacy DB_NAME=pharmacydb
+# The schema is applied as at startup. Each test adds its own medications
+# (named after a fresh prefix) and deletes them, with their orders, afterwards.
+import asyncio
+import json
+import os
+import sys
+import uuid
+
+import pytest
+
+if not os.environ.get("DB_HOST"):
+    pytest.skip("DB_HOST is not set", allow_module_level=True)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "lambdas", "common_layer", "python"))
+sys.path.insert(0, os.path.join(HERE, "..", "services", "pharmacy_service"))
+
+pytest.importorskip("asyncpg")
+
+import main  # noqa: E402
+
+
+async def request(method, path, query=b"", body=b""):
+    scope = {"type": "http", "method": method, "path": path, "query_string": query, "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    status_code, value, _ = await main.handle(scope, receive)
+    return status_code, value
+
+
+def run(scenario):
+    """Runs `scenario(pool, prefix)` on a pool of its own, then deletes what it added."""
+    prefix = f"zz-test-{uuid.uuid4().hex[:8]}-"
+    patient_id = prefix + "patient"
+
+    async def run_scenario():
+        pool = await main.get_pool()
+        try:
+            await scenario(pool, prefix)
+        finally:
+            await pool.execute("DELETE FROM order_items WHERE order_id IN (SELECT id FROM orders WHERE patient_id = $1)", patient_id)
+            await pool.execute("DELETE FROM orders WHERE patient_id = $1", patient_id)
+            await pool.execute("DELETE FROM medications WHERE name LIKE $1 || '%'", prefix)
+            main._pool = None
+            await pool.close()
+
+    asyncio.run(run_scenario())
+
+
+async def add_medications(pool, names, stock=10):
+    rows = await pool.fetch(
+        "INSERT INTO medications (name, form, strength, price_cents, stock) "
+        "SELECT name, 'tablet', '10 mg', 250, $2 FROM unnest($1::text[]) AS name RETURNING id",
+        names, stock)
+    return [row["id"] for row in rows]
+
+
+def test_keyset_pages_walk_repeated_names_once_in_order():
+    async def scenario(pool, prefix):
+        # Repeated names: the pages are ordered, and resumed, on (name, id)
+        ids = await add_medications(pool, [prefix + name for name in ["b", "a", "c", "a", "b", "a", "d"]])
+        expected = [(row["name"], row["id"]) for row in await pool.fetch(
+            "SELECT name, id FROM medications WHERE id = ANY($1::bigint[]) ORDER BY name, id", ids)]
+
+        # Starts just before this test's rows: the catalog may hold others around them
+        seen, cursor = [], main.db.encode_cursor({"name": prefix, "id": 1})
+        while cursor is not None and len(seen) < len(expected):
+            status_code, page = await request("GET", "/pharmacy/medications", query=f"limit=2&cursor={cursor}".encode())
+            assert status_code == 200
+            assert len(page["medications"]) <= 2
+            seen += [(medication["name"], medication["id"]) for medication in page["medications"]]
+            cursor = page["next_cursor"]
+        assert seen[:len(expected)] == expected
+
+    run(scenario)
+
+
+def test_order_beyond_stock_is_rejected_and_changes_nothing():
+    async def scenario(pool, prefix):
+        first, second = await add_medications(pool, [prefix + "a", prefix + "b"], stock=2)
+        patient_id = prefix + "patient"
+
+        def order(quantity):
+            items = [{"medication_id": first, "quantity": 1}, {"medication_id": second, "quantity": quantity}]
+            return json.dumps({"patient_id": patient_id, "items": items}).encode()
+
+        status_code, value = await request("POST", "/pharmacy/orders", body=order(3))
+        assert (status_code, value["message"]) == (409, f"Not enough stock of medications: [{second}]")
+        stock = await pool.fetch("SELECT stock FROM medications WHERE id = ANY($1::bigint[]) ORDER BY id", [first, second])
+        assert [row["stock"] for row in stock] == [2, 2]
+
+        status_code, value = await request("POST", "/pharmacy/orders", body=order(2))
+        assert status_code == 201
+        assert value["total_cents"] == 3 * 250
+        stock = await pool.fetch("SELECT stock FROM medications WHERE id = ANY($1::bigint[]) ORDER BY id", [first, second])
+        assert [row["stock"] for row in stock] == [1, 0]
+
+        status_code, _ = await request("POST", "/pharmacy/orders", body=order(1))
+        assert status_code == 409
+
+    run(scenario)
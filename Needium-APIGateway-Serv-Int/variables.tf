@@ -21,6 +21,52 @@ variable "fusionauth_api_key" {
   sensitive   = true
 }
 
+variable "fusionauth_issuer" {
+  description = "The issuer (iss) claim FusionAuth puts in its JWTs. Defaults to fusionauth_domain when empty."
+  type        = string
+  default     = ""
+}
+
+variable "fusionauth_audience" {
+  description = "The audience (aud) claim expected in FusionAuth JWTs, usually the FusionAuth application ID. Required: the authorizer verifies tokens locally and would otherwise accept tokens issued to any application of the tenant."
+  type        = string
+
+  validation {
+    condition     = length(trimspace(var.fusionauth_audience)) > 0
+    error_message = "fusionauth_audience must be set to the FusionAuth application ID."
+  }
+}
+
+variable "fusionauth_revocation_check" {
+  description = "Also call FusionAuth's /api/jwt/validate after local JWT verification, to catch revoked tokens."
+  type        = bool
+  default     = false
+}
+
+variable "authorizer_role_routes" {
+  description = "Optional: JSON map of FusionAuth role to the \"METHOD/path\" patterns that role may call, e.g. {\"patient\": [\"*/payments*\"]}."
+  type        = string
+  default     = ""
+}
+
+variable "sqs_consumer_workers" {
+  description = "Threads each SQS consumer Lambda uses to write a batch to DynamoDB. 1 writes sequentially."
+  type        = number
+  # Batches are up to 100 records, each its own conditional PutItem; 16 threads make that ~7 round trips deep
+  default     = 16
+}
+
+variable "sqs_consumer_timeout" {
+  description = "Timeout in seconds of the SQS consumer Lambdas; the queues' visibility timeout is 6 times this."
+  type        = number
+  default     = 15
+
+  validation {
+    condition     = var.sqs_consumer_timeout >= 1 && var.sqs_consumer_timeout <= 900
+    error_message = "sqs_consumer_timeout must be between 1 and 900 seconds (Lambda's limit)."
+  }
+}
+
 variable "db_username" {
   description = "Username for the RDS databases."
   type        = string
@@ -33,6 +79,11 @@ variable "db_password" {
   sensitive   = true
 }
 
+variable "pharmacy_service_image" {
+  description = "Image of the Pharmacy microservice, built from pharmacy.Dockerfile and pushed to ECR"
+  type        = string
+}
+
 variable "ec2_key_pair_name" {
   description = "Optional: Name of an existing EC2 Key Pair for SSH access to EC2 instance."
   type        = string